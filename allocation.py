@@ -0,0 +1,223 @@
+import csv
+import re
+from typing import Dict, Any, Callable, Iterable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from models import Inquiry, InquiryData, as_inquiry
+from policies import SUFFICIENT, INSUFFICIENT
+
+# Orders without a recognisable delivery deadline come after all dated ones
+NO_DUE_DATE = 1 << 30
+
+_DUE = re.compile(r"(\d+)\s*(day|week|month)", re.IGNORECASE)
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30}
+
+# Decisions as stored per order: (FG, RM)
+_FROM_STOCK = (SUFFICIENT, None)
+_MANUFACTURE = (INSUFFICIENT, SUFFICIENT)
+_HALT = (INSUFFICIENT, INSUFFICIENT)
+
+
+def due_in_days(delivery: str) -> int:
+    """Days until the deadline of texts like "Needed within 4 weeks"; ``NO_DUE_DATE`` if none."""
+    match = _DUE.search(delivery or "")
+    if match is None:
+        return NO_DUE_DATE
+    return int(match.group(1)) * _UNIT_DAYS[match.group(2).lower()]
+
+
+def read_quantities(path: str) -> Dict[str, int]:
+    """Quantities from a CSV file whose first two columns are an item ID and a quantity."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows, None)  # header
+        return {row[0]: int(row[1]) for row in rows if row}
+
+
+class BillOfMaterials:
+    """Raw material components needed to manufacture one unit of each SKU."""
+
+    def __init__(self, components: Optional[Mapping[str, Mapping[str, int]]] = None):
+        self.components: Dict[str, Dict[str, int]] = {
+            sku: dict(parts) for sku, parts in (components or {}).items()}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, Any]]) -> "BillOfMaterials":
+        bom = cls()
+        for row in rows:
+            parts = bom.components.setdefault(row["sku"], {})
+            parts[row["component"]] = parts.get(row["component"], 0) + int(row["quantity"])
+        return bom
+
+    @classmethod
+    def from_csv(cls, path: str) -> "BillOfMaterials":
+        """Load a CSV file with the columns sku, component and quantity (per unit)."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_rows(csv.DictReader(f))
+
+    def get(self, sku: str) -> Optional[Dict[str, int]]:
+        return self.components.get(sku)
+
+    def __contains__(self, sku) -> bool:
+        return sku in self.components
+
+
+class Allocation:
+    """Outcome of one allocation run, per order in input order."""
+
+    def __init__(self, decisions: List[Tuple[str, Optional[str]]], sequence: List[int],
+                 stock_left: Dict[str, int], raw_left: Dict[str, int]):
+        self.decisions = decisions
+        # Positions of the orders in the order they were allocated
+        self.sequence = sequence
+        self.stock_left = stock_left
+        self.raw_left = raw_left
+
+    def __len__(self) -> int:
+        return len(self.decisions)
+
+    def __getitem__(self, position: int) -> Tuple[str, Optional[str]]:
+        """(FG decision, RM decision or None) of an order."""
+        return self.decisions[position]
+
+    def summary(self) -> Dict[str, int]:
+        counts = {"from_stock": 0, "manufacture": 0, "halted": 0}
+        for decision in self.decisions:
+            if decision is _FROM_STOCK:
+                counts["from_stock"] += 1
+            elif decision is _MANUFACTURE:
+                counts["manufacture"] += 1
+            else:
+                counts["halted"] += 1
+        return counts
+
+
+class AllocationEngine:
+    """Allocates finished goods stock to a whole batch of orders at once.
+
+    Orders are served by descending priority, then earliest due date (from
+    the delivery text), then input order. An order gets all of its lines
+    from stock or none of them. An order that stock cannot cover takes what
+    stock there is, and the shortfall is manufactured if the bill of
+    materials and the raw material stock allow it. Otherwise the order is
+    halted and takes nothing.
+
+    Most SKUs of a batch are not contended: their total demand fits into
+    stock. Orders made only of such lines are allocated in one vectorised
+    pass. Only orders touching a contended SKU go through the sequential,
+    priority-ordered loop, and they get the same answers the loop would have
+    given them all.
+
+    The engine only decides. It does not change ``stock`` or ``raw``.
+    """
+
+    def __init__(self, stock: Mapping[str, int], bom: Optional[BillOfMaterials] = None,
+                 raw: Optional[Mapping[str, int]] = None):
+        self.skus = list(stock)
+        self.index = {sku: i for i, sku in enumerate(self.skus)}
+        self.stock = np.fromiter((stock[sku] for sku in self.skus), dtype=np.int64, count=len(self.skus))
+        self.bom = bom or BillOfMaterials()
+        self.raw = dict(raw or {})
+
+    @classmethod
+    def from_catalog(cls, catalog: Mapping[str, Any], bom: Optional[BillOfMaterials] = None,
+                     raw: Optional[Mapping[str, int]] = None) -> "AllocationEngine":
+        return cls({sku: item['quantity'] for sku, item in catalog.items()}, bom, raw)
+
+    def allocate(self, orders: Sequence[InquiryData],
+                 priority: Optional[Callable[[Inquiry], int]] = None) -> Allocation:
+        """Decide every order of the batch; ``priority(inquiry)`` ranks orders, higher first."""
+        inquiries = [as_inquiry(order) for order in orders]
+        count = len(inquiries)
+
+        # Order lines as flat arrays. SKUs the stock does not know get an
+        # index of their own with no stock, so they can still be manufactured.
+        index, skus = self.index, self.skus
+        ids = [product.id for inquiry in inquiries for product in inquiry.products]
+        lookup = index.get
+        line_sku = [lookup(sku, -1) for sku in ids]
+        if -1 in line_sku:
+            index, skus = dict(index), list(skus)
+            for position, sku in enumerate(line_sku):
+                if sku == -1:
+                    sku = index.get(ids[position])
+                    if sku is None:
+                        sku = index[ids[position]] = len(skus)
+                        skus.append(ids[position])
+                    line_sku[position] = sku
+        line_sku = np.array(line_sku, dtype=np.int64)
+        line_quantity = np.array([product.quantity for inquiry in inquiries for product in inquiry.products],
+                                 dtype=np.int64)
+        line_order = np.repeat(np.arange(count, dtype=np.int64),
+                               [len(inquiry.products) for inquiry in inquiries])
+        stock = np.zeros(len(skus), dtype=np.int64)
+        stock[:len(self.stock)] = self.stock
+
+        # Orders whose every SKU has enough stock for the whole batch get it
+        demand = np.bincount(line_sku, weights=line_quantity, minlength=len(skus)).astype(np.int64)
+        contended_line = (demand > stock)[line_sku]
+        contended = np.zeros(count, dtype=bool)
+        contended[line_order[contended_line]] = True
+        served = ~contended[line_order]
+        stock -= np.bincount(line_sku[served], weights=line_quantity[served],
+                             minlength=len(skus)).astype(np.int64)
+
+        decisions: List[Tuple[str, Optional[str]]] = [_FROM_STOCK] * count
+        sequence = self._sequence(inquiries, priority)
+        raw = dict(self.raw)
+        if contended.any():
+            flags = contended.tolist()
+            self._allocate_contended(
+                inquiries, [position for position in sequence if flags[position]],
+                index, skus, stock, raw, decisions)
+        stock_left = dict(zip(skus, stock.tolist()))
+        return Allocation(decisions, sequence, stock_left, raw)
+
+    @staticmethod
+    def _sequence(inquiries: List[Inquiry], priority: Optional[Callable[[Inquiry], int]]) -> List[int]:
+        # Delivery texts repeat a lot, so each distinct one is read once
+        days: Dict[str, int] = {}
+        due = np.fromiter((days[inquiry.delivery] if inquiry.delivery in days
+                           else days.setdefault(inquiry.delivery, due_in_days(inquiry.delivery))
+                           for inquiry in inquiries), dtype=np.int64, count=len(inquiries))
+        if priority is None:
+            return np.argsort(due, kind="stable").tolist()
+        ranks = np.fromiter((priority(inquiry) for inquiry in inquiries),
+                            dtype=np.int64, count=len(inquiries))
+        # lexsort sorts by the last key first and is stable, so ties keep input order
+        return np.lexsort((due, -ranks)).tolist()
+
+    def _allocate_contended(self, inquiries: List[Inquiry], sequence: List[int],
+                            index: Dict[str, int], skus: List[str], stock_array: np.ndarray,
+                            raw: Dict[str, int],
+                            decisions: List[Tuple[str, Optional[str]]]):
+        stock = stock_array.tolist()
+        bom = self.bom.components
+        for position in sequence:
+            wanted: Dict[int, int] = {}
+            for product in inquiries[position].products:
+                sku = index[product.id]
+                wanted[sku] = wanted.get(sku, 0) + product.quantity
+            short = {sku: quantity - stock[sku] for sku, quantity in wanted.items()
+                     if stock[sku] < quantity}
+            if not short:
+                for sku, quantity in wanted.items():
+                    stock[sku] -= quantity
+                continue
+
+            need: Optional[Dict[str, int]] = {}
+            for sku, missing in short.items():
+                parts = bom.get(skus[sku])
+                if parts is None:
+                    need = None
+                    break
+                for component, per_unit in parts.items():
+                    need[component] = need.get(component, 0) + per_unit * missing
+            if need is None or any(raw.get(component, 0) < quantity for component, quantity in need.items()):
+                decisions[position] = _HALT
+                continue
+            for component, quantity in need.items():
+                raw[component] -= quantity
+            for sku, quantity in wanted.items():
+                stock[sku] = max(stock[sku] - quantity, 0)
+            decisions[position] = _MANUFACTURE
+        stock_array[:] = stock
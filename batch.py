@@ -0,0 +1,251 @@
+import time
+from itertools import islice
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from allocation import AllocationEngine
+from eventlog import EventLog, OrderStates
+from models import Inquiry
+from process_manager import ProcessManager
+from receivables import InvoiceLedger
+from policies import DecisionPolicy, FixedPolicy, ReservedPolicy, StockCheckPolicy, SUFFICIENT, INSUFFICIENT
+from resilience import Backoff, DeadLetters
+
+
+def read_inquiries(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Yield inquiry texts from a file path or from an iterable of lines.
+
+    Inquiries are separated by one or more blank lines, the same layout as the
+    example inquiry in ``main.py``.
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            yield from read_inquiries(f)
+        return
+
+    block = []
+    for line in source:
+        if line.strip():
+            block.append(line.rstrip("\n"))
+        elif block:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[Tuple[int, List[Any]]]:
+    """Split an iterable into lists of ``size`` items, with the index of each list's first item."""
+    iterator = iter(items)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+class BatchRunner:
+    """Runs many inquiries through the sales process without any console I/O.
+
+    With ``reserve=True`` the FG decision is a real reservation against
+    ``manager.stock``. The reservations of ``reservation_batch`` inquiries at a
+    time go to the backend in one call, which the SQLite backend turns into one
+    transaction. Given a ``run_id``, every inquiry gets a stable order reference,
+    so running the same input again after a crash does not reserve twice.
+
+    Given an ``events`` log (``eventlog.EventLog``), the stage transitions of
+    every order are appended to it. Given ``resume`` (the ``OrderStates``
+    replayed from such a log), orders that already completed or failed are
+    skipped. Orders that were halted or never finished are run again.
+
+    Given an ``allocation`` engine (``allocation.AllocationEngine``), the
+    whole input is parsed first and stock is allocated to all orders at
+    once, by ``priority`` and due date. The FG/RM decisions of every order
+    are then the engine's, and ``policy`` is only asked about orders that
+    could not be parsed.
+
+    With ``keep_completed`` the parsed inquiries of completed orders are
+    collected in ``completed``, for planning that needs the whole batch
+    (e.g. ``picking.PickPlanner``). Given a ``ledger``
+    (``receivables.InvoiceLedger``), the invoice of every completed order is
+    recorded in it.
+
+    Every order fails on its own: an inquiry that does not parse, or any
+    other error, ends that order with status "error" and the run goes on.
+    Given ``dead_letters`` (``resilience.DeadLetters``), failed orders are
+    written there with their text and parse context. Reservations that fail
+    with a transient backend error (e.g. a locked SQLite file) are retried
+    by ``retry`` (a ``resilience.Backoff`` by default); once its attempts are
+    used up the error ends the run, and ``resume`` picks it up again later.
+    """
+
+    def __init__(self, manager: Optional[ProcessManager] = None,
+                 policy: Optional[DecisionPolicy] = None,
+                 include_documents: bool = False,
+                 reserve: bool = False,
+                 reservation_batch: int = 500,
+                 run_id: Optional[str] = None,
+                 events: Optional[EventLog] = None,
+                 resume: Optional[OrderStates] = None,
+                 allocation: Optional[AllocationEngine] = None,
+                 priority: Optional[Callable[[Inquiry], int]] = None,
+                 keep_completed: bool = False,
+                 dead_letters: Optional[DeadLetters] = None,
+                 retry: Optional[Backoff] = None,
+                 ledger: Optional[InvoiceLedger] = None):
+        self.manager = manager or ProcessManager(verbose=False)
+        self.policy = policy or StockCheckPolicy()
+        self.include_documents = include_documents
+        self.reserve = reserve
+        self.reservation_batch = reservation_batch
+        self.run_id = run_id
+        self.events = events
+        self.resume = resume
+        self.allocation = allocation
+        self.priority = priority
+        # The last allocation made by run()
+        self.allocated = None
+        self.completed: Optional[List[Inquiry]] = [] if keep_completed else None
+        self.dead_letters = dead_letters
+        self.retry = retry or Backoff()
+        self.ledger = ledger
+
+    @property
+    def profiler(self):
+        """The manager's ``instrumentation.Profiler``, or None when not profiling."""
+        return self.manager.profiler
+
+    def to_record(self, index: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten a process result into a structured, JSON-serialisable record."""
+        record = {"index": index, "status": result["status"]}
+        inquiry_data = result.get("inquiry_data")
+        if inquiry_data is not None:
+            products = inquiry_data["products"]
+            record.update({
+                "doc_number": inquiry_data["doc_number"],
+                "customer": inquiry_data["customer"],
+                "lines": len(products),
+                "units": sum(product['quantity'] for product in products),
+                "fg_choice": result.get("fg_choice"),
+                "rm_choice": result.get("rm_choice"),
+            })
+        if "reason" in result:
+            record["reason"] = result["reason"]
+        if "error" in result:
+            record["error"] = result["error"]
+            record["error_type"] = result.get("error_type")
+            record["stage"] = result.get("stage")
+        if self.include_documents:
+            record["documents"] = result.get("documents", {})
+            numbers = result.get("numbers")
+            if numbers:
+                # The numbered documents as typed values, for the JSON and CSV exports
+                generator, inventory = self.manager.doc_generator, self.manager.inventory
+                record["document_data"] = {
+                    kind: generator.document_record(kind, inquiry_data, number,
+                                                    inventory if kind == "picking" else None)
+                    for kind, number in numbers.items()}
+        return record
+
+    def finish(self, index: int, result: Dict[str, Any], text: str = "") -> Dict[str, Any]:
+        """Log the transitions of a finished order and turn its result into a record."""
+        if self.events is not None:
+            resume = self.resume
+            resumed = resume is not None and index < len(resume) and bool(resume.seen[index])
+            self.events.record(index, result, resumed)
+        if result["status"] == "completed":
+            if self.completed is not None:
+                self.completed.append(result["inquiry_data"])
+            if self.ledger is not None:
+                self.ledger.record_invoice(self.manager.doc_generator.invoice_record(
+                    result["inquiry_data"], result["numbers"]["billing"]))
+        elif self.dead_letters is not None and result["status"] == "error":
+            self.dead_letters.add(index, text, result, self._order_ref(index))
+        return self.to_record(index, result)
+
+    def pending(self, inquiries: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """(index, text) of the inquiries to run, leaving out the ones ``resume`` has finished."""
+        if self.resume is None:
+            return enumerate(inquiries)
+        finished = self.resume.finished
+        return ((index, text) for index, text in enumerate(inquiries) if not finished(index))
+
+    def run(self, inquiries: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Process inquiries one by one, yielding a record as soon as each finishes."""
+        if self.allocation is not None:
+            yield from self._run_allocated(list(self.pending(inquiries)))
+            return
+        if self.reserve:
+            for _, chunk in chunked(self.pending(inquiries), self.reservation_batch):
+                yield from self._run_reserved(chunk)
+            return
+        process = self.manager.process_sales_inquiry
+        policy = self.policy
+        for index, inquiry_text in self.pending(inquiries):
+            yield self.finish(index, process(inquiry_text, policy), inquiry_text)
+
+    def _parse_all(self, texts: Iterable[str]) -> List[Optional[Inquiry]]:
+        """Parsed inquiries, None where a text does not parse."""
+        parse = self.manager.parse_inquiry
+        parsed = []
+        for text in texts:
+            try:
+                parsed.append(parse(text))
+            except Exception:
+                # process_sales_inquiry reports the error when the text is run
+                parsed.append(None)
+        return parsed
+
+    def _run_reserved(self, chunk: List[Tuple[int, str]],
+                      parsed: Optional[List[Optional[Inquiry]]] = None) -> Iterator[Dict[str, Any]]:
+        manager = self.manager
+        if parsed is None:
+            parsed = self._parse_all(text for _, text in chunk)
+
+        orders = [(self._order_ref(index), inquiry_data["products"])
+                  for (index, _), inquiry_data in zip(chunk, parsed) if inquiry_data is not None]
+        started = time.perf_counter_ns()
+        outcomes = iter(self._reserve_many(orders))
+        if manager.profiler is not None:
+            manager.profiler.record("reserve_batch", time.perf_counter_ns() - started)
+
+        for (index, text), inquiry_data in zip(chunk, parsed):
+            if inquiry_data is None:
+                result = manager.process_sales_inquiry(text, self.policy)
+            else:
+                fg = SUFFICIENT if next(outcomes) else INSUFFICIENT
+                result = manager.process_sales_inquiry(text, ReservedPolicy(fg, self.policy, manager.stock),
+                                                       inquiry_data)
+            yield self.finish(index, result, text)
+
+    def _run_allocated(self, pending: List[Tuple[int, str]]) -> Iterator[Dict[str, Any]]:
+        manager = self.manager
+        parsed = self._parse_all(text for _, text in pending)
+
+        started = time.perf_counter_ns()
+        allocation = self.allocated = self.allocation.allocate(
+            [inquiry_data for inquiry_data in parsed if inquiry_data is not None], self.priority)
+        if manager.profiler is not None:
+            manager.profiler.record("allocate", time.perf_counter_ns() - started)
+
+        # Orders with the same decisions share one policy
+        policies = {}
+        decisions = iter(allocation.decisions)
+        for (index, text), inquiry_data in zip(pending, parsed):
+            if inquiry_data is None:
+                result = manager.process_sales_inquiry(text, self.policy)
+            else:
+                decision = next(decisions)
+                policy = policies.get(decision)
+                if policy is None:
+                    policy = policies[decision] = FixedPolicy(*decision)
+                result = manager.process_sales_inquiry(text, policy, inquiry_data)
+            yield self.finish(index, result, text)
+
+    def _reserve_many(self, orders: List[Tuple[Optional[str], Any]]) -> List[bool]:
+        # A failed reserve_many rolls back as a whole, and order references
+        # keep a repeated one from reserving twice
+        return self.retry.call(self.manager.stock.reserve_many, orders)
+
+    def _order_ref(self, index: int) -> Optional[str]:
+        return None if self.run_id is None else f"{self.run_id}:{index}"
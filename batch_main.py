@@ -0,0 +1,337 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from allocation import AllocationEngine, BillOfMaterials, read_quantities
+from batch import BatchRunner, read_inquiries
+from eventlog import EventLog
+from export import FORMATS, ExportSink
+from instrumentation import Profiler
+from inventory import SQLiteInventory
+from numbering import DEFAULT_PATH, SQLiteNumbering
+from parallel import ParallelRunner, scaling_report
+from picking import DEFAULT_WAVE_ORDERS, PickPlanner
+from pipeline import STAGES, AsyncPipeline
+from policies import POLICIES, get_policy
+from process_manager import ProcessManager
+from receivables import InvoiceLedger
+from render_cache import RenderCache
+from resilience import Backoff, DeadLetters
+from shipping import ShipmentPlanner, read_dimensions
+from sinks import open_sink
+
+
+def stage_workers(text):
+    """Parse "inventory=4,billing=2" for --stage-workers."""
+    workers = {}
+    for item in filter(None, text.split(",")):
+        stage, _, count = item.partition("=")
+        if stage.strip() not in STAGES or not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"expected STAGE=N with a stage from {', '.join(STAGES)}: {item}")
+        workers[stage.strip()] = int(count)
+    return workers
+
+
+def export_formats(text):
+    """Parse "pdf,json" for --export-formats."""
+    formats = [item.strip() for item in text.split(",") if item.strip()]
+    unknown = [item for item in formats if item not in FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"expected formats from {', '.join(FORMATS)}: {text}")
+    return formats
+
+
+def customer_priority(text):
+    """Parse "BikeWorld GmbH=2" for --priority."""
+    customer, _, rank = text.rpartition("=")
+    try:
+        return customer.strip(), int(rank)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected CUSTOMER=N: {text}") from None
+
+
+def write_waves(runner, path, wave_orders):
+    """Plan pick waves for the completed orders of a run and write their tickets to ``path``."""
+    manager = runner.manager
+    start = time.perf_counter()
+    waves = PickPlanner(manager.inventory, wave_orders=wave_orders).plan(runner.completed)
+    with open(path, "w", encoding="utf-8") as f:
+        for wave in waves:
+            f.write(manager.doc_generator.generate_wave_ticket(wave))
+            f.write("\n\n")
+    walk = sum(wave.distance for wave in waves)
+    print(f"Planned {len(waves)} pick waves for {len(runner.completed)} orders in "
+          f"{time.perf_counter() - start:.2f}s ({walk / 1000:,.1f} km walk)", file=sys.stderr)
+
+
+def write_shipments(runner, path, dimensions):
+    """Consolidate the completed orders of a run and write a packing slip and B/L per shipment to ``path``."""
+    start = time.perf_counter()
+    plan = ShipmentPlanner(dimensions).plan(runner.completed)
+    generator = runner.manager.doc_generator
+    with open(path, "w", encoding="utf-8") as f:
+        for shipment in plan.shipments:
+            f.write(generator.generate_consolidated_shipping(shipment))
+            f.write("\n\n")
+    summary = plan.summary()
+    print(f"Consolidated {summary['orders']} orders into {summary['shipments']} shipments "
+          f"({summary['pallets']} pallets, {summary['trucks']} trucks) in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run sales inquiries through the process without any prompts."
+    )
+    parser.add_argument("input", help="File with inquiries separated by blank lines ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="Where to write one JSON record per inquiry ('-' for stdout)")
+    parser.add_argument("--policy", default="stock", choices=sorted(POLICIES),
+                        help="How the FG/RM decision points are answered")
+    parser.add_argument("--documents", action="store_true",
+                        help="Include the generated documents in each record")
+    parser.add_argument("--documents-to", metavar="PATH",
+                        help="Persist all documents: a .zip, .tar or .tar.gz archive, or a directory "
+                             "of rotating text files (started afresh, or continued by --resume)")
+    parser.add_argument("--sink-batch", type=int, default=1000,
+                        help="Orders buffered before documents are written out")
+    parser.add_argument("--export", metavar="DIR",
+                        help="Export the picking tickets, packing slips, B/Ls and invoices to DIR as PDF "
+                             "files and JSON and CSV feeds, rendered on a pool of processes")
+    parser.add_argument("--export-formats", type=export_formats, default=list(FORMATS), metavar="FORMAT,...",
+                        help=f"With --export, the formats to write (default: {','.join(FORMATS)})")
+    parser.add_argument("--export-workers", type=int, default=0, metavar="N",
+                        help="With --export, processes rendering the exports (default: one per CPU)")
+    parser.add_argument("--reserve", action="store_true",
+                        help="Reserve stock for every order; the FG decision follows the reservation")
+    parser.add_argument("--allocate", action="store_true",
+                        help="Allocate stock to all inquiries at once, by priority and due date; "
+                             "the FG/RM decisions follow the allocation")
+    parser.add_argument("--bom", metavar="PATH",
+                        help="With --allocate, CSV bill of materials (sku, component, quantity) for "
+                             "manufacturing shortfalls")
+    parser.add_argument("--raw-stock", metavar="PATH",
+                        help="With --allocate, CSV of raw material stock (component, quantity)")
+    parser.add_argument("--priority", type=customer_priority, action="append", default=[],
+                        metavar="CUSTOMER=N",
+                        help="With --allocate, serve a customer's orders first (higher N first, default 0); "
+                             "can be repeated")
+    parser.add_argument("--inventory-db",
+                        help="SQLite file holding stock and reservations (implies --reserve)")
+    parser.add_argument("--run-id",
+                        help="Stable ID of this run; rerunning it does not reserve orders twice")
+    parser.add_argument("--event-log", metavar="PATH",
+                        help="Append the stage transitions of every order to this event log")
+    parser.add_argument("--resume", action="store_true",
+                        help="With --event-log, skip orders the log shows as completed or failed "
+                             "and run halted and unfinished ones again; needs the same --numbering, and "
+                             "with reservations --inventory-db and --run-id")
+    parser.add_argument("--dead-letters", metavar="PATH",
+                        help="Append the orders that fail, with their text, stage, error and parse "
+                             "context, to PATH as JSON Lines")
+    parser.add_argument("--retries", type=int, default=5, metavar="N",
+                        help="Attempts at a stock reservation that fails with a transient backend error "
+                             "(e.g. a locked --inventory-db), with exponential backoff between them")
+    parser.add_argument("--numbering", metavar="PATH",
+                        help=f"SQLite file of document number sequences (default {DEFAULT_PATH}): every "
+                             "inquiry, picking ticket, packing slip and invoice gets a unique number, also "
+                             "across workers and runs")
+    parser.add_argument("--date-numbers", action="store_true",
+                        help="Derive document numbers from the inquiry's date and customer, as before "
+                             "numbering existed (not unique)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of worker processes (implies --reserve: stock is reserved across all of them)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run the stages concurrently on an asyncio pipeline with bounded queues "
+                             "(records come out in completion order)")
+    parser.add_argument("--stage-workers", type=stage_workers, default={}, metavar="STAGE=N,...",
+                        help=f"Workers per pipeline stage, e.g. inventory=4 (stages: {', '.join(STAGES)})")
+    parser.add_argument("--queue-size", type=int, default=256,
+                        help="Orders each pipeline stage may have waiting")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Time every stage and write latency percentiles and counters to PATH "
+                             "(Prometheus text for .prom, else JSON)")
+    parser.add_argument("--profile-sample", type=int, default=1, metavar="N",
+                        help="With --profile, time only every N-th order (outcomes are always counted)")
+    parser.add_argument("--profile-allocations", action="store_true",
+                        help="With --profile, also sample the memory blocks each stage leaves allocated")
+    parser.add_argument("--pick-waves", metavar="PATH",
+                        help="Group the completed orders into pick waves and write one routed wave "
+                             "ticket per wave to PATH")
+    parser.add_argument("--wave-orders", type=int, default=DEFAULT_WAVE_ORDERS, metavar="N",
+                        help="With --pick-waves, orders per wave at most")
+    parser.add_argument("--shipments", metavar="PATH",
+                        help="Consolidate the completed orders into shipments per customer and delivery "
+                             "window, pack them onto pallets and trucks and write their packing slips and "
+                             "B/Ls to PATH")
+    parser.add_argument("--dimensions", metavar="PATH",
+                        help="With --shipments, CSV of unit dimensions (sku, length, width, height in cm, "
+                             "weight in kg); other SKUs are packed as boxed bikes")
+    parser.add_argument("--receivables", metavar="PATH",
+                        help="Record the invoices of the completed orders with their due dates in the "
+                             "SQLite ledger PATH (see receivables.py to match bank statements against it); "
+                             "not with --date-numbers")
+    parser.add_argument("--render-cache", type=int, default=0, metavar="ENTRIES",
+                        help="Reuse rendered line items of orders with the same lines, keeping up to "
+                             "ENTRIES sections (least recently used are evicted)")
+    parser.add_argument("--scaling", action="store_true",
+                        help="Only measure throughput with 1 to --workers processes and print it")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = sys.stdin if args.input == "-" else args.input
+
+    if args.scaling:
+        for row in scaling_report(list(read_inquiries(source)), args.workers):
+            print(f"{row['workers']:>3} workers: {row['per_second']:>10,}/s  "
+                  f"({row['seconds']:.2f}s, speedup {row['speedup']:.2f}x)")
+        return
+
+    sinks = []
+    if args.documents_to:
+        sinks.append(open_sink(args.documents_to, args.sink_batch, append=args.resume))
+    if args.export:
+        sinks.append(ExportSink(args.export, args.export_formats, workers=args.export_workers,
+                                batch_size=args.sink_batch))
+    include_documents = args.documents or bool(sinks)
+
+    profiler = Profiler(args.profile_allocations, args.profile_sample) if args.profile else None
+    if args.pipeline and args.workers > 1:
+        sys.exit("--pipeline runs in one process; use --stage-workers instead of --workers")
+    if args.event_log and args.workers > 1:
+        sys.exit("--event-log is written by a single process; leave out --workers")
+    if args.dead_letters and args.workers > 1:
+        sys.exit("--dead-letters is written by a single process; leave out --workers")
+    if args.retries < 1:
+        sys.exit("--retries must be at least 1")
+    if args.render_cache and args.workers > 1:
+        sys.exit("--render-cache is kept by a single process; leave out --workers")
+    if args.allocate and (args.workers > 1 or args.pipeline or args.reserve or args.inventory_db):
+        sys.exit("--allocate decides the whole batch in one process; leave out --workers, --pipeline, "
+                 "--reserve and --inventory-db")
+    if (args.bom or args.raw_stock or args.priority) and not args.allocate:
+        sys.exit("--bom, --raw-stock and --priority only apply with --allocate")
+    if (args.pick_waves or args.shipments) and args.workers > 1:
+        sys.exit("--pick-waves and --shipments plan the orders of a single process; leave out --workers")
+    if args.dimensions and not args.shipments:
+        sys.exit("--dimensions only applies with --shipments")
+    if (args.inventory_db or args.run_id) and args.workers > 1:
+        sys.exit("--inventory-db and --run-id reserve in a single process; workers share their own stock, "
+                 "so leave out --workers")
+    if args.receivables and args.workers > 1:
+        sys.exit("--receivables records the invoices of a single process; leave out --workers")
+    if args.date_numbers and args.numbering:
+        sys.exit("--date-numbers and --numbering are two ways to number documents; choose one")
+    if args.receivables and args.date_numbers:
+        sys.exit("--receivables needs invoice numbers that stay unique across runs; leave out --date-numbers")
+    if args.resume and not args.event_log:
+        sys.exit("--resume needs the --event-log of the run to resume")
+    if args.resume and (args.reserve or args.inventory_db) and not (args.inventory_db and args.run_id):
+        # In-memory stock starts full again, and orders reserved just before a crash
+        # are only recognised by their reference
+        sys.exit("--resume with reservations needs the --inventory-db and --run-id of the run to resume, "
+                 "or stock already sold would be sold again")
+    if args.resume and args.allocate:
+        sys.exit("--allocate plans the stock of the whole input; a resumed run would allocate it again")
+    events = EventLog(args.event_log) if args.event_log else None
+    render_cache = RenderCache(args.render_cache) if args.render_cache else None
+    numbering_path = None if args.date_numbers else args.numbering or DEFAULT_PATH
+    numbering = SQLiteNumbering(numbering_path) if numbering_path and args.workers <= 1 else None
+    if args.date_numbers:
+        numbering = False
+    resume = events.replay() if args.resume else None
+    dead_letters = DeadLetters(args.dead_letters) if args.dead_letters else None
+    ledger = InvoiceLedger.load(args.receivables) if args.receivables else None
+    retry = Backoff(args.retries)
+
+    if args.workers > 1:
+        # Workers always reserve (--reserve is implied): the FG decision follows the
+        # shared stock and --policy answers the RM decision
+        runner = ParallelRunner(args.workers, include_documents=include_documents, profile=profiler,
+                                numbering=numbering_path, policy=get_policy(args.policy))
+    else:
+        manager = ProcessManager(verbose=False, profile=profiler or False, render_cache=render_cache,
+                                 numbering=numbering)
+        if args.inventory_db:
+            manager.stock = SQLiteInventory(args.inventory_db)
+            manager.stock.load({sku: item.quantity for sku, item in manager.catalog.items()})
+        reserve = args.reserve or bool(args.inventory_db)
+        if args.pipeline:
+            runner = AsyncPipeline(manager, get_policy(args.policy), args.stage_workers, args.queue_size,
+                                   include_documents=include_documents, reserve=reserve,
+                                   run_id=args.run_id, events=events, resume=resume,
+                                   keep_completed=bool(args.pick_waves or args.shipments),
+                                   dead_letters=dead_letters, retry=retry, ledger=ledger)
+        else:
+            allocation = priority = None
+            if args.allocate:
+                allocation = AllocationEngine.from_catalog(
+                    manager.catalog, BillOfMaterials.from_csv(args.bom) if args.bom else None,
+                    read_quantities(args.raw_stock) if args.raw_stock else None)
+                ranks = dict(args.priority)
+                priority = (lambda inquiry: ranks.get(inquiry.customer, 0)) if ranks else None
+            runner = BatchRunner(manager, get_policy(args.policy), include_documents=include_documents,
+                                 reserve=reserve, run_id=args.run_id, events=events, resume=resume,
+                                 allocation=allocation, priority=priority,
+                                 keep_completed=bool(args.pick_waves or args.shipments),
+                                 dead_letters=dead_letters, retry=retry, ledger=ledger)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    statuses = Counter()
+    start = time.perf_counter()
+    try:
+        for record in runner.run(read_inquiries(source)):
+            statuses[record["status"]] += 1
+            for sink in sinks:
+                sink.add(record["index"], record.get("doc_number", ""), record.get("documents", {}),
+                         record.get("document_data"))
+            if sinks and not args.documents:
+                del record["documents"]
+                record.pop("document_data", None)
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        for sink in sinks:
+            sink.close()
+        if events is not None:
+            events.snapshot()
+            events.close()
+        if numbering:
+            numbering.close()
+        if dead_letters is not None:
+            dead_letters.close()
+    elapsed = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    rate = total / elapsed if elapsed else 0.0
+    summary = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+    print(f"Processed {total} inquiries in {elapsed:.2f}s ({rate:,.0f}/s) - {summary}",
+          file=sys.stderr)
+    if dead_letters is not None:
+        print(f"Dead letters: {dead_letters.count} failed orders in {args.dead_letters}", file=sys.stderr)
+    if retry.retries:
+        print(f"Retried {retry.retries} reservations after transient backend errors", file=sys.stderr)
+    if args.pick_waves:
+        write_waves(runner, args.pick_waves, args.wave_orders)
+    if args.shipments:
+        write_shipments(runner, args.shipments, read_dimensions(args.dimensions) if args.dimensions else None)
+    if ledger is not None:
+        ledger.save(args.receivables)
+        print(f"Receivables: {len(ledger)} invoices in {args.receivables}", file=sys.stderr)
+    if render_cache is not None:
+        stats = render_cache.stats()
+        print(f"Render cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%}), "
+              f"{stats['entries']} entries, {stats['evictions']} evicted", file=sys.stderr)
+    if profiler is not None:
+        profiler.write(args.profile)
+        print(profiler.format_table(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
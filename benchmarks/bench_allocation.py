@@ -0,0 +1,95 @@
+"""Batch stock allocation: the allocation engine against a plain per-order loop.
+
+Checks that the engine makes the same decisions as the loop first. Run from
+the repository root:
+    python -m benchmarks.bench_allocation [number of orders] [number of SKUs]
+"""
+import random
+import sys
+import time
+from allocation import AllocationEngine, BillOfMaterials, due_in_days
+from models import Inquiry, OrderLine
+from policies import SUFFICIENT, INSUFFICIENT
+
+
+def sample_batch(orders, skus, seed=11):
+    """Orders over ``skus`` SKUs; a few hundred popular SKUs are short of stock."""
+    rng = random.Random(seed)
+    names = [f"SKU-{i:06d}" for i in range(skus)]
+    popular = names[:300]
+    stock = {name: rng.randint(0, 40) if name in popular else rng.randint(50, 500) for name in names}
+    bom = BillOfMaterials({name: {f"RM-{i % 50}": 2, f"RM-{50 + i % 7}": 1}
+                           for i, name in enumerate(popular) if i % 3})
+    raw = {f"RM-{i}": rng.randint(200, 2000) for i in range(57)}
+    deliveries = ["Needed within 2 weeks", "Needed within 4 weeks", "Needed within 10 days", ""]
+    batch = []
+    for n in range(orders):
+        lines = []
+        for _ in range(rng.randint(1, 4)):
+            sku = rng.choice(popular) if rng.random() < 0.1 else rng.choice(names)
+            lines.append(OrderLine(sku, sku, rng.randint(1, 20)))
+        batch.append(Inquiry(f"INQ-{n}", f"Customer {n % 700}", tuple(lines), rng.choice(deliveries)))
+    return batch, stock, bom, raw
+
+
+def loop_allocation(batch, stock, bom, raw, priority):
+    """Reference: every order in priority order, one at a time."""
+    stock, raw = dict(stock), dict(raw)
+    order = sorted(range(len(batch)), key=lambda i: (-priority(batch[i]), due_in_days(batch[i].delivery), i))
+    decisions = [None] * len(batch)
+    for i in order:
+        wanted = {}
+        for product in batch[i].products:
+            wanted[product.id] = wanted.get(product.id, 0) + product.quantity
+        short = {sku: quantity - stock.get(sku, 0) for sku, quantity in wanted.items()
+                 if stock.get(sku, 0) < quantity}
+        if not short:
+            for sku, quantity in wanted.items():
+                stock[sku] -= quantity
+            decisions[i] = (SUFFICIENT, None)
+            continue
+        need = {}
+        for sku, missing in short.items():
+            if bom.get(sku) is None:
+                need = None
+                break
+            for component, per_unit in bom.get(sku).items():
+                need[component] = need.get(component, 0) + per_unit * missing
+        if need is None or any(raw.get(c, 0) < q for c, q in need.items()):
+            decisions[i] = (INSUFFICIENT, INSUFFICIENT)
+            continue
+        for component, quantity in need.items():
+            raw[component] -= quantity
+        for sku, quantity in wanted.items():
+            stock[sku] = max(stock.get(sku, 0) - quantity, 0)
+        decisions[i] = (INSUFFICIENT, SUFFICIENT)
+    return decisions
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    batch, stock, bom, raw = sample_batch(orders, skus)
+    vip = {f"Customer {n}" for n in range(0, 700, 10)}
+
+    def priority(inquiry):
+        return 1 if inquiry.customer in vip else 0
+
+    start = time.perf_counter()
+    engine = AllocationEngine(stock, bom, raw)
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    allocation = engine.allocate(batch, priority)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = loop_allocation(batch, stock, bom, raw, priority)
+    loop = time.perf_counter() - start
+    assert allocation.decisions == expected
+    print("decisions are identical to the per-order loop")
+    print(f"{orders:,} orders, {skus:,} SKUs: engine {elapsed:.2f}s (+{setup:.2f}s setup), "
+          f"loop {loop:.2f}s - {allocation.summary()}")
+
+
+if __name__ == "__main__":
+    main()
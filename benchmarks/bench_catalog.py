@@ -0,0 +1,68 @@
+"""Catalog lookup latency at catalog scale.
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog [number of SKUs]
+"""
+import random
+import sys
+import time
+from catalog import CatalogItem, ProductCatalog
+
+SERIES = ["Deluxe", "Professional", "Urban", "Trail", "Gravel", "Race", "City", "Cargo", "Junior", "Comfort"]
+TYPES = ["Touring", "Mountain", "Road", "Hybrid", "Folding", "Cruiser", "Fitness", "Trekking"]
+COLORS = ["Black", "Red", "Blue", "White", "Green", "Silver", "Orange", "Yellow",
+          "Grey", "Purple", "Matte Black", "Petrol"]
+
+
+def synthetic_catalog(size: int, seed: int = 7) -> ProductCatalog:
+    rng = random.Random(seed)
+    catalog = ProductCatalog()
+    i = 0
+    model = 100
+    while i < size:
+        for series in SERIES:
+            for kind in TYPES:
+                name = f"{series} {kind} Bike {kind[0]}-{model}"
+                for color in COLORS:
+                    if i == size:
+                        return catalog
+                    catalog.add(CatalogItem(
+                        f"{series[:2].upper()}{kind[0]}-{model}-{color[:3].upper()}{i}", name, color,
+                        round(rng.uniform(300, 6000), 2),
+                        f"Warehouse {rng.choice('ABCD')}, Aisle {rng.randint(1, 40)}, Rack {rng.randint(1, 20)}",
+                        rng.randint(0, 200)))
+                    i += 1
+        model += 1
+    return catalog
+
+
+def timed(label, queries, fn):
+    start = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / len(queries) * 1e6:>10.1f} us/lookup")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    start = time.perf_counter()
+    catalog = synthetic_catalog(size)
+    print(f"built {len(catalog):,} SKUs in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    items = [catalog[sku] for sku in rng.sample(list(catalog), 2000)]
+    exact = [(f"{item.name}s", item.color) for item in items]
+    tokens = [(item.name.replace("Bike ", "").replace("-", " "), item.color) for item in items]
+    typos = [(item.name.replace("e", "", 1).replace("Bike", "Bkie"), item.color) for item in items]
+
+    timed("by SKU", [(item.sku,) for item in items], catalog.get)
+    timed("exact name + color", exact, catalog.resolve)
+    timed("token/color index", tokens, catalog.resolve)
+    timed("fuzzy (misspelt) name", typos, catalog.resolve)
+    hits = sum(catalog.resolve(*query) == item.sku for query, item in zip(typos, items))
+    print(f"misspelt names resolved to the right SKU: {hits}/{len(items)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Document rendering speed: previous DocumentGenerator against the templates.
+
+Checks that every document is byte-identical to the previous implementation
+first. Run from the repository root:
+    python -m benchmarks.bench_documents [number of orders]
+"""
+import random
+import sys
+import time
+from datetime import datetime
+from catalog import ProductCatalog
+from documents import DocumentGenerator
+from models import Inquiry
+from money import format_cents, to_cents
+
+
+class LegacyDocumentGenerator:
+    """DocumentGenerator as it was before the templates, for comparison."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def _price(self, product, default):
+        item = self.catalog.get(product['id'])
+        return item.price if item is not None else product.get('price', default)
+
+    def generate_inquiry_document(self, inquiry_data):
+        customer = inquiry_data.get("customer", "")
+        products = inquiry_data.get("products", [])
+        date = datetime.now()
+        doc_number = f"INQ-{date.strftime('%Y%m%d')}-{customer[:3].upper()}"
+        document = [
+            "SALES INQUIRY DOCUMENT", "---------------------",
+            f"Date: {date.strftime('%d/%m/%Y')}", f"Inquiry Number: {doc_number}\n",
+            "1. Customer Details:", f"   Company Name: {customer}",
+            "   Contact Person: Not provided", "   Delivery Address: Not provided\n",
+            "2. Product Details:"
+        ]
+        for i, product in enumerate(products, 1):
+            document.extend([
+                f"\n   Item {i}:", f"   Product ID: {product['id']}",
+                f"   Description: {product['name']}", f"   Exact Quantity: {product['quantity']}",
+                f"   Unit Price in EUR: {self._price(product, 'To be confirmed')}",
+                f"   Total Price Per Item: {product.get('total_price', 'To be confirmed')}"
+            ])
+        prices = [self._price(product, None) for product in products]
+        if None in prices:
+            total = "To be confirmed"
+        else:
+            total = format_cents(sum(to_cents(price) * product['quantity']
+                                     for price, product in zip(prices, products))) + " EUR"
+        document.extend([
+            f"\n3. Delivery Requirements: {inquiry_data.get('delivery', '')}",
+            f"\n4. Special Requirements: {inquiry_data.get('special_requirements', '')}",
+            f"\n5. Total Order Value: {total}", "\n---------------", "System Update:",
+            "- Customer details verified in database", "- Price list checked for all products",
+            "- Product specifications verified"
+        ])
+        return "\n".join(document)
+
+    def generate_inventory_document(self, inquiry_data, inventory_data):
+        document = ["INVENTORY CHECK DOCUMENT", "----------------------",
+                    f"Order Reference: {inquiry_data.get('doc_number', 'Unknown')}\n",
+                    "Product Information:"]
+        for i, product in enumerate(inquiry_data.get("products", []), 1):
+            stock = inventory_data.get(product['id'], {})
+            document.extend([
+                f"\n   {i}.", f"   - Product ID: {product['id']}",
+                f"   - Requested quantity: {product['quantity']}",
+                f"   - Available quantity: {stock.get('quantity', 0)}",
+                f"   - Storage location: {stock.get('location', 'Not found')}"
+            ])
+        # Worded as the generator now words an inventory check without a reservation
+        document.extend(["\nSystem Update:", "- Stock levels checked in warehouse system",
+                         "- Available quantities checked, not reserved", "- Stock locations verified"])
+        return "\n".join(document)
+
+    def generate_picking_document(self, inquiry_data, inventory_data):
+        date = datetime.now()
+        document = [
+            "PICKING TICKET", "-------------",
+            f"Ticket Number: PICK-{date.strftime('%Y%m%d')}-{inquiry_data['doc_number']}",
+            f"Date: {date.strftime('%d/%m/%Y')}\n", "Customer Details:",
+            f"Company Name: {inquiry_data['customer']}", "Contact Person: Not provided",
+            "Delivery Address: Not provided\n", "Items to Pick:"
+        ]
+        for i, product in enumerate(inquiry_data.get("products", []), 1):
+            stock = inventory_data.get(product['id'], {})
+            document.extend([
+                f"\n{i}. {product['name']}", f"   - Product ID: {product['id']}",
+                f"   - Quantity: {product['quantity']}",
+                f"   - Location: {stock.get('location', 'Not found')}",
+                "   - Quality Check Required: Yes", "   - Handle with Care"
+            ])
+        return "\n".join(document)
+
+    def generate_shipping_documents(self, inquiry_data, picking_data):
+        date = datetime.now()
+        doc_number = f"SHIP-{date.strftime('%Y%m%d')}-{inquiry_data['doc_number']}"
+        documents = ["PACKING SLIP", "-----------", f"Slip Number: {doc_number}",
+                     f"Date: {date.strftime('%d/%m/%Y')}", f"Customer: {inquiry_data['customer']}\n",
+                     "Items Packed:"]
+        for i, product in enumerate(inquiry_data['products'], 1):
+            documents.extend([f"\n{i}. {product['name']}", f"   - Product ID: {product['id']}",
+                              f"   - Quantity: {product['quantity']}", "   - Quality Check: Completed"])
+        documents.extend(["\n\nBILL OF LADING", "-------------", f"B/L Number: {doc_number}",
+                          f"Date: {date.strftime('%d/%m/%Y')}", "Shipper: Our Company",
+                          f"Consignee: {inquiry_data['customer']}", "Terms: EXW", "Carrier: To be assigned"])
+        return "\n".join(documents)
+
+    def generate_billing_documents(self, inquiry_data, shipping_data):
+        date = datetime.now()
+        documents = [
+            "SALES INVOICE", "-------------",
+            f"Invoice Number: INV-{date.strftime('%Y%m%d')}-{inquiry_data['doc_number']}",
+            f"Date: {date.strftime('%d/%m/%Y')}", f"Customer: {inquiry_data['customer']}\n",
+            "Items:", "-" * 60, "Product                  Quantity    Unit Price    Total", "-" * 60
+        ]
+        total = 0
+        for product in inquiry_data['products']:
+            price = float(self._price(product, 0))
+            line_total = price * product['quantity']
+            total += line_total
+            documents.append(
+                f"{product['name'][:20]:<20} {product['quantity']:>10} {price:>12.2f} {line_total:>10.2f}")
+        documents.extend(["-" * 60, f"Total (excluding tax): {total:>33.2f} EUR",
+                          "\nPayment Terms: 30 days", "Please include invoice number in payment reference"])
+        return "\n".join(documents)
+
+
+def sample_orders(count, catalog, seed=3):
+    rng = random.Random(seed)
+    skus = list(catalog)
+    customers = ["BikeWorld GmbH", "Velo {Shop}", "Rad & Tour AG", "X", "Zweirad-Center Nord"]
+    orders = []
+    for n in range(count):
+        customer = rng.choice(customers)
+        products = []
+        for _ in range(rng.randint(1, 6)):
+            item = catalog[rng.choice(skus)]
+            products.append({'id': item.sku, 'name': f"{item.name}s in {item.color}",
+                             'quantity': rng.randint(1, 120), 'price': item.price})
+        products.append({'id': 'UNKNOWN-1', 'name': 'Unlisted part', 'quantity': 1})
+        orders.append({"doc_number": f"INQ-20240101-{customer[:3].upper()}", "customer": customer,
+                       "products": products, "delivery": "Needed within 4 weeks",
+                       "special_requirements": "All bikes must include standard warranty"})
+    return orders
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    catalog = ProductCatalog.sample()
+    legacy = LegacyDocumentGenerator(catalog)
+    generator = DocumentGenerator(catalog)
+    orders = sample_orders(count, catalog)
+    # parse_inquiry produces Inquiry objects; the previous generator read dicts
+    inquiries = [Inquiry.from_dict(order) for order in orders]
+
+    calls = {
+        "inquiry": lambda g, o: g.generate_inquiry_document(o),
+        "inventory": lambda g, o: g.generate_inventory_document(o, catalog),
+        "picking": lambda g, o: g.generate_picking_document(o, catalog),
+        "shipping": lambda g, o: g.generate_shipping_documents(o, {}),
+        "billing": lambda g, o: g.generate_billing_documents(o, {}),
+    }
+    for kind, call in calls.items():
+        for order, inquiry in zip(orders[:2000], inquiries):
+            assert call(legacy, order) == call(generator, inquiry) == call(generator, order), kind
+        assert generator.render_many(kind, inquiries[:50], catalog) == "\n\n".join(
+            call(legacy, order) for order in orders[:50]), kind
+    print("output is byte-identical to the previous implementation")
+
+    def best_of(fn, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    for kind, call in calls.items():
+        before = best_of(lambda: [call(legacy, order) for order in orders])
+        after = best_of(lambda: [call(generator, inquiry) for inquiry in inquiries])
+        bulk = best_of(lambda: generator.render_many(kind, inquiries, catalog))
+        print(f"{kind:<10} previous {count / before:>9,.0f}/s  templates {count / after:>9,.0f}/s "
+              f"({before / after:.1f}x)  render_many {count / bulk:>9,.0f}/s ({before / bulk:.1f}x)")
+
+if __name__ == "__main__":
+    main()
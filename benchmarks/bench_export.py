@@ -0,0 +1,82 @@
+"""Document export: PDF, JSON and CSV throughput in one process and on the export pool.
+
+Checks the structure of every exported PDF and the line items and totals of
+the JSON invoices first. Run from the repository root:
+    python -m benchmarks.bench_export [number of orders] [worker processes]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from benchmarks.bench_documents import sample_orders
+from catalog import ProductCatalog
+from documents import DocumentGenerator
+from export import FORMATS, ExportSink, export_batch
+from models import Inquiry
+
+
+def check_pdf(data):
+    """Every cross-reference entry points at its object, and startxref at the table."""
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    start = int(data[data.rindex(b"startxref"):].split()[1])
+    table = data[start:data.index(b"trailer", start)].split(b"\n")
+    assert table[0] == b"xref"
+    for number, entry in enumerate(table[3:-1], 1):
+        assert data.startswith(b"%d 0 obj" % number, int(entry[:10])), number
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+    catalog = ProductCatalog.sample()
+    generator = DocumentGenerator(catalog)
+    inquiries = [Inquiry.from_dict(order) for order in sample_orders(count, catalog)]
+    orders = []
+    for inquiry in inquiries:
+        texts, data = {}, {}
+        for kind in ("picking", "shipping", "billing"):
+            texts[kind], number = generator.generate_numbered(kind, inquiry, catalog if kind == "picking" else None)
+            data[kind] = generator.document_record(kind, inquiry, number, catalog if kind == "picking" else None)
+        orders.append((texts, data))
+    documents = [(index, kind, text, data[kind]) for index, (texts, data) in enumerate(orders)
+                 for kind, text in texts.items()]
+
+    with tempfile.TemporaryDirectory() as directory:
+        sample = [document for document in documents if document[0] < 500]
+        export_batch(directory, FORMATS, 1, sample)
+        for root, _, files in os.walk(os.path.join(directory, "pdf")):
+            for name in files:
+                with open(os.path.join(root, name), "rb") as f:
+                    check_pdf(f.read())
+        with open(os.path.join(directory, "json", "billing-000001.jsonl"), encoding="utf-8") as f:
+            invoices = [json.loads(line) for line in f]
+        assert [[item["product_id"] for item in invoice["items"]] for invoice in invoices] == \
+            [[product.id for product in inquiry.products] for inquiry in inquiries[:500]]
+        assert all(invoice["total_cents"] == sum(item["line_cents"] for item in invoice["items"])
+                   for invoice in invoices)
+        print(f"{len(sample):,} exported documents checked")
+
+    print(f"{count:,} orders, {len(documents):,} documents (picking ticket, packing slip + B/L, invoice)")
+    for format in FORMATS:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            for batch, first in enumerate(range(0, len(documents), 3000), 1):
+                export_batch(directory, (format,), batch, documents[first:first + 3000])
+            elapsed = time.perf_counter() - start
+        print(f"{format:<5} one process   {len(documents) / elapsed:>9,.0f} documents/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        with ExportSink(directory, workers=workers) as sink:
+            for index, (texts, data) in enumerate(orders):
+                sink.add(index, "", texts, data)
+        elapsed = time.perf_counter() - start
+    rate = count / elapsed
+    print(f"all   {workers} workers     {sink.documents_written / elapsed:>9,.0f} documents/s "
+          f"({sink.files_written:,} files): 1,000,000 orders in {1_000_000 / rate / 60:,.0f} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Incremental re-processing: one price or location update against rerunning every order.
+
+Checks that the regenerated documents equal those of a full rerun first. Run
+from the repository root:
+    python -m benchmarks.bench_incremental [number of orders] [number of SKUs]
+"""
+import sys
+import time
+from benchmarks.bench_catalog import synthetic_catalog
+from incremental import OrderBook
+from policies import get_policy
+from process_manager import ProcessManager
+from workload import Workload
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    catalog = synthetic_catalog(skus)
+    texts = list(Workload(catalog, customers=500, seed=5).inquiries(count))
+    policy = get_policy("sufficient")
+    # Numbers derived from the inquiries, so that regenerated documents can be compared with a rerun's
+    book = OrderBook(ProcessManager(verbose=False, catalog=catalog, numbering=False))
+    start = time.perf_counter()
+    for text in texts:
+        book.process(text, policy)
+    full = time.perf_counter() - start
+
+    # The SKU on the most orders
+    hot = max(catalog, key=lambda sku: len(book.affected(sku)))
+    item = catalog[hot]
+    start = time.perf_counter()
+    repriced = book.update(hot, price=round(item.price * 1.1, 2))
+    price_update = time.perf_counter() - start
+    start = time.perf_counter()
+    moved = book.update(hot, location="Warehouse D, Aisle 40, Rack 20")
+    location_update = time.perf_counter() - start
+
+    rerun = OrderBook(ProcessManager(verbose=False, catalog=catalog, numbering=False))
+    for text in texts:
+        rerun.process(text, policy)
+    # The inquiry document keeps the price quoted before the update
+    for key, result in book.orders.items():
+        documents = rerun.orders[key]["documents"]
+        assert all(text == documents[kind] for kind, text in result["documents"].items() if kind != "inquiry")
+    print(f"documents after the updates are identical to a full rerun ({book.regenerated:,} regenerated)")
+
+    print(f"{count:,} orders over {skus:,} SKUs: full run {full:.2f}s")
+    print(f"price of {hot} ({len(repriced):,} orders)     {price_update * 1000:>8.1f} ms "
+          f"({full / price_update:,.0f}x faster than a rerun)")
+    print(f"location of {hot} ({len(moved):,} orders)  {location_update * 1000:>8.1f} ms "
+          f"({full / location_update:,.0f}x faster than a rerun)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Memory per order: parsed inquiries as dicts, as Inquiry objects and as an OrderBatch.
+
+The dicts are what the parser produced before models.py, one dict per order
+and per product line with their own strings. Run from the repository root:
+    python -m benchmarks.bench_models [number of orders]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from inquiry_parser import InquiryParser
+from models import OrderBatch
+from process_manager import ProcessManager
+
+PRODUCTS = ("Deluxe Touring Bikes in Black", "Professional Touring Bikes in Red")
+DELIVERIES = ("Needed within 4 weeks", "Needed within 2 weeks", "Express delivery")
+
+
+def sample_texts(count, seed=9):
+    rng = random.Random(seed)
+    customers = [f"Customer {i} GmbH" for i in range(2000)]
+    texts = []
+    for _ in range(count):
+        lines = [f"Customer: {rng.choice(customers)}", "Products requested:"]
+        for product in rng.sample(PRODUCTS, rng.randint(1, 2)):
+            lines.append(f"- {rng.randint(1, 60)} {product}")
+        lines.append(f"Delivery: {rng.choice(DELIVERIES)}")
+        lines.append("Special requirements: All bikes must include standard warranty")
+        texts.append("\n".join(lines))
+    return texts
+
+
+def as_legacy_dict(inquiry):
+    """The old representation, with fresh strings as the old parser built them."""
+    return {
+        "doc_number": "".join(inquiry.doc_number),
+        "customer": "".join(inquiry.customer),
+        "products": [{'id': "".join(p.id), 'name': "".join(p.name),
+                      'quantity': p.quantity, 'price': p.price} for p in inquiry.products],
+        "delivery": "".join(inquiry.delivery),
+        "special_requirements": "".join(inquiry.special_requirements)
+    }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, size, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    parser = InquiryParser(ProcessManager(verbose=False).inventory)
+    texts = sample_texts(count)
+    reference = [parser.parse(text) for text in texts[:1000]]
+
+    # Copy the strings, otherwise the dicts would share the parser's interned ones
+    dicts, dict_bytes, _ = measure(
+        lambda: [as_legacy_dict(inquiry) for inquiry in map(parser.parse, texts)])
+    assert dicts[:1000] == [inquiry.to_dict() for inquiry in reference]
+    del dicts
+    parser = InquiryParser(ProcessManager(verbose=False).inventory)
+    inquiries, object_bytes, parse_time = measure(lambda: [parser.parse(text) for text in texts])
+    batch, batch_bytes, _ = measure(lambda: OrderBatch(inquiries))
+    assert list(batch[i] for i in range(1000)) == reference
+    del inquiries
+
+    print(f"{count:,} orders")
+    print(f"dicts          {dict_bytes / count:8.0f} bytes/order")
+    print(f"Inquiry        {object_bytes / count:8.0f} bytes/order ({dict_bytes / object_bytes:.1f}x less), "
+          f"parsed at {count / parse_time:,.0f}/s")
+    print(f"OrderBatch     {batch_bytes / count:8.0f} bytes/order ({dict_bytes / batch_bytes:.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Parser throughput: the original parse_inquiry against InquiryParser.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser [number of inquiries]
+"""
+import sys
+import time
+from datetime import datetime
+from inquiry_parser import InquiryParser
+from process_manager import ProcessManager
+
+SAMPLE = """Customer: BikeWorld GmbH
+Products requested:
+- 30 Deluxe Touring Bikes in Black
+- 20 Professional Touring Bikes in Red
+Delivery: Needed within 4 weeks
+Special requirements: All bikes must include standard warranty
+"""
+
+
+def legacy_parse_inquiry(inventory, inquiry_text):
+    """ProcessManager.parse_inquiry as it was before the compiled parser."""
+    lines = [line.strip() for line in inquiry_text.split('\n') if line.strip()]
+    customer = lines[0].replace('Customer:', '').strip()
+    date = datetime.now()
+    doc_number = f"INQ-{date.strftime('%Y%m%d')}-{customer[:3].upper()}"
+    products = []
+    for line in lines:
+        if line.startswith('-'):
+            parts = line.replace('-', '').strip().split()
+            quantity = int(parts[0])
+            name = ' '.join(parts[1:-2])
+            color = parts[-1]
+            if 'Deluxe' in name:
+                product_id = 'DTB-2024-BLK'
+            else:
+                product_id = 'PTB-2024-RED'
+            products.append({
+                'id': product_id,
+                'name': f"{name} in {color}",
+                'quantity': quantity,
+                'price': inventory[product_id]['price']
+            })
+    delivery = next((line.replace('Delivery:', '').strip()
+                    for line in lines if line.startswith('Delivery:')), '')
+    special_reqs = next((line.replace('Special requirements:', '').strip()
+                       for line in lines if line.startswith('Special')), '')
+    return {
+        "doc_number": doc_number,
+        "customer": customer,
+        "products": products,
+        "delivery": delivery,
+        "special_requirements": special_reqs
+    }
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {count / elapsed:>12,.0f} inquiries/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    inventory = ProcessManager(verbose=False).inventory
+    parser = InquiryParser(inventory)
+    texts = [SAMPLE] * count
+    dump = (SAMPLE + "\n") * count
+    assert parser.parse(SAMPLE).to_dict() == legacy_parse_inquiry(inventory, SAMPLE)
+
+    legacy = timed("legacy parse_inquiry", count,
+                   lambda: [legacy_parse_inquiry(inventory, text) for text in texts])
+    compiled = timed("InquiryParser.parse", count,
+                     lambda: [parser.parse(text) for text in texts])
+    streamed = timed("InquiryParser.parse_stream", count,
+                     lambda: sum(1 for _ in parser.parse_stream(dump.splitlines())))
+    print(f"speedup: parse {legacy / compiled:.2f}x, parse_stream {legacy / streamed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
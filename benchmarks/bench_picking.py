@@ -0,0 +1,63 @@
+"""Pick planning: walk distance of one ticket per order against routed pick waves.
+
+Run from the repository root:
+    python -m benchmarks.bench_picking [number of orders] [number of SKUs]
+"""
+import random
+import sys
+import time
+from benchmarks.bench_catalog import synthetic_catalog
+from documents import DocumentGenerator
+from models import Inquiry, OrderLine
+from picking import PickPlanner, ticket_distance, walk_distance
+
+
+def sample_orders(count, catalog, seed=13):
+    rng = random.Random(seed)
+    skus = list(catalog)
+    # A fast-moving fifth of the range gets most of the demand
+    fast = skus[:len(skus) // 5]
+    orders = []
+    for n in range(count):
+        lines = []
+        for _ in range(rng.randint(1, 5)):
+            sku = rng.choice(fast) if rng.random() < 0.7 else rng.choice(skus)
+            item = catalog[sku]
+            lines.append(OrderLine(sku, f"{item.name}s in {item.color}", rng.randint(1, 12), item.price))
+        orders.append(Inquiry(f"INQ-{n:06d}", f"Customer {n % 400}", tuple(lines)))
+    return orders
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    skus = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    catalog = synthetic_catalog(skus)
+    orders = sample_orders(count, catalog)
+    planner = PickPlanner(catalog)
+    generator = DocumentGenerator(catalog)
+
+    start = time.perf_counter()
+    waves = planner.plan(orders)
+    planning = time.perf_counter() - start
+    start = time.perf_counter()
+    tickets = [generator.generate_wave_ticket(wave) for wave in waves]
+    rendering = time.perf_counter() - start
+
+    assert sum(len(wave.orders) for wave in waves) == count
+    assert sum(stop.quantity for wave in waves for stop in wave.stops) == \
+        sum(product.quantity for order in orders for product in order.products)
+
+    per_order = ticket_distance(orders, planner)
+    # The same waves, walked with the lines in the order they appear in the orders
+    unrouted = sum(walk_distance(planner.locate(product.id)[0] for order in wave.orders
+                                 for product in order.products) for wave in waves)
+    routed = sum(wave.distance for wave in waves)
+    print(f"{count:,} orders over {skus:,} SKUs -> {len(waves):,} waves: planned in {planning:.3f}s, "
+          f"{len(tickets):,} tickets rendered in {rendering:.3f}s")
+    print(f"walk per order ticket   {per_order / 1000:>10,.1f} km")
+    print(f"waves, inquiry order    {unrouted / 1000:>10,.1f} km ({per_order / unrouted:.1f}x less)")
+    print(f"waves, S-shape route    {routed / 1000:>10,.1f} km ({per_order / routed:.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
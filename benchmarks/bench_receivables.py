@@ -0,0 +1,152 @@
+"""Payment matching: a bank statement of N payments against N open invoices.
+
+Invoice totals repeat (list prices times round quantities), so thousands of
+open invoices share an amount. Payers mangle the invoice number
+("inv 20240101 bik 00000042"), mistype a digit, pay part of an invoice,
+leave the reference out or send money for no invoice at all. Payments
+without a reference from a customer with several open invoices of the
+amount are left unmatched rather than guessed. Every matched payment is checked against the invoice it was
+made for, and the CAMT reader against the CSV reader. Run from the
+repository root:
+    python -m benchmarks.bench_receivables [number of invoices]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from string import ascii_uppercase
+from money import format_cents
+from receivables import InvoiceLedger, read_statement
+
+# Share of the payments of each kind
+KINDS = (("reference", 0.80), ("typo", 0.07), ("partial", 0.05), ("payer", 0.05), ("unknown", 0.03))
+
+
+def sample_ledger(count, rng):
+    """Invoices of catalog orders: few distinct totals, as with list prices and round quantities."""
+    ledger = InvoiceLedger()
+    totals = sorted({price * quantity for price in (149900, 249900, 89900, 399900, 1299900)
+                     for quantity in (1, 2, 5, 10, 20, 30, 50, 100, 150, 200)})
+    customers = ["".join(rng.choice(ascii_uppercase) for _ in range(rng.randint(3, 9))) + f" Cycles {i}"
+                 for i in range(5000)]
+    first = date(2024, 1, 1)
+    for n in range(count):
+        issued = first + timedelta(days=n * 365 // count)
+        customer = rng.choice(customers)
+        number = f"INV-{issued:%Y%m%d}-{customer[:3].upper()}-{n:08d}"
+        ledger.record(number, customer, rng.choice(totals), issued)
+    return ledger
+
+
+def mangle(number, rng):
+    style = rng.randrange(4)
+    if style == 0:
+        return number
+    if style == 1:
+        return f"Invoice {number.lower()} thank you"
+    if style == 2:
+        return number.replace("-", " ")
+    return f"RE: {number.replace('-', '')}/{rng.randint(1, 99)}"
+
+
+def mistype(number, rng):
+    digits = [i for i, c in enumerate(number) if c.isdigit()]
+    i = rng.choice(digits[-6:])
+    return number[:i] + str((int(number[i]) + rng.randint(1, 9)) % 10) + number[i + 1:]
+
+
+def sample_payments(ledger, rng):
+    """Payments with the invoice each was made for (None for unknown ones)."""
+    kinds = [kind for kind, _ in KINDS]
+    weights = [share for _, share in KINDS]
+    rows = list(range(len(ledger)))
+    rng.shuffle(rows)
+    payments = []
+    for row in rows:
+        kind = rng.choices(kinds, weights)[0]
+        number, cents = ledger.numbers[row], ledger.cents[row]
+        booked = date.fromordinal(ledger.issued[row]) + timedelta(days=rng.randint(5, 60))
+        payer = ledger.customers[row]
+        if kind == "reference":
+            payments.append((booked, cents, mangle(number, rng), payer, number))
+        elif kind == "typo":
+            payments.append((booked, cents, mistype(number, rng), payer, number))
+        elif kind == "partial":
+            payments.append((booked, cents // 2, mangle(number, rng), payer, number))
+        elif kind == "payer":
+            payments.append((booked, cents, "Payment", payer, number))
+        else:
+            payments.append((booked, rng.randint(100, 1_000_000), "Refund of deposit", "Unknown Ltd", None))
+    return payments
+
+
+def write_csv(path, payments):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["Booking Date", "Amount", "Verwendungszweck", "Auftraggeber"])
+        for booked, cents, reference, payer, _ in payments:
+            writer.writerow([f"{booked:%d.%m.%Y}", format_cents(cents).replace(".", ","), reference, payer])
+
+
+def write_camt(path, payments):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0"?>\n<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">'
+                "<BkToCstmrStmt><Stmt>\n")
+        for booked, cents, reference, payer, _ in payments:
+            f.write(f'<Ntry><Amt Ccy="EUR">{format_cents(cents)}</Amt><CdtDbtInd>CRDT</CdtDbtInd>'
+                    f"<BookgDt><Dt>{booked.isoformat()}</Dt></BookgDt><NtryDtls><TxDtls><RltdPties><Dbtr>"
+                    f"<Nm>{payer}</Nm></Dbtr></RltdPties><RmtInf><Ustrd>{reference}</Ustrd></RmtInf>"
+                    "</TxDtls></NtryDtls></Ntry>\n")
+        f.write("</Stmt></BkToCstmrStmt></Document>\n")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(23)
+    start = time.perf_counter()
+    ledger = sample_ledger(count, rng)
+    recorded = time.perf_counter() - start
+    payments = sample_payments(ledger, rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        statement = os.path.join(directory, "statement.csv")
+        write_csv(statement, payments)
+        start = time.perf_counter()
+        read = list(read_statement(statement))
+        reading = time.perf_counter() - start
+
+        camt = os.path.join(directory, "statement.xml")
+        sample = payments[:min(count, 100_000)]
+        write_camt(camt, sample)
+        start = time.perf_counter()
+        from_camt = list(read_statement(camt))
+        camt_reading = time.perf_counter() - start
+        assert [(p.date, p.cents, p.reference, p.payer) for p in from_camt] == \
+               [(p.date, p.cents, p.reference, p.payer) for p in read[:len(sample)]]
+        print("CAMT and CSV statements read alike")
+
+    start = time.perf_counter()
+    result = ledger.match(read)
+    matching = time.perf_counter() - start
+    start = time.perf_counter()
+    aging = ledger.aging(date(2025, 3, 31))
+    aged = time.perf_counter() - start
+
+    expected = {id(payment): truth[4] for payment, truth in zip(read, payments)}
+    wrong = sum(1 for match in result.matches if expected[id(match.payment)] != match.invoice)
+    missed = sum(1 for payment in result.unmatched if expected[id(payment)] is not None)
+    assert sum(aging.values()) == sum(ledger.cents) - sum(ledger.paid)
+    print(f"{count:,} invoices, {len(read):,} payments: {result.summary()}")
+    print(f"wrong invoice {wrong:,} ({wrong / len(read):.3%}), missed {missed:,} ({missed / len(read):.3%})")
+    print(f"recording invoices        {recorded:8.2f}s")
+    print(f"reading CSV statement     {reading:8.2f}s")
+    print(f"reading CAMT ({len(sample):,})     {camt_reading:8.2f}s")
+    print(f"matching                  {matching:8.2f}s ({len(read) / matching:,.0f} payments/s)")
+    print(f"aging                     {aged:8.3f}s  {aging}")
+
+
+if __name__ == "__main__":
+    main()
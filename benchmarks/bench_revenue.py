@@ -0,0 +1,71 @@
+"""Order value rollups: per-order Python loops against the columnar OrderLines.
+
+Checks the vectorised results against Decimal arithmetic first. Run from the
+repository root:
+    python -m benchmarks.bench_revenue [number of orders]
+"""
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from revenue import OrderLines
+
+
+def sample_orders(count, seed=5):
+    rng = random.Random(seed)
+    skus = [(f"SKU-{i:05d}", round(rng.uniform(99, 4999), 2)) for i in range(2000)]
+    customers = [f"Customer {i}" for i in range(500)]
+    orders = []
+    for n in range(count):
+        products = []
+        for _ in range(rng.randint(1, 6)):
+            sku, price = rng.choice(skus)
+            products.append({'id': sku, 'name': sku, 'quantity': rng.randint(1, 60), 'price': price})
+        orders.append({"doc_number": f"INQ-{n}", "customer": rng.choice(customers), "products": products})
+    return orders
+
+
+def decimal_invoice(order, tax_rate, discount_rate):
+    """Reference: line discounts and per-order tax with Decimal, rounded half up."""
+    cent = Decimal("0.01")
+    net = discount = Decimal(0)
+    for product in order["products"]:
+        line = Decimal(str(product['price'])) * product['quantity']
+        net += line
+        discount += (line * discount_rate).quantize(cent, ROUND_HALF_UP)
+    tax = ((net - discount) * tax_rate).quantize(cent, ROUND_HALF_UP)
+    return int(net * 100), int(discount * 100), int(tax * 100)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    orders = sample_orders(count)
+
+    start = time.perf_counter()
+    lines = OrderLines.from_orders(orders)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    totals = lines.invoice_totals(tax_rate="0.19", discount_rate="0.035")
+    by_customer = lines.revenue_by_customer()
+    by_sku = lines.revenue_by_sku()
+    vectorised = time.perf_counter() - start
+
+    for i in range(0, count, max(1, count // 2000)):
+        expected = decimal_invoice(orders[i], Decimal("0.19"), Decimal("0.035"))
+        assert expected == (totals["net"][i], totals["discount"][i], totals["tax"][i]), i
+    assert sum(by_customer.values()) == sum(by_sku.values()) == int(totals["net"].sum())
+    print("totals match Decimal arithmetic")
+
+    start = time.perf_counter()
+    for order in orders:
+        decimal_invoice(order, Decimal("0.19"), Decimal("0.035"))
+    looped = time.perf_counter() - start
+
+    print(f"{len(lines):,} lines in {count:,} orders")
+    print(f"building columns          {built:8.3f}s")
+    print(f"vectorised totals+rollups {vectorised:8.3f}s")
+    print(f"per-order Decimal loop    {looped:8.3f}s ({looped / vectorised:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
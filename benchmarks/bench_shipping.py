@@ -0,0 +1,64 @@
+"""Shipment planning: pallets and trucks for one shipment per order against consolidated shipments.
+
+Run from the repository root:
+    python -m benchmarks.bench_shipping [number of orders]
+"""
+import random
+import sys
+import time
+from documents import DocumentGenerator
+from models import Inquiry, OrderLine
+from shipping import ShipmentPlanner
+
+
+def sample_orders(count, seed=17):
+    rng = random.Random(seed)
+    skus = [f"SKU-{i:04d}" for i in range(3000)]
+    dimensions = {sku: (rng.choice([140.0, 160.0, 180.0]), rng.choice([20.0, 25.0, 30.0]),
+                        rng.choice([75.0, 85.0, 95.0]), rng.uniform(9, 30)) for sku in skus}
+    deliveries = ["Needed within 2 weeks", "Needed within 4 weeks", "Needed within 6 weeks", ""]
+    orders = []
+    for n in range(count):
+        lines = tuple(OrderLine(sku, sku, rng.randint(1, 25)) for sku in rng.sample(skus, rng.randint(1, 4)))
+        orders.append(Inquiry(f"INQ-{n:06d}", f"Customer {rng.randint(1, 8000)}", lines,
+                              rng.choice(deliveries)))
+    return orders, dimensions
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    orders, dimensions = sample_orders(count)
+    planner = ShipmentPlanner(dimensions)
+
+    start = time.perf_counter()
+    plan = planner.plan(orders)
+    planning = time.perf_counter() - start
+    generator = DocumentGenerator()
+    start = time.perf_counter()
+    documents = [generator.generate_consolidated_shipping(shipment) for shipment in plan.shipments]
+    rendering = time.perf_counter() - start
+
+    units = sum(product.quantity for order in orders for product in order.products)
+    packed = sum(n for shipment in plan.shipments for pallet in shipment.pallets for n in pallet.contents.values())
+    assert packed == units
+    for truck in plan.trucks:
+        assert truck.pallets <= planner.truck_pallets and truck.weight <= planner.truck_kg
+    for shipment in plan.shipments:
+        for pallet in shipment.pallets:
+            assert len(pallet.contents) == 1 or (pallet.volume <= planner.pallet_volume
+                                                 and pallet.weight <= planner.pallet_kg)
+
+    # Every order shipped on its own, as with one packing slip per order
+    single = ShipmentPlanner(dimensions)
+    separate = sum(single.plan([order]).summary()["pallets"] for order in orders[:20_000]) \
+        * count / min(count, 20_000)
+    summary = plan.summary()
+    print(f"{count:,} orders -> {summary['shipments']:,} shipments, {summary['pallets']:,} pallets, "
+          f"{summary['trucks']:,} trucks: planned in {planning:.2f}s, "
+          f"{len(documents):,} packing slips and B/Ls rendered in {rendering:.2f}s")
+    print(f"pallets with one shipment per order: {separate:,.0f} "
+          f"({separate / summary['pallets']:.2f}x the consolidated plan)")
+
+
+if __name__ == "__main__":
+    main()
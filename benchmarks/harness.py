@@ -0,0 +1,170 @@
+"""Benchmark harness: throughput, latency and memory of every stage against a stored baseline.
+
+Runs a seeded synthetic workload (``workload.Workload``) through the parser,
+each DocumentGenerator method and the whole sales process, one call at a
+time. Every stage reports calls per second, latency percentiles and the
+peak memory allocated while its results are kept, and is compared with
+the baseline file. A stage regresses if its throughput falls, or its p99
+latency or peak memory rises, by more than the tolerance; the harness then
+exits with status 1. Tail latencies of a few microseconds are noisy, so p99
+has its own, looser tolerance. Run from the repository root:
+    python -m benchmarks.harness [--count N] [--save-baseline]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from time import perf_counter_ns
+from benchmarks.bench_catalog import synthetic_catalog
+from instrumentation import Profiler
+from policies import get_policy
+from process_manager import ProcessManager
+from workload import Workload
+
+BASELINE = "benchmarks/baseline.json"
+# Compared per stage: (metric, higher is better, latency metric)
+METRICS = (("per_second", True, False), ("p99_ms", False, True), ("peak_kib", False, False))
+
+
+def stages(count, skus, malformed, seed):
+    """(stage, call, arguments per call) for every measured stage."""
+    catalog = synthetic_catalog(skus)
+    texts = list(Workload(catalog, customers=500, malformed=malformed, seed=seed).inquiries(count))
+    manager = ProcessManager(verbose=False, catalog=catalog)
+    inquiries = []
+    for text in texts:
+        try:
+            inquiries.append(manager.parse_inquiry(text))
+        except (ValueError, LookupError):
+            pass
+    generator = manager.doc_generator
+    policy = get_policy("stock")
+    return [
+        ("parse", manager.parse_inquiry, [(text,) for text in texts]),
+        ("inquiry", generator.generate_inquiry_document, [(inquiry,) for inquiry in inquiries]),
+        ("inventory", generator.generate_inventory_document, [(inquiry, catalog) for inquiry in inquiries]),
+        ("picking", generator.generate_picking_document, [(inquiry, catalog) for inquiry in inquiries]),
+        ("shipping", generator.generate_shipping_documents, [(inquiry, {}) for inquiry in inquiries]),
+        ("billing", generator.generate_billing_documents, [(inquiry, {}) for inquiry in inquiries]),
+        ("end_to_end", manager.process_sales_inquiry, [(text, policy) for text in texts]),
+    ]
+
+
+def measure(name, call, calls, repeat):
+    """Time every call, keeping the fastest of ``repeat`` passes, then run them under tracemalloc."""
+    fastest = None
+    for _ in range(repeat):
+        profiler = Profiler()
+        record = profiler.record
+        results = []
+        start = time.perf_counter()
+        for args in calls:
+            began = perf_counter_ns()
+            try:
+                results.append(call(*args))
+            except (ValueError, LookupError) as e:
+                results.append(e)
+            record(name, perf_counter_ns() - began)
+        elapsed = time.perf_counter() - start
+        if fastest is None or elapsed < fastest[0]:
+            fastest = elapsed, profiler
+        del results
+    elapsed, profiler = fastest
+    latency = profiler.report()["stages"][name]
+
+    tracemalloc.start()
+    results = []
+    for args in calls:
+        try:
+            results.append(call(*args))
+        except (ValueError, LookupError) as e:
+            results.append(e)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {"calls": len(calls), "per_second": round(len(calls) / elapsed)}
+    result.update({key: round(latency[key], 4) for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")})
+    result["peak_kib"] = round(peak / 1024)
+    return result
+
+
+def compare(current, baseline, tolerance, latency_tolerance):
+    """Lines comparing every stage with the baseline, and whether any of them regressed."""
+    lines, regressed = [], False
+    for stage, result in current.items():
+        before = baseline.get(stage)
+        if before is None:
+            continue
+        notes = []
+        for metric, higher_is_better, latency in METRICS:
+            if not before.get(metric):
+                continue
+            allowed = latency_tolerance if latency else tolerance
+            ratio = result[metric] / before[metric]
+            worse = ratio < 1 - allowed if higher_is_better else ratio > 1 + allowed
+            regressed |= worse
+            notes.append(f"{metric} {ratio:.2f}x{' REGRESSED' if worse else ''}")
+        lines.append(f"{stage:<11} " + ", ".join(notes))
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20_000, help="Inquiries in the workload")
+    parser.add_argument("--skus", type=int, default=2000, help="SKUs in the synthetic catalog")
+    parser.add_argument("--malformed", type=float, default=0.01, help="Share of malformed inquiries")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Timing passes per stage; the fastest counts")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed change against the baseline before a stage counts as regressed")
+    parser.add_argument("--latency-tolerance", type=float, default=1.0,
+                        help="Allowed rise of the p99 latency against the baseline")
+    parser.add_argument("--output", metavar="PATH", help="Also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, call, calls in stages(args.count, args.skus, args.malformed, args.seed):
+        results[name] = measure(name, call, calls, args.repeat)
+
+    print(f"{'stage':<11} {'calls':>7} {'per second':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KiB':>9}")
+    for name, result in results.items():
+        print(f"{name:<11} {result['calls']:>7} {result['per_second']:>11,} {result['p50_ms']:>8.4f} "
+              f"{result['p95_ms']:>8.4f} {result['p99_ms']:>8.4f} {result['peak_kib']:>9,}")
+
+    run = {
+        "workload": {"count": args.count, "skus": args.skus, "malformed": args.malformed, "seed": args.seed},
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "stages": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8", newline="\r\n") as f:
+            json.dump(run, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; store one with --save-baseline")
+        return
+    if baseline["workload"] != run["workload"]:
+        print(f"baseline was measured on another workload ({baseline['workload']}); not comparing")
+        return
+    lines, regressed = compare(results, baseline["stages"], args.tolerance, args.latency_tolerance)
+    print(f"against {args.baseline}:")
+    print("\n".join(lines))
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Load test of the HTTP intake service: throughput and latency on loopback.
+
+Starts ``intake.py`` on a synthetic catalog with its stock in SQLite, once
+with micro-batching and once with every order on its own, and sends each
+the same inquiries over many keep-alive connections. Run from the
+repository root:
+    python -m benchmarks.load_intake [requests] [connections]
+"""
+import asyncio
+import csv
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.bench_catalog import synthetic_catalog
+from catalog import COLUMNS
+from workload import Workload
+
+
+def write_catalog(catalog, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for item in catalog.values():
+            writer.writerow([item.sku, item.name, item.color, item.price, item.location, 1_000_000, item.model])
+
+
+async def client(port, texts, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for text in texts:
+            body = text.encode("utf-8")
+            started = time.perf_counter()
+            writer.write(b"POST /inquiries HTTP/1.1\r\nHost: localhost\r\nContent-Type: text/plain\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(re.search(rb"Content-Length: (\d+)", head).group(1))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            status = int(head.split(b" ", 2)[1])
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load(port, texts, connections):
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, texts[i::connections], latencies, statuses) for i in range(connections)))
+    return time.perf_counter() - start, np.array(latencies) * 1000, statuses
+
+
+async def health(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    return response.split(b"\r\n\r\n", 1)[1].decode()
+
+
+def run(directory, label, texts, connections, options):
+    database = os.path.join(directory, f"{label}.db")
+    server = subprocess.Popen([sys.executable, "intake.py", "--port", "0", "--catalog",
+                               os.path.join(directory, "catalog.csv"), "--inventory-db", database,
+                               "--numbering", os.path.join(directory, f"{label}-numbers.db")] + options,
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(re.search(r":(\d+)/", server.stdout.readline()).group(1))
+        elapsed, latencies, statuses = asyncio.run(load(port, texts, connections))
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{label:<12} {len(texts) / elapsed:>8,.0f} requests/s   p50 {p50:6.1f} ms   p95 {p95:6.1f} ms   "
+              f"p99 {p99:6.1f} ms   max {latencies.max():6.1f} ms   status {statuses}")
+        print(f"{'':<12} server: {asyncio.run(health(port))}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    catalog = synthetic_catalog(2000)
+    texts = list(Workload(catalog, customers=500, malformed=0.01, seed=9).inquiries(count))
+    with tempfile.TemporaryDirectory() as directory:
+        write_catalog(catalog, os.path.join(directory, "catalog.csv"))
+        print(f"{count:,} requests over {connections} connections")
+        run(directory, "batched", texts, connections, [])
+        run(directory, "one by one", texts, connections, ["--max-batch", "1", "--max-wait-ms", "0"])
+
+
+if __name__ == "__main__":
+    main()
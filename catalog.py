@@ -0,0 +1,296 @@
+import csv
+import re
+import sqlite3
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from difflib import get_close_matches
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Columns of a catalog CSV file or SQLite table; model is optional
+COLUMNS = ("sku", "name", "color", "price", "location", "quantity", "model")
+
+# Candidates shared by more than this many trigram postings are not worth
+# counting: a query always has rarer trigrams that decide the match
+MAX_POSTINGS = 4000
+MIN_SIMILARITY = 0.4
+
+_WORD = re.compile(r"[a-z0-9]+")
+_DIGITS = re.compile(r"[0-9]+")
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lower-case word tokens with hyphens joined ("T-104" -> "t104") and plurals folded."""
+    tokens = []
+    for token in _WORD.findall(text.lower().replace('-', '')):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def normalize(text: str) -> str:
+    return ' '.join(normalize_tokens(text))
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UnknownProductError(LookupError):
+    """No catalog product matches a product name from an inquiry."""
+
+
+class CatalogItem:
+    """One sellable variant (model and color) of a product.
+
+    Supports ``item['price']`` and ``item.get('location')`` so that it can be
+    used wherever an inventory entry dict is expected.
+    """
+    __slots__ = ("sku", "name", "color", "price", "location", "quantity", "model")
+
+    def __init__(self, sku: str, name: str, color: str, price: float,
+                 location: str, quantity: int = 0, model: str = ""):
+        self.sku = sku
+        self.name = name
+        self.color = color
+        self.price = price
+        self.location = location
+        self.quantity = quantity
+        self.model = model or name
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"CatalogItem({self.sku!r}, {self.name!r}, {self.color!r})"
+
+
+class ProductCatalog(Mapping):
+    """Product master data indexed by SKU, model token, color and name trigrams.
+
+    The catalog is a read-only mapping of SKU -> ``CatalogItem`` and can be
+    used in place of the inventory dict. ``resolve`` turns free-text product
+    names from inquiries into SKUs:
+
+    1. exact (name, color) match after normalisation,
+    2. intersection of the token and color indexes, ranked by similarity,
+    3. trigram search over the distinct model names for misspellings.
+    """
+
+    def __init__(self, items: Iterable[CatalogItem] = ()):
+        self._items: List[CatalogItem] = []
+        self._by_sku: Dict[str, int] = {}
+        self._by_token: Dict[str, Set[int]] = {}
+        self._by_color: Dict[str, Set[int]] = {}
+        self._by_name_color: Dict[Tuple[str, str], int] = {}
+        # Distinct normalised model names, their color variants and trigrams
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._variants: List[Dict[str, int]] = []
+        self._trigrams: Dict[str, array] = {}
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def sample(cls) -> "ProductCatalog":
+        """The two touring bikes of the simulator's sample inventory."""
+        return cls([
+            CatalogItem("DTB-2024-BLK", "Deluxe Touring Bike", "Black", 1500.00,
+                        "Warehouse A, Aisle 12, Rack 3", 45),
+            CatalogItem("PTB-2024-RED", "Professional Touring Bike", "Red", 2500.00,
+                        "Warehouse B, Aisle 10, Rack 5", 30),
+        ])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping]) -> "ProductCatalog":
+        catalog = cls()
+        for row in rows:
+            catalog.add(CatalogItem(
+                row["sku"], row["name"], row["color"], float(row["price"]),
+                row["location"], int(row["quantity"] or 0), row.get("model") or ""
+            ))
+        return catalog
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ProductCatalog":
+        """Load a CSV file with the columns in ``COLUMNS``."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_rows(csv.DictReader(f))
+
+    @classmethod
+    def from_sqlite(cls, path: str, table: str = "products") -> "ProductCatalog":
+        """Load a SQLite table with the columns in ``COLUMNS``."""
+        connection = sqlite3.connect(path)
+        connection.row_factory = sqlite3.Row
+        try:
+            names = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+            columns = ", ".join(c if c in names else f"NULL AS {c}" for c in COLUMNS)
+            rows = connection.execute(f"SELECT {columns} FROM {table}")
+            return cls.from_rows({k: row[k] for k in COLUMNS} for row in rows)
+        finally:
+            connection.close()
+
+    def add(self, item: CatalogItem):
+        """Add a product and index it."""
+        if item.sku in self._by_sku:
+            raise ValueError(f"Duplicate SKU in catalog: {item.sku}")
+        i = len(self._items)
+        self._items.append(item)
+        self._by_sku[item.sku] = i
+
+        name = normalize(item.name)
+        color = normalize(item.color)
+        self._by_name_color[(name, color)] = i
+        self._by_color.setdefault(color, set()).add(i)
+        tokens = set(normalize_tokens(item.name)) | set(normalize_tokens(item.model))
+        # "t104" is also found as "104", for inquiries that write "T 104"
+        tokens.update(digits for token in list(tokens) for digits in _DIGITS.findall(token))
+        for token in tokens:
+            self._by_token.setdefault(token, set()).add(i)
+
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            self._variants.append({})
+            for gram in trigrams(name):
+                self._trigrams.setdefault(gram, array('I')).append(name_id)
+        self._variants[name_id][color] = i
+
+    # Mapping interface: SKU -> CatalogItem
+
+    def update(self, sku: str, price: Optional[float] = None, location: Optional[str] = None,
+               quantity: Optional[int] = None) -> List[str]:
+        """Change the price, storage location or stock level of a SKU; returns the fields that changed.
+
+        The name and color stay, so no index needs rebuilding.
+        """
+        item = self[sku]
+        changed = []
+        for field, value in (("price", price), ("location", location), ("quantity", quantity)):
+            if value is not None and getattr(item, field) != value:
+                setattr(item, field, value)
+                changed.append(field)
+        return changed
+
+    def __getitem__(self, sku: str) -> CatalogItem:
+        return self._items[self._by_sku[sku]]
+
+    def get(self, sku: str, default: Any = None) -> Any:
+        i = self._by_sku.get(sku)
+        return default if i is None else self._items[i]
+
+    def __contains__(self, sku) -> bool:
+        return sku in self._by_sku
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_sku)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # Index lookups
+
+    def by_model(self, token: str) -> List[CatalogItem]:
+        """All variants whose name or model contains a token (e.g. "deluxe", "t104")."""
+        key = normalize(token)
+        return [self._items[i] for i in sorted(self._by_token.get(key, ()))]
+
+    def by_color(self, color: str) -> List[CatalogItem]:
+        return [self._items[i] for i in sorted(self._by_color.get(normalize(color), ()))]
+
+    def _color_key(self, color: str) -> Optional[str]:
+        key = normalize(color)
+        if not key or key in self._by_color:
+            return key
+        close = get_close_matches(key, self._by_color, n=1, cutoff=0.75)
+        return close[0] if close else None
+
+    def _similar_names(self, name: str, limit: int) -> List[Tuple[int, float]]:
+        """Distinct model names ranked by trigram similarity (Dice coefficient)."""
+        grams = trigrams(name)
+        postings = sorted((self._trigrams[g] for g in grams if g in self._trigrams), key=len)
+        if not postings:
+            return []
+        # Count only the rarest trigrams; common ones ("bik") add nothing but time
+        counts = Counter()
+        budget = MAX_POSTINGS
+        for posting in postings:
+            if len(posting) > budget and counts:
+                break
+            counts.update(posting)
+            budget -= len(posting)
+        scored = []
+        for name_id, _ in counts.most_common(limit * 4):
+            other = trigrams(self._names[name_id])
+            scored.append((name_id, 2 * len(grams & other) / (len(grams) + len(other))))
+        scored.sort(key=lambda pair: -pair[1])
+        return scored[:limit]
+
+    def search(self, text: str, color: str = "", limit: int = 5) -> List[Tuple[CatalogItem, float]]:
+        """Fuzzy search for free-text product names, best matches first."""
+        name = normalize(text)
+        color_key = self._color_key(color) if color else None
+        results = []
+        for name_id, score in self._similar_names(name, limit):
+            variants = self._variants[name_id]
+            if color_key is not None:
+                if color_key in variants:
+                    results.append((self._items[variants[color_key]], score))
+            else:
+                results.extend((self._items[i], score) for i in variants.values())
+        return results[:limit]
+
+    def resolve(self, name: str, color: str = "") -> str:
+        """Map a product name and color from an inquiry to a SKU."""
+        if name in self._by_sku:
+            return name
+        key = normalize(name)
+        color_key = self._color_key(color)
+        if color_key is None:
+            raise UnknownProductError(f"Unknown color for {name}: {color}")
+
+        i = self._by_name_color.get((key, color_key))
+        if i is not None:
+            return self._items[i].sku
+
+        # Every known token of the name must match, and the color if one is given
+        postings = [self._by_token[t] for t in normalize_tokens(name) if t in self._by_token]
+        if color_key:
+            postings.append(self._by_color[color_key])
+        if len(postings) > (1 if color_key else 0):
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    break
+            if len(candidates) == 1:
+                return self._items[candidates.pop()].sku
+            if 1 < len(candidates) <= 64:
+                query = trigrams(key)
+                best = max(sorted(candidates), key=lambda c: len(
+                    query & trigrams(normalize(self._items[c].name))))
+                return self._items[best].sku
+            if candidates:
+                for name_id, _ in self._similar_names(key, 10):
+                    i = self._variants[name_id].get(color_key) if color_key else None
+                    if i is None and not color_key:
+                        i = min(self._variants[name_id].values())
+                    if i in candidates:
+                        return self._items[i].sku
+                return self._items[min(candidates)].sku
+
+        # Misspelt names: nearest model name that has the requested color
+        for item, score in self.search(name, color, limit=3):
+            if score >= MIN_SIMILARITY:
+                return item.sku
+        raise UnknownProductError(f"No catalog product matches '{name}' in '{color}'")
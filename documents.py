@@ -1,183 +1,536 @@
-from datetime import datetime
-from typing import Dict, Any
+from datetime import date
+from typing import Dict, Any, Callable, Iterable, List, Optional, Sequence, Tuple
+from models import Inquiry, InquiryData, OrderLine, as_inquiry
+from money import format_cents, to_cents
+from numbering import PICKING, SHIPPING, INVOICE, WAVE, Numbering, document_number
+from picking import Wave
+from shipping import Shipment, number_ranges
+from render_cache import RenderCache
+
+# Document layouts. The static parts are precomputed strings, the variable
+# parts are single f-strings (compiled to bytecode with the module), so
+# rendering a document is one append per section and a single join.
+
+_INQUIRY_STATIC = (
+    "   Contact Person: Not provided\n"
+    "   Delivery Address: Not provided\n\n"
+    "2. Product Details:"
+)
+_INQUIRY_FOOTER = (
+    "\n\n---------------\n"
+    "System Update:\n"
+    "- Customer details verified in database\n"
+    "- Price list checked for all products\n"
+    "- Product specifications verified"
+)
+_INVENTORY_HEADER = "INVENTORY CHECK DOCUMENT\n----------------------\nOrder Reference: "
+_INVENTORY_UPDATE = "\n\nSystem Update:\n- Stock levels checked in warehouse system\n"
+# What became of the order's stock: reserved, refused, or only checked (no reservation made)
+_RESERVATION_LINES = {
+    True: "- Available quantities reserved for order",
+    False: "- Insufficient stock: nothing reserved for order",
+    None: "- Available quantities checked, not reserved",
+}
+_INVENTORY_FOOTER = "\n- Stock locations verified"
+_PICKING_STATIC = (
+    "Contact Person: Not provided\n"
+    "Delivery Address: Not provided\n\n"
+    "Items to Pick:"
+)
+_PICKING_ITEM_FOOTER = "\n   - Quality Check Required: Yes\n   - Handle with Care"
+_LADING_HEADER = "\n\n\nBILL OF LADING\n-------------\nB/L Number: "
+_LADING_FOOTER = "\nTerms: EXW\nCarrier: To be assigned"
+_INVOICE_TABLE_HEADER = (
+    "\n\nItems:\n"
+    + "-" * 60 + "\n"
+    "Product                  Quantity    Unit Price    Total\n"
+    + "-" * 60
+)
+_INVOICE_RULE = "\n" + "-" * 60
+# Days an invoice is payable in
+PAYMENT_TERMS_DAYS = 30
+_INVOICE_FOOTER = (
+    " EUR\n"
+    f"\nPayment Terms: {PAYMENT_TERMS_DAYS} days\n"
+    "Please include invoice number in payment reference"
+)
+
+
+_NO_STOCK: Dict[str, Any] = {}
+
+# A rendered line-item section and the order total in cents it adds up to
+# (None when a price is missing, 0 for documents without a total)
+Section = Tuple[str, Optional[int]]
+
+
+def _available(lookup: Callable, available: Callable[[str], int], products: Sequence[OrderLine],
+               reserved: Optional[bool]) -> Callable:
+    """``lookup`` with the quantities a stock backend had ``available`` for an order.
+
+    Once the order is reserved, its own quantities are no longer available, so
+    they are added back.
+    """
+    own: Dict[str, int] = {}
+    if reserved:
+        for product in products:
+            own[product.id] = own.get(product.id, 0) + product.quantity
+
+    def stock(sku: str, default: Dict[str, Any]) -> Dict[str, Any]:
+        item = lookup(sku, default)
+        found = {"quantity": available(sku) + own.get(sku, 0)}
+        location = item.get("location")
+        if location is not None:
+            found["location"] = location
+        return found
+    return stock
+
 
 class DocumentGenerator:
-    @staticmethod
-    def generate_inquiry_document(inquiry_data: Dict[str, Any]) -> str:
-        # Parse inquiry data
-        customer = inquiry_data.get("customer", "")
-        products = inquiry_data.get("products", [])
-        delivery = inquiry_data.get("delivery", "")
-        special_reqs = inquiry_data.get("special_requirements", "")
-        
-        # Generate document number
-        date = datetime.now()
-        doc_number = f"INQ-{date.strftime('%Y%m%d')}-{customer[:3].upper()}"
-        
-        # Create document
-        document = [
-            "SALES INQUIRY DOCUMENT",
-            "---------------------",
-            f"Date: {date.strftime('%d/%m/%Y')}",
-            f"Inquiry Number: {doc_number}\n",
-            "1. Customer Details:",
-            f"   Company Name: {customer}",
-            "   Contact Person: Not provided",
-            "   Delivery Address: Not provided\n",
-            "2. Product Details:"
-        ]
-        
+    def __init__(self, catalog=None, cache: Optional[RenderCache] = None,
+                 numbering: Optional[Numbering] = None):
+        """``catalog`` (a ``catalog.ProductCatalog``) supplies prices and storage locations.
+
+        With a ``cache`` (see ``render_cache.py``) the line-item sections of
+        documents are reused for orders with the same lines, prices and stock
+        entries. Everything else in a document is rendered every time.
+
+        With a ``numbering`` (see ``numbering.py``) every picking ticket,
+        packing slip and invoice gets the next number of its own sequence.
+        Without one their numbers are derived from the inquiry number.
+        """
+        self.catalog = catalog
+        self.cache = cache
+        self.numbering = numbering
+        self._day = None
+        self._stamp = ""
+        self._display_date = ""
+        self._cents_of: Dict[Any, int] = {}
+        self._sections: Dict[str, Callable[[Sequence[OrderLine], Callable], Section]] = {
+            "inquiry": self._inquiry_items, "inventory": self._inventory_items,
+            "picking": self._picking_items, "shipping": self._shipping_items,
+            "billing": self._billing_items,
+        }
+        self._section_keys: Dict[str, Callable[[Sequence[OrderLine], Callable], tuple]] = {
+            "inquiry": self._inquiry_key, "inventory": self._inventory_key,
+            "picking": self._picking_key, "shipping": self._shipping_key,
+            "billing": self._billing_key,
+        }
+
+    def _dates(self):
+        """Date for document numbers (YYYYMMDD) and for display (DD/MM/YYYY), formatted once a day."""
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._stamp = today.strftime('%Y%m%d')
+            self._display_date = today.strftime('%d/%m/%Y')
+        return self._stamp, self._display_date
+
+    def _number(self, kind: str, stamp: str, inquiry_data: Inquiry, number: Optional[str] = None) -> str:
+        if number is not None:
+            return number
+        if self.numbering is None:
+            return f"{kind}-{stamp}-{inquiry_data.doc_number}"
+        return document_number(kind, stamp, self.numbering.next(kind))
+
+    def _price(self, product: OrderLine, default: Any) -> Any:
+        if self.catalog is not None:
+            item = self.catalog.get(product.id)
+            if item is not None:
+                return item.price
+        return default if product.price is None else product.price
+
+    def _cents(self, price: Any) -> int:
+        """``money.to_cents`` memoized per price; a catalog has few distinct prices."""
+        cents = self._cents_of.get(price)
+        if cents is None:
+            cents = self._cents_of[price] = to_cents(price)
+        return cents
+
+    def _stock(self, inventory_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if inventory_data is None:
+            return self.catalog if self.catalog is not None else {}
+        return inventory_data
+
+    def _inquiry(self, inquiry_data: Inquiry, out: List[str]):
+        customer = inquiry_data.customer
+        stamp, display_date = self._dates()
+        # Numbered inquiries carry their number; otherwise it is made up as in the parser
+        inquiry_number = f"INQ-{stamp}-{customer[:3].upper()}" if self.numbering is None \
+            else inquiry_data.doc_number
+        append = out.append
+        append(
+            f"SALES INQUIRY DOCUMENT\n---------------------\nDate: {display_date}\n"
+            f"Inquiry Number: {inquiry_number}\n\n"
+            f"1. Customer Details:\n   Company Name: {customer}\n"
+        )
+        append(_INQUIRY_STATIC)
+        items, total = self._section("inquiry", inquiry_data.products, None)
+        append(items)
+        append(
+            f"\n\n3. Delivery Requirements: {inquiry_data.delivery}\n"
+            f"\n4. Special Requirements: {inquiry_data.special_requirements}\n"
+            f"\n5. Total Order Value: "
+            f"{'To be confirmed' if total is None else format_cents(total) + ' EUR'}"
+        )
+        append(_INQUIRY_FOOTER)
+
+    def _inventory(self, inquiry_data: Inquiry, inventory_data: Optional[Dict[str, Any]],
+                   out: List[str], available: Optional[Callable[[str], int]] = None,
+                   reserved: Optional[bool] = None):
+        append = out.append
+        append(_INVENTORY_HEADER)
+        append(f"{inquiry_data.doc_number}\n\nProduct Information:")
+        lookup = self._stock(inventory_data).get
+        if available is not None:
+            lookup = _available(lookup, available, inquiry_data.products, reserved)
+        append(self._section("inventory", inquiry_data.products, lookup)[0])
+        append(_INVENTORY_UPDATE)
+        append(_RESERVATION_LINES[reserved])
+        append(_INVENTORY_FOOTER)
+
+    def _picking(self, inquiry_data: Inquiry, inventory_data: Optional[Dict[str, Any]],
+                 out: List[str], number: Optional[str] = None) -> str:
+        stamp, display_date = self._dates()
+        number = self._number(PICKING, stamp, inquiry_data, number)
+        append = out.append
+        append(
+            f"PICKING TICKET\n-------------\n"
+            f"Ticket Number: {number}\n"
+            f"Date: {display_date}\n\n"
+            f"Customer Details:\nCompany Name: {inquiry_data.customer}\n"
+        )
+        append(_PICKING_STATIC)
+        append(self._section("picking", inquiry_data.products, self._stock(inventory_data).get)[0])
+        return number
+
+    def _shipping(self, inquiry_data: Inquiry, out: List[str], number: Optional[str] = None) -> str:
+        stamp, display_date = self._dates()
+        doc_number = self._number(SHIPPING, stamp, inquiry_data, number)
+        customer = inquiry_data.customer
+        append = out.append
+        append(
+            f"PACKING SLIP\n-----------\nSlip Number: {doc_number}\n"
+            f"Date: {display_date}\nCustomer: {customer}\n\nItems Packed:"
+        )
+        append(self._section("shipping", inquiry_data.products, None)[0])
+        append(_LADING_HEADER)
+        append(f"{doc_number}\nDate: {display_date}\nShipper: Our Company\nConsignee: {customer}")
+        append(_LADING_FOOTER)
+        return doc_number
+
+    def _billing(self, inquiry_data: Inquiry, out: List[str], number: Optional[str] = None) -> str:
+        stamp, display_date = self._dates()
+        number = self._number(INVOICE, stamp, inquiry_data, number)
+        append = out.append
+        append(
+            f"SALES INVOICE\n-------------\n"
+            f"Invoice Number: {number}\n"
+            f"Date: {display_date}\nCustomer: {inquiry_data.customer}"
+        )
+        append(_INVOICE_TABLE_HEADER)
+        items, total = self._section("billing", inquiry_data.products, None)
+        append(items)
+        append(_INVOICE_RULE)
+        append(f"\nTotal (excluding tax): {format_cents(total):>33}")
+        append(_INVOICE_FOOTER)
+        return number
+
+    # Line-item sections. Each ``_*_items`` renders the lines of one kind of
+    # document; the matching ``_*_key`` is everything those lines are rendered
+    # from, so equal keys render equal sections.
+
+    def _section(self, kind: str, products: Sequence[OrderLine], lookup: Optional[Callable]) -> Section:
+        cache = self.cache
+        if cache is None:
+            return self._sections[kind](products, lookup)
+        key = (kind, self._section_keys[kind](products, lookup))
+        section = cache.get(key)
+        if section is None:
+            section = self._sections[kind](products, lookup)
+            cache.put(key, section, len(section[0]))
+        return section
+
+    def _inquiry_items(self, products: Sequence[OrderLine], lookup: None) -> Section:
+        unit_price, cents = self._price, self._cents
+        out = []
+        append = out.append
+        total = 0
         for i, product in enumerate(products, 1):
-            document.extend([
-                f"\n   Item {i}:",
-                f"   Product ID: {product['id']}",
-                f"   Description: {product['name']}",
-                f"   Exact Quantity: {product['quantity']}",
-                f"   Unit Price in EUR: {product.get('price', 'To be confirmed')}",
-                f"   Total Price Per Item: {product.get('total_price', 'To be confirmed')}"
-            ])
-        
-        document.extend([
-            f"\n3. Delivery Requirements: {delivery}",
-            f"\n4. Special Requirements: {special_reqs}",
-            "\n5. Total Order Value: To be confirmed",
-            "\n---------------",
-            "System Update:",
-            "- Customer details verified in database",
-            "- Price list checked for all products",
-            "- Product specifications verified"
-        ])
-        
-        return "\n".join(document)
-
-    @staticmethod
-    def generate_inventory_document(inquiry_data: Dict[str, Any], inventory_data: Dict[str, Any]) -> str:
-        doc_number = inquiry_data.get("doc_number", "Unknown")
-        products = inquiry_data.get("products", [])
-        
-        document = [
-            "INVENTORY CHECK DOCUMENT",
-            "----------------------",
-            f"Order Reference: {doc_number}\n",
-            "Product Information:"
-        ]
-        
+            price = unit_price(product, None)
+            if price is None or total is None:
+                total = None
+            else:
+                total += cents(price) * product.quantity
+            append(
+                f"\n\n   Item {i}:\n   Product ID: {product.id}\n"
+                f"   Description: {product.name}\n"
+                f"   Exact Quantity: {product.quantity}\n"
+                f"   Unit Price in EUR: {'To be confirmed' if price is None else price}\n"
+                f"   Total Price Per Item: To be confirmed"
+            )
+        return "".join(out), total
+
+    def _inquiry_key(self, products: Sequence[OrderLine], lookup: None) -> tuple:
+        # The price as printed: 10, 10.0 and Decimal("10.00") are equal but print differently
+        unit_price = self._price
+        return tuple((product.id, product.name, product.quantity, f"{unit_price(product, None)}")
+                     for product in products)
+
+    def _inventory_items(self, products: Sequence[OrderLine], lookup: Callable) -> Section:
+        out = []
+        append = out.append
         for i, product in enumerate(products, 1):
-            stock = inventory_data.get(product['id'], {})
-            document.extend([
-                f"\n   {i}.",
-                f"   - Product ID: {product['id']}",
-                f"   - Requested quantity: {product['quantity']}",
-                f"   - Available quantity: {stock.get('quantity', 0)}",
+            stock = lookup(product.id, _NO_STOCK)
+            append(
+                f"\n\n   {i}.\n   - Product ID: {product.id}\n"
+                f"   - Requested quantity: {product.quantity}\n"
+                f"   - Available quantity: {stock.get('quantity', 0)}\n"
                 f"   - Storage location: {stock.get('location', 'Not found')}"
-            ])
-        
-        document.extend([
-            "\nSystem Update:",
-            "- Stock levels checked in warehouse system",
-            "- Available quantities reserved for order",
-            "- Stock locations verified"
-        ])
-        
-        return "\n".join(document)
-
-    @staticmethod
-    def generate_picking_document(inquiry_data: Dict[str, Any], inventory_data: Dict[str, Any]) -> str:
-        date = datetime.now()
-        doc_number = f"PICK-{date.strftime('%Y%m%d')}-{inquiry_data['doc_number']}"
-        products = inquiry_data.get("products", [])
-        
-        document = [
-            "PICKING TICKET",
-            "-------------",
-            f"Ticket Number: {doc_number}",
-            f"Date: {date.strftime('%d/%m/%Y')}\n",
-            "Customer Details:",
-            f"Company Name: {inquiry_data['customer']}",
-            "Contact Person: Not provided",
-            "Delivery Address: Not provided\n",
-            "Items to Pick:"
-        ]
-        
+            )
+        return "".join(out), 0
+
+    def _inventory_key(self, products: Sequence[OrderLine], lookup: Callable) -> tuple:
+        key = []
+        for product in products:
+            stock = lookup(product.id, _NO_STOCK)
+            key.append((product.id, product.quantity,
+                        f"{stock.get('quantity', 0)}", f"{stock.get('location', 'Not found')}"))
+        return tuple(key)
+
+    def _picking_items(self, products: Sequence[OrderLine], lookup: Callable) -> Section:
+        out = []
+        append = out.append
         for i, product in enumerate(products, 1):
-            stock = inventory_data.get(product['id'], {})
-            document.extend([
-                f"\n{i}. {product['name']}",
-                f"   - Product ID: {product['id']}",
-                f"   - Quantity: {product['quantity']}",
-                f"   - Location: {stock.get('location', 'Not found')}",
-                "   - Quality Check Required: Yes",
-                "   - Handle with Care"
-            ])
-        
-        return "\n".join(document)
-
-    @staticmethod
-    def generate_shipping_documents(inquiry_data: Dict[str, Any], picking_data: Dict[str, Any]) -> str:
-        date = datetime.now()
-        doc_number = f"SHIP-{date.strftime('%Y%m%d')}-{inquiry_data['doc_number']}"
-        
-        documents = [
-            "PACKING SLIP",
-            "-----------",
-            f"Slip Number: {doc_number}",
-            f"Date: {date.strftime('%d/%m/%Y')}",
-            f"Customer: {inquiry_data['customer']}\n",
-            "Items Packed:"
-        ]
-        
-        for i, product in enumerate(inquiry_data['products'], 1):
-            documents.extend([
-                f"\n{i}. {product['name']}",
-                f"   - Product ID: {product['id']}",
-                f"   - Quantity: {product['quantity']}",
-                "   - Quality Check: Completed"
-            ])
-        
-        documents.extend([
-            "\n\nBILL OF LADING",
-            "-------------",
-            f"B/L Number: {doc_number}",
-            f"Date: {date.strftime('%d/%m/%Y')}",
-            f"Shipper: Our Company",
-            f"Consignee: {inquiry_data['customer']}",
-            "Terms: EXW",
-            "Carrier: To be assigned"
-        ])
-        
-        return "\n".join(documents)
-
-    @staticmethod
-    def generate_billing_documents(inquiry_data: Dict[str, Any], shipping_data: Dict[str, Any]) -> str:
-        date = datetime.now()
-        invoice_number = f"INV-{date.strftime('%Y%m%d')}-{inquiry_data['doc_number']}"
-        
-        documents = [
-            "SALES INVOICE",
-            "-------------",
-            f"Invoice Number: {invoice_number}",
-            f"Date: {date.strftime('%d/%m/%Y')}",
-            f"Customer: {inquiry_data['customer']}\n",
-            "Items:",
-            "-" * 60,
-            "Product                  Quantity    Unit Price    Total",
-            "-" * 60
-        ]
-        
+            stock = lookup(product.id, _NO_STOCK)
+            append(
+                f"\n\n{i}. {product.name}\n   - Product ID: {product.id}\n"
+                f"   - Quantity: {product.quantity}\n"
+                f"   - Location: {stock.get('location', 'Not found')}"
+            )
+            append(_PICKING_ITEM_FOOTER)
+        return "".join(out), 0
+
+    def _picking_key(self, products: Sequence[OrderLine], lookup: Callable) -> tuple:
+        return tuple((product.id, product.name, product.quantity,
+                      f"{lookup(product.id, _NO_STOCK).get('location', 'Not found')}")
+                     for product in products)
+
+    def _shipping_items(self, products: Sequence[OrderLine], lookup: None) -> Section:
+        return "".join(
+            f"\n\n{i}. {product.name}\n   - Product ID: {product.id}\n"
+            f"   - Quantity: {product.quantity}\n   - Quality Check: Completed"
+            for i, product in enumerate(products, 1)
+        ), 0
+
+    def _shipping_key(self, products: Sequence[OrderLine], lookup: None) -> tuple:
+        return tuple((product.id, product.name, product.quantity) for product in products)
+
+    def _billing_items(self, products: Sequence[OrderLine], lookup: None) -> Section:
+        unit_price, cents = self._price, self._cents
+        out = []
+        append = out.append
+        # Exact cent amounts, so that the total is the sum of the printed lines
         total = 0
-        for product in inquiry_data['products']:
-            price = float(product.get('price', 0))
-            line_total = price * product['quantity']
+        for product in products:
+            price = cents(unit_price(product, 0))
+            quantity = product.quantity
+            line_total = price * quantity
             total += line_total
-            documents.append(
-                f"{product['name'][:20]:<20} {product['quantity']:>10} {price:>12.2f} {line_total:>10.2f}"
+            append(f"\n{product.name[:20]:<20} {quantity:>10} "
+                   f"{format_cents(price):>12} {format_cents(line_total):>10}")
+        return "".join(out), total
+
+    def _billing_key(self, products: Sequence[OrderLine], lookup: None) -> tuple:
+        unit_price, cents = self._price, self._cents
+        return tuple((product.name, product.quantity, cents(unit_price(product, 0)))
+                     for product in products)
+
+    def generate_inquiry_document(self, inquiry_data: InquiryData) -> str:
+        out = []
+        self._inquiry(as_inquiry(inquiry_data), out)
+        return "".join(out)
+
+    def generate_inventory_document(self, inquiry_data: InquiryData,
+                                    inventory_data: Optional[Dict[str, Any]] = None,
+                                    available: Optional[Callable[[str], int]] = None,
+                                    reserved: Optional[bool] = None) -> str:
+        """The inventory check of an order.
+
+        Given the ``available`` quantity per SKU of the stock backend the order
+        was ``reserved`` from (True) or refused by (False), e.g. the backend's
+        ``available`` method, quantities are what the backend had for the
+        order and the document says whether it was reserved. Otherwise they are
+        the quantities in ``inventory_data`` (the catalog by default) and
+        nothing was reserved.
+        """
+        out = []
+        self._inventory(as_inquiry(inquiry_data), inventory_data, out, available, reserved)
+        return "".join(out)
+
+    def generate_picking_document(self, inquiry_data: InquiryData,
+                                  inventory_data: Optional[Dict[str, Any]] = None) -> str:
+        out = []
+        self._picking(as_inquiry(inquiry_data), inventory_data, out)
+        return "".join(out)
+
+    def generate_shipping_documents(self, inquiry_data: InquiryData, picking_data: Dict[str, Any]) -> str:
+        out = []
+        self._shipping(as_inquiry(inquiry_data), out)
+        return "".join(out)
+
+    def generate_billing_documents(self, inquiry_data: InquiryData, shipping_data: Dict[str, Any]) -> str:
+        out = []
+        self._billing(as_inquiry(inquiry_data), out)
+        return "".join(out)
+
+    def generate_numbered(self, kind: str, inquiry_data: InquiryData,
+                          inventory_data: Optional[Dict[str, Any]] = None,
+                          number: Optional[str] = None) -> Tuple[str, str]:
+        """The "picking", "shipping" or "billing" document of an order and the number it got.
+
+        Given the ``number`` the document was issued with, it is rendered
+        again under that number and no new one is drawn.
+        """
+        inquiry_data = as_inquiry(inquiry_data)
+        out = []
+        if kind == "picking":
+            number = self._picking(inquiry_data, inventory_data, out, number)
+        elif kind == "shipping":
+            number = self._shipping(inquiry_data, out, number)
+        elif kind == "billing":
+            number = self._billing(inquiry_data, out, number)
+        else:
+            raise ValueError(f"No numbered {kind} document")
+        return "".join(out), number
+
+    def document_record(self, kind: str, inquiry_data: InquiryData, number: str,
+                        inventory_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The content of a "picking", "shipping" or "billing" document as typed, JSON-ready values.
+
+        Items keep the full product name and ID. Amounts are integer cents, at
+        the prices the document is rendered with.
+        """
+        inquiry_data = as_inquiry(inquiry_data)
+        self._dates()
+        record = {"document": kind, "number": number, "date": self._day.isoformat(),
+                  "order": inquiry_data.doc_number, "customer": inquiry_data.customer}
+        products = inquiry_data.products
+        if kind == "picking":
+            lookup = self._stock(inventory_data).get
+            record["items"] = [{"product_id": product.id, "name": product.name, "quantity": product.quantity,
+                                "location": lookup(product.id, _NO_STOCK).get("location")}
+                               for product in products]
+        elif kind == "shipping":
+            record["delivery"] = inquiry_data.delivery
+            record["items"] = [{"product_id": product.id, "name": product.name, "quantity": product.quantity}
+                               for product in products]
+        elif kind == "billing":
+            unit_price, cents = self._price, self._cents
+            items = []
+            total = 0
+            for product in products:
+                price = cents(unit_price(product, 0))
+                total += price * product.quantity
+                items.append({"product_id": product.id, "name": product.name, "quantity": product.quantity,
+                              "unit_cents": price, "line_cents": price * product.quantity})
+            record.update(items=items, total_cents=total, currency="EUR", payment_terms_days=PAYMENT_TERMS_DAYS)
+        else:
+            raise ValueError(f"No numbered {kind} document")
+        return record
+
+    def invoice_record(self, inquiry_data: InquiryData, number: str) -> Dict[str, Any]:
+        """The invoice of an order as a record (see ``document_record``)."""
+        return self.document_record("billing", inquiry_data, number)
+
+    def generate_wave_ticket(self, wave: Wave) -> str:
+        """One consolidated picking ticket for all orders of a ``picking.Wave``, stops in route order."""
+        stamp, display_date = self._dates()
+        number = wave.number if self.numbering is None else self.numbering.next(WAVE)
+        out = [
+            f"PICK WAVE\n---------\n"
+            f"Wave Number: {document_number(WAVE, stamp, number)}\n"
+            f"Date: {display_date}\n"
+            f"Orders: {len(wave.orders)}\nOrder Lines: {wave.lines}\nStops: {len(wave.stops)}\n"
+            f"Estimated Walk: {wave.distance:.0f} m\n\n"
+            f"Orders in this Wave:"
+        ]
+        append = out.append
+        for i, order in enumerate(wave.orders, 1):
+            append(f"\n{i}. {order.doc_number} - {order.customer}")
+        append("\n\nRoute:")
+        for i, stop in enumerate(wave.stops, 1):
+            sort_to = ", ".join(f"order {position + 1} x {quantity}" for position, quantity in stop.orders.items())
+            append(
+                f"\n\n{i}. {stop.location_text}\n   - Product ID: {stop.sku}\n"
+                f"   - Product: {stop.name}\n"
+                f"   - Total Quantity: {stop.quantity}\n"
+                f"   - Sort to: {sort_to}"
             )
-        
-        documents.extend([
-            "-" * 60,
-            f"Total (excluding tax): {total:>33.2f} EUR",
-            "\nPayment Terms: 30 days",
-            "Please include invoice number in payment reference"
-        ])
-        
-        return "\n".join(documents) 
\ No newline at end of file
+            append(_PICKING_ITEM_FOOTER)
+        return "".join(out)
+
+    def generate_consolidated_shipping(self, shipment: Shipment) -> str:
+        """Packing slip and bill of lading for a ``shipping.Shipment`` of several orders."""
+        stamp, display_date = self._dates()
+        number = shipment.number if self.numbering is None else self.numbering.next(SHIPPING)
+        doc_number = document_number(SHIPPING, stamp, number)
+        customer = shipment.customer
+        items: Dict[str, List] = {}
+        for order in shipment.orders:
+            for product in order.products:
+                item = items.get(product.id)
+                if item is None:
+                    items[product.id] = [product.name, product.quantity]
+                else:
+                    item[1] += product.quantity
+        pallets = shipment.pallets
+        out = [
+            f"CONSOLIDATED PACKING SLIP\n-------------------------\nSlip Number: {doc_number}\n"
+            f"Date: {display_date}\nCustomer: {customer}\n"
+            f"Delivery: {shipment.delivery or 'Not specified'}\n"
+            f"Orders: {', '.join(order.doc_number for order in shipment.orders)}\n\nItems Packed:"
+        ]
+        append = out.append
+        for i, (sku, (name, quantity)) in enumerate(items.items(), 1):
+            append(f"\n\n{i}. {name}\n   - Product ID: {sku}\n"
+                   f"   - Quantity: {quantity}\n   - Quality Check: Completed")
+        append("\n\nPallets:")
+        for i, pallet in enumerate(pallets, 1):
+            contents = ", ".join(f"{sku} x {units}" for sku, units in pallet.contents.items())
+            append(f"\n{i}. {contents} ({pallet.weight:.1f} kg)")
+        trucks = number_ranges(shipment.trucks) or "To be assigned"
+        append(_LADING_HEADER)
+        append(
+            f"{doc_number}\nDate: {display_date}\nShipper: Our Company\nConsignee: {customer}\n"
+            f"Packages: {len(pallets)} pallets, {sum(item[1] for item in items.values())} units\n"
+            f"Gross Weight: {shipment.weight:.1f} kg\n"
+            f"Terms: EXW\nCarrier: Truck {trucks}"
+        )
+        return "".join(out)
+
+    def render_many(self, kind: str, orders: Iterable[InquiryData],
+                    inventory_data: Optional[Dict[str, Any]] = None,
+                    separator: str = "\n\n") -> str:
+        """Render one kind of document for a batch of orders into a single string.
+
+        ``kind`` is one of "inquiry", "inventory", "picking", "shipping" or
+        "billing". Each document is identical to what the matching
+        ``generate_*`` method returns; documents are joined by ``separator``.
+        ``orders`` can also be a ``models.OrderBatch``.
+        """
+        out = []
+        append = out.append
+        if kind in ("inventory", "picking"):
+            render = self._inventory if kind == "inventory" else self._picking
+            for inquiry_data in orders:
+                if out:
+                    append(separator)
+                render(as_inquiry(inquiry_data), inventory_data, out)
+        else:
+            render = {"inquiry": self._inquiry, "shipping": self._shipping,
+                      "billing": self._billing}[kind]
+            for inquiry_data in orders:
+                if out:
+                    append(separator)
+                render(as_inquiry(inquiry_data), out)
+        return "".join(out)
@@ -0,0 +1,311 @@
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from policies import SUFFICIENT, INSUFFICIENT
+
+# Event codes. Stage events mark a stage as done; FG/RM carry the decision
+# as their value; the last of COMPLETED, HALTED, ERROR and RESUMED is the
+# status of an order. ERROR carries the stage that failed.
+INQUIRY, INVENTORY, PICKING, SHIPPING, BILLING = 1, 2, 3, 4, 5
+FG_DECISION, RM_DECISION = 6, 7
+COMPLETED, HALTED, ERROR, RESUMED = 8, 9, 10, 11
+EVENT_NAMES = {
+    INQUIRY: "inquiry", INVENTORY: "inventory", PICKING: "picking", SHIPPING: "shipping",
+    BILLING: "billing", FG_DECISION: "fg_decision", RM_DECISION: "rm_decision",
+    COMPLETED: "completed", HALTED: "halted", ERROR: "error", RESUMED: "resumed",
+}
+STAGE_NAMES = ("received", "inquiry", "inventory", "picking", "shipping", "billing")
+
+# Values of the decision and status events
+DECISIONS = {SUFFICIENT: 1, INSUFFICIENT: 2}
+DECISION_NAMES = {0: None, 1: SUFFICIENT, 2: INSUFFICIENT}
+OPEN, DONE, STOPPED, FAILED = 0, 1, 2, 3
+STATUS_NAMES = ("open", "completed", "halted", "error")
+REASONS = {"insufficient_stock": 1}
+REASON_NAMES = {0: None, 1: "insufficient_stock"}
+# Values of the ERROR event: the stage an order failed in (0 in logs written before it was recorded)
+FAILED_STAGE_NAMES = (None, "parse", "inquiry", "inventory", "picking", "shipping", "billing")
+FAILED_STAGES = {name: value for value, name in enumerate(FAILED_STAGE_NAMES) if name}
+
+# One event is 16 bytes: order number, event code, value, unix time
+RECORD = struct.Struct("<QHHI")
+DTYPE = np.dtype([("order", "<u8"), ("event", "<u2"), ("value", "<u2"), ("time", "<u4")])
+MAGIC = b"SALESEVT"
+HEADER = struct.Struct("<8sII")
+VERSION = 1
+
+
+def _last_per_order(orders: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct orders and the position of the last event of each."""
+    unique, first_from_end = np.unique(orders[::-1], return_index=True)
+    return unique, len(orders) - 1 - first_from_end
+
+
+class OrderStates:
+    """State of every order, rebuilt from the event log, as one array per field.
+
+    Arrays are indexed by order number: the furthest ``stage`` reached
+    (index into ``STAGE_NAMES``), the ``status`` (index into
+    ``STATUS_NAMES``), the ``fg`` and ``rm`` decisions and the ``reason``:
+    why a halted order halted, or the stage a failed one failed in (index
+    into ``FAILED_STAGE_NAMES``). ``events`` is the number of log events
+    they cover.
+    """
+
+    FIELDS = ("seen", "stage", "status", "fg", "rm", "reason")
+
+    def __init__(self, size: int = 0, events: int = 0):
+        self.seen = np.zeros(size, dtype=bool)
+        self.stage = np.zeros(size, dtype=np.uint8)
+        self.status = np.zeros(size, dtype=np.uint8)
+        self.fg = np.zeros(size, dtype=np.uint8)
+        self.rm = np.zeros(size, dtype=np.uint8)
+        self.reason = np.zeros(size, dtype=np.uint8)
+        self.events = events
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+    def _grow(self, size: int):
+        if size <= len(self):
+            return
+        for field in self.FIELDS:
+            old = getattr(self, field)
+            new = np.zeros(max(size, 2 * len(old)), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, field, new)
+
+    def apply(self, events: np.ndarray):
+        """Apply log events (a ``DTYPE`` array) that follow the ones already applied."""
+        if not len(events):
+            return
+        orders = events["order"].astype(np.int64)
+        codes = events["event"]
+        values = events["value"]
+        self._grow(int(orders.max()) + 1)
+        self.seen[orders] = True
+
+        stages = codes <= BILLING
+        if stages.any():
+            np.maximum.at(self.stage, orders[stages], codes[stages].astype(np.uint8))
+
+        for code, field in ((FG_DECISION, self.fg), (RM_DECISION, self.rm)):
+            picked = np.flatnonzero(codes == code)
+            if len(picked):
+                unique, last = _last_per_order(orders[picked])
+                field[unique] = values[picked[last]]
+
+        picked = np.flatnonzero(codes >= COMPLETED)
+        if len(picked):
+            unique, last = _last_per_order(orders[picked])
+            final = codes[picked[last]]
+            self.status[unique] = np.select(
+                [final == COMPLETED, final == HALTED, final == ERROR], [DONE, STOPPED, FAILED], OPEN)
+            self.reason[unique] = np.where((final == HALTED) | (final == ERROR), values[picked[last]], 0)
+        self.events += len(events)
+
+    def orders(self, status: int) -> np.ndarray:
+        """Numbers of the orders with a status (``OPEN``, ``DONE``, ``STOPPED`` or ``FAILED``)."""
+        return np.flatnonzero(self.seen & (self.status == status))
+
+    def finished(self, order: int) -> bool:
+        """True if the order completed or failed; halted and unseen orders are not finished."""
+        return (order < len(self) and self.seen[order]
+                and self.status[order] in (DONE, FAILED))
+
+    def get(self, order: int) -> Optional[Dict[str, Any]]:
+        if order >= len(self) or not self.seen[order]:
+            return None
+        failed = self.status[order] == FAILED
+        reason = int(self.reason[order])
+        return {
+            "order": order,
+            "stage": STAGE_NAMES[self.stage[order]],
+            "status": STATUS_NAMES[self.status[order]],
+            "fg_choice": DECISION_NAMES[self.fg[order]],
+            "rm_choice": DECISION_NAMES[self.rm[order]],
+            "reason": None if failed else REASON_NAMES.get(reason),
+            "failed_stage": FAILED_STAGE_NAMES[reason] if failed and reason < len(FAILED_STAGE_NAMES) else None,
+        }
+
+    def summary(self) -> Dict[str, int]:
+        counts = np.bincount(self.status[self.seen], minlength=len(STATUS_NAMES))
+        return dict(zip(STATUS_NAMES, counts.tolist()))
+
+    def save(self, path: str):
+        """Write the state as a snapshot (written to a temporary file, then renamed)."""
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez(f, events=np.int64(self.events),
+                     **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "OrderStates":
+        states = cls()
+        with np.load(path) as data:
+            for field in cls.FIELDS:
+                setattr(states, field, data[field])
+            states.events = int(data["events"])
+        return states
+
+
+class EventLog:
+    """Append-only log of the stage transitions of orders, in a local file.
+
+    Every transition is one fixed-size binary record, so the log is read back
+    by memory-mapping the file and viewing it as a NumPy array. ``replay``
+    rebuilds the state of millions of orders with a few vectorised passes,
+    starting from the last snapshot. Every ``snapshot_every`` events a new
+    snapshot is written next to the log (``<path>.snapshot.npz``).
+
+    Orders are identified by number, e.g. their index in a batch run. An
+    order that was halted and run again gets a RESUMED event, then its new
+    transitions; the last status wins.
+    """
+
+    def __init__(self, path: str, snapshot_every: int = 1_000_000):
+        self.path = path
+        self.snapshot_path = path + ".snapshot.npz"
+        self.snapshot_every = snapshot_every
+        self._patterns: Dict[tuple, Tuple[struct.Struct, tuple]] = {}
+        self._index = None
+        # The log file mapped up to its first ``_mapped`` events, remapped once it has grown
+        self._map = None
+        self._mapped = 0
+        self._file = open(path, "a+b")
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            self._file.flush()
+        else:
+            self._file.seek(0)
+            magic, version, record_size = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                raise ValueError(f"{path} is not a version {VERSION} event log")
+            # Drop a record that was only partly written when a run was killed
+            torn = (size - HEADER.size) % RECORD.size
+            if torn:
+                self._file.truncate(size - torn)
+            self._file.seek(0, os.SEEK_END)
+        self._count = (self._file.tell() - HEADER.size) // RECORD.size
+        self._snapshot_at = self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, order: int, event: int, value: int = 0):
+        self._file.write(RECORD.pack(order, event, value, int(time.time())))
+        self._appended(1)
+
+    def record(self, order: int, result: Dict[str, Any], resumed: bool = False):
+        """Append the transitions of one ``process_sales_inquiry`` result."""
+        failed = result.get("stage") if result["status"] == "error" else None
+        key = (result["status"], result.get("fg_choice"), result.get("rm_choice"),
+               result.get("reason"), failed, resumed)
+        pattern = self._patterns.get(key)
+        if pattern is None:
+            pattern = self._patterns[key] = self._pattern(*key)
+        packer, events = pattern
+        now = int(time.time())
+        fields = []
+        for event, value in events:
+            fields += (order, event, value, now)
+        self._file.write(packer.pack(*fields))
+        self._appended(len(events))
+
+    @staticmethod
+    def _pattern(status: str, fg: Optional[str], rm: Optional[str], reason: Optional[str],
+                 failed: Optional[str], resumed: bool) -> Tuple[struct.Struct, tuple]:
+        events = [(RESUMED, 0)] if resumed else []
+        if status == "error":
+            # The stages before the one that failed are done
+            value = FAILED_STAGES.get(failed, 0)
+            events += [(code, 0) for code in range(INQUIRY, value - 1)]
+            events.append((ERROR, value))
+        else:
+            events += [(INQUIRY, 0), (INVENTORY, 0), (FG_DECISION, DECISIONS.get(fg, 0))]
+            if rm is not None:
+                events.append((RM_DECISION, DECISIONS.get(rm, 0)))
+            if status == "halted":
+                events.append((HALTED, REASONS.get(reason, 0)))
+            else:
+                events += [(PICKING, 0), (SHIPPING, 0), (BILLING, 0), (COMPLETED, 0)]
+        return struct.Struct("<" + RECORD.format[1:] * len(events)), tuple(events)
+
+    def _appended(self, count: int):
+        self._count += count
+        if self._count - self._snapshot_at >= self.snapshot_every:
+            self.snapshot()
+
+    def flush(self):
+        self._file.flush()
+
+    def events(self, start: int = 0) -> np.ndarray:
+        """The events from ``start`` on, as a read-only ``DTYPE`` array over the mapped file."""
+        self.flush()
+        if self._count <= start:
+            return np.zeros(0, dtype=DTYPE)
+        if self._map is None or self._mapped < self._count:
+            # Arrays over the previous map keep it alive; it is unmapped once they are gone
+            self._map = mmap.mmap(self._file.fileno(), HEADER.size + self._count * RECORD.size,
+                                  access=mmap.ACCESS_READ)
+            self._mapped = self._count
+        return np.frombuffer(self._map, dtype=DTYPE, count=self._count - start,
+                             offset=HEADER.size + start * RECORD.size)
+
+    def replay(self) -> OrderStates:
+        """State of every order: the last snapshot plus the events logged since."""
+        states = None
+        if os.path.exists(self.snapshot_path):
+            states = OrderStates.load(self.snapshot_path)
+            if states.events > self._count:
+                # The snapshot belongs to a different (longer) log
+                states = None
+        if states is None:
+            states = OrderStates()
+        states.apply(self.events(states.events))
+        return states
+
+    def snapshot(self) -> OrderStates:
+        """Write a snapshot of the current state, so replays start from here."""
+        states = self.replay()
+        states.save(self.snapshot_path)
+        self._snapshot_at = self._count
+        return states
+
+    def history(self, order: int) -> List[Dict[str, Any]]:
+        """Events of one order, oldest first, found through an index of the log."""
+        events = self.events()
+        if self._index is None or not (0 <= len(events) - self._index[0] <= len(events) // 8):
+            # (Re)build the index once more than an eighth of the log is new
+            positions = np.argsort(events["order"], kind="stable")
+            self._index = (len(events), events["order"][positions], positions)
+        indexed, keys, positions = self._index
+        low, high = np.searchsorted(keys, np.array([order, order + 1], dtype=np.uint64))
+        # Events logged since the index was built are few enough to scan
+        tail = np.flatnonzero(events["order"][indexed:] == order) + indexed
+        found = events[np.concatenate([np.sort(positions[low:high]), tail])]
+        return [{"event": EVENT_NAMES.get(int(e["event"]), str(e["event"])), "value": int(e["value"]),
+                 "time": int(e["time"])} for e in found]
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Arrays from ``events`` still view it; it is unmapped with the last of them
+                pass
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,192 @@
+import csv
+import json
+import multiprocessing
+import os
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from sinks import DocumentSink
+
+# Formats an ExportSink writes, and the document kinds it exports by default
+FORMATS = ("pdf", "json", "csv")
+EXPORT_KINDS = ("picking", "shipping", "billing")
+
+# An exported document: order index, kind, text and typed values
+Document = Tuple[int, str, str, Optional[Dict[str, Any]]]
+
+# PDF page layout: A4 in points, with the documents' own monospaced layout in
+# Courier. Courier is one of the standard PDF fonts, so it is referenced
+# instead of embedded and every PDF shares the same few bytes for it.
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 50
+FONT_SIZE = 9
+LEADING = 11
+PAGE_LINES = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+# Courier glyphs are 0.6 em wide; longer lines are wrapped
+LINE_CHARS = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))
+
+# Everything up to the first page is the same in every PDF: header, catalog (1) and font (3).
+# The page tree (2) comes last, once the pages are known.
+_PDF_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+_PDF_CATALOG = b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+_PDF_FONT = b"3 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>\nendobj\n"
+_PDF_START = _PDF_HEADER + _PDF_CATALOG + _PDF_FONT
+_PDF_OFFSETS = (len(_PDF_HEADER), len(_PDF_HEADER) + len(_PDF_CATALOG))
+_PDF_PAGE = (b"%%d 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+             b"/Resources << /Font << /F1 3 0 R >> >> /Contents %%d 0 R >>\nendobj\n" % (PAGE_WIDTH, PAGE_HEIGHT))
+_PDF_TEXT_START = f"BT /F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td\n"
+_PDF_ESCAPE = str.maketrans({"\\": "\\\\", "(": "\\(", ")": "\\)"})
+
+def render_pdf(text: str) -> bytes:
+    """A PDF of a text document, page after page of monospaced lines."""
+    lines: List[str] = []
+    for line in text.split("\n"):
+        while len(line) > LINE_CHARS:
+            lines.append(line[:LINE_CHARS])
+            line = line[LINE_CHARS:]
+        lines.append(line)
+
+    parts = [_PDF_START]
+    size = len(_PDF_START)
+    offsets = [0, _PDF_OFFSETS[0], 0, _PDF_OFFSETS[1]]
+    kids = []
+    for first in range(0, len(lines), PAGE_LINES):
+        number = len(offsets)
+        content = (_PDF_TEXT_START
+                   + "\nT* ".join(f"({line.translate(_PDF_ESCAPE)}) Tj" for line in lines[first:first + PAGE_LINES])
+                   + "\nET").encode("cp1252", "replace")
+        page = _PDF_PAGE % (number, number + 1)
+        stream = b"%d 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (number + 1, len(content), content)
+        offsets.extend((size, size + len(page)))
+        parts.extend((page, stream))
+        size += len(page) + len(stream)
+        kids.append(b"%d 0 R" % number)
+    offsets[2] = size
+    tree = b"2 0 obj\n<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n" % (b" ".join(kids), len(kids))
+    parts.append(tree)
+    size += len(tree)
+    parts.append(b"xref\n0 %d\n0000000000 65535 f \n" % len(offsets))
+    parts.extend(b"%010d 00000 n \n" % offset for offset in offsets[1:])
+    parts.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets), size))
+    return b"".join(parts)
+
+
+def _csv_rows(index: int, kind: str, record: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """One row per line item, with the fields of its document repeated."""
+    fields = {"index": index, "kind": kind}
+    fields.update((key, value) for key, value in record.items() if key != "items")
+    items = record.get("items")
+    if not items:
+        yield fields
+        return
+    for item in items:
+        row = dict(fields)
+        row.update(item)
+        yield row
+
+
+def export_batch(directory: str, formats: Sequence[str], batch: int,
+                 documents: List[Document]) -> Tuple[int, int]:
+    """Write one batch of (order index, kind, text, data) documents; returns the documents and files written.
+
+    PDFs go to ``pdf/<kind>/<batch>/<index>.pdf``, the others to one file per
+    kind and batch: ``json/<kind>-<batch>.jsonl`` with a JSON object per
+    document and ``csv/<kind>-<batch>.csv`` with a row per line item. JSON
+    and CSV are written from ``data``, the document's typed values (see
+    ``DocumentGenerator.document_record``); documents without it only become PDFs.
+    """
+    by_kind: Dict[str, List[Tuple[int, str, Optional[Dict[str, Any]]]]] = {}
+    for index, kind, text, data in documents:
+        by_kind.setdefault(kind, []).append((index, text, data))
+    files = 0
+    for kind, texts in by_kind.items():
+        if "pdf" in formats:
+            folder = os.path.join(directory, "pdf", kind, f"{batch:06d}")
+            os.makedirs(folder, exist_ok=True)
+            for index, text, _ in texts:
+                with open(os.path.join(folder, f"{index:09d}.pdf"), "wb") as f:
+                    f.write(render_pdf(text))
+            files += len(texts)
+        if "json" not in formats and "csv" not in formats:
+            continue
+        records = [(index, data) for index, _, data in texts if data is not None]
+        if "json" in formats:
+            os.makedirs(os.path.join(directory, "json"), exist_ok=True)
+            with open(os.path.join(directory, "json", f"{kind}-{batch:06d}.jsonl"), "w", encoding="utf-8") as f:
+                for index, record in records:
+                    f.write(json.dumps(dict(index=index, kind=kind, **record), ensure_ascii=False))
+                    f.write("\n")
+            files += 1
+        if "csv" in formats:
+            rows = [row for index, record in records for row in _csv_rows(index, kind, record)]
+            columns = list(dict.fromkeys(key for row in rows for key in row))
+            os.makedirs(os.path.join(directory, "csv"), exist_ok=True)
+            with open(os.path.join(directory, "csv", f"{kind}-{batch:06d}.csv"), "w", newline="",
+                      encoding="utf-8") as f:
+                writer = csv.DictWriter(f, columns, restval="")
+                writer.writeheader()
+                writer.writerows(rows)
+            files += 1
+    return len(documents), files
+
+
+class ExportSink(DocumentSink):
+    """Exports documents as PDF, JSON and CSV files on a pool of worker processes.
+
+    Documents of the ``kinds`` to export are collected until ``batch_size``
+    orders have been added, like in the other sinks. The batch then goes to
+    a worker, which renders and writes it on its own (see ``export_batch``).
+    At most two batches per worker are in flight, so slow rendering or a slow
+    disk holds up ``add`` instead of filling memory.
+    """
+
+    def __init__(self, directory: str, formats: Sequence[str] = FORMATS, kinds: Sequence[str] = EXPORT_KINDS,
+                 workers: int = 0, batch_size: int = 1000):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"unknown export formats: {', '.join(sorted(unknown))}")
+        super().__init__(batch_size)
+        self.directory = directory
+        self.formats = tuple(formats)
+        self.kinds = tuple(kinds)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.files_written = 0
+        self._documents: List[Document] = []
+        self._pending = deque()
+        os.makedirs(directory, exist_ok=True)
+        self._pool = multiprocessing.Pool(self.workers)
+
+    def add(self, index: int, doc_number: str, documents: Dict[str, str],
+            data: Optional[Dict[str, Dict[str, Any]]] = None):
+        data = data or {}
+        for kind in self.kinds:
+            text = documents.get(kind)
+            if text:
+                self._documents.append((index, kind, text, data.get(kind)))
+        self._orders += 1
+        if self._orders >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._orders:
+            return
+        self.batches_written += 1
+        self._pending.append(self._pool.apply_async(
+            export_batch, (self.directory, self.formats, self.batches_written, self._documents)))
+        self._documents = []
+        self._orders = 0
+        while len(self._pending) > 2 * self.workers:
+            self._collect()
+
+    def _collect(self):
+        documents, files = self._pending.popleft().get()
+        self.documents_written += documents
+        self.files_written += files
+
+    def close(self):
+        self.flush()
+        try:
+            while self._pending:
+                self._collect()
+        finally:
+            self._pool.close()
+            self._pool.join()
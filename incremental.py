@@ -0,0 +1,109 @@
+from typing import Dict, Any, Iterable, Mapping, Optional, Set, Tuple
+from models import as_inquiry
+from policies import DecisionPolicy
+from process_manager import ProcessManager
+
+# Inventory fields and the documents that show them. The inquiry document
+# shows the catalog prices and the order total; the shipping documents show
+# none of the fields.
+DEPENDENCIES = {
+    "quantity": ("inventory",),
+    "location": ("inventory", "picking"),
+    "price": ("inquiry", "billing"),
+}
+
+
+class OrderBook:
+    """Processed orders whose documents follow changes to the inventory.
+
+    Orders are added with the result of ``process_sales_inquiry`` and indexed
+    by the SKUs on their lines. ``update`` changes the price, storage location
+    or stock level of SKUs in the manager's catalog and regenerates only the
+    documents showing a changed field (see ``DEPENDENCIES``), only for the
+    orders with those SKUs. An update costs time in proportion to the orders
+    it affects, however many orders the book holds.
+
+    Documents are regenerated as the process generated them, under the
+    numbers they were first issued with, so records kept by number (e.g. a
+    ``receivables.InvoiceLedger``) still refer to them. Halted orders have
+    no picking or billing documents, and none are made for them. Decisions
+    already taken are not revisited.
+    """
+
+    def __init__(self, manager: ProcessManager):
+        self.manager = manager
+        self.orders: Dict[int, Dict[str, Any]] = {}
+        self.regenerated = 0
+        self._by_sku: Dict[str, Set[int]] = {}
+        self._next_key = 0
+
+    def add(self, result: Dict[str, Any], key: Optional[int] = None) -> Optional[int]:
+        """Track a process result under ``key`` (the next free one by default); errors are not tracked."""
+        inquiry = result.get("inquiry_data")
+        if inquiry is None:
+            return None
+        if key is None:
+            key = self._next_key
+        self._next_key = max(self._next_key, key + 1)
+        self.orders[key] = result
+        for product in as_inquiry(inquiry).products:
+            keys = self._by_sku.get(product.id)
+            if keys is None:
+                keys = self._by_sku[product.id] = set()
+            keys.add(key)
+        return key
+
+    def process(self, inquiry_text: str, policy: DecisionPolicy) -> Dict[str, Any]:
+        """Run an inquiry through the process and track its result."""
+        result = self.manager.process_sales_inquiry(inquiry_text, policy)
+        self.add(result)
+        return result
+
+    def affected(self, sku: str) -> Set[int]:
+        """Keys of the orders with a line for ``sku``."""
+        return self._by_sku.get(sku, set())
+
+    def update(self, sku: str, price: Optional[float] = None, location: Optional[str] = None,
+               quantity: Optional[int] = None) -> Set[int]:
+        """Apply one inventory change; returns the keys of the orders whose documents were regenerated."""
+        return self.update_many([(sku, {"price": price, "location": location, "quantity": quantity})])
+
+    def update_many(self, updates: Iterable[Tuple[str, Mapping[str, Any]]]) -> Set[int]:
+        """Apply several changes (SKU, {field: value}) and regenerate every affected document once."""
+        catalog = self.manager.catalog
+        stale: Dict[int, Set[str]] = {}
+        for sku, changes in updates:
+            kinds = {kind for field in catalog.update(sku, **changes) for kind in DEPENDENCIES[field]}
+            if not kinds:
+                continue
+            for key in self.affected(sku):
+                found = stale.get(key)
+                if found is None:
+                    stale[key] = set(kinds)
+                else:
+                    found |= kinds
+        for key, kinds in stale.items():
+            self._regenerate(self.orders[key], kinds)
+        return set(stale)
+
+    def _regenerate(self, result: Dict[str, Any], kinds: Set[str]):
+        generator = self.manager.doc_generator
+        inventory = self.manager.inventory
+        inquiry = result["inquiry_data"]
+        documents = result["documents"]
+        numbers = result.get("numbers", {})
+        if "inquiry" in kinds:
+            documents["inquiry"] = generator.generate_inquiry_document(inquiry)
+            self.regenerated += 1
+        if "inventory" in kinds:
+            reserved = result.get("reserved")
+            available = None if reserved is None else self.manager.stock.available
+            documents["inventory"] = generator.generate_inventory_document(inquiry, inventory, available, reserved)
+            self.regenerated += 1
+        if "picking" in kinds and "picking" in documents:
+            documents["picking"] = generator.generate_numbered("picking", inquiry, inventory,
+                                                               numbers.get("picking"))[0]
+            self.regenerated += 1
+        if "billing" in kinds and "billing" in documents:
+            documents["billing"] = generator.generate_numbered("billing", inquiry, None, numbers.get("billing"))[0]
+            self.regenerated += 1
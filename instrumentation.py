@@ -0,0 +1,300 @@
+import json
+import sys
+from time import perf_counter_ns
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+# Latencies are counted in buckets of 1/8 of a power of two (in nanoseconds),
+# so a reported percentile is within about 6% of the exact value
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_BUCKETS = 64 * _SUB_BUCKETS
+QUANTILES = (0.5, 0.95, 0.99)
+# Samples are buffered and folded into the histograms in bulk
+FLUSH_EVERY = 1 << 15
+ALLOCATION_SAMPLE_EVERY = 100
+
+
+def _buckets(ns: np.ndarray) -> np.ndarray:
+    """Bucket index of every sample: the top 4 bits of the value and its bit length."""
+    mantissa, exponent = np.frexp(ns.astype(np.float64))  # ns = mantissa * 2**exponent
+    index = ((exponent.astype(np.int64) - _SUB_BUCKET_BITS - 1) << _SUB_BUCKET_BITS) \
+        + (mantissa * (2 * _SUB_BUCKETS)).astype(np.int64)
+    return np.where(ns < 2 * _SUB_BUCKETS, np.maximum(ns, 0), index)
+
+
+def _bucket_bounds(index: int):
+    if index < 2 * _SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> _SUB_BUCKET_BITS) - 1
+    mantissa = index - (shift << _SUB_BUCKET_BITS)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Histogram:
+    """Latency histogram with log-linear buckets, mergeable across processes."""
+
+    def __init__(self):
+        self.counts = np.zeros(_BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.allocation_samples = 0
+        self.allocated_blocks = 0
+
+    def add(self, ns: np.ndarray):
+        """Count a batch of samples (int64 nanoseconds)."""
+        if not len(ns):
+            return
+        self.counts += np.bincount(_buckets(ns), minlength=_BUCKETS)
+        self.count += len(ns)
+        self.total_ns += int(ns.sum())
+        low = int(ns.min())
+        if self.min_ns is None or low < self.min_ns:
+            self.min_ns = low
+        self.max_ns = max(self.max_ns, int(ns.max()))
+
+    def merge(self, other: "Histogram"):
+        self.counts += other.counts
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None and (self.min_ns is None or other.min_ns < self.min_ns):
+            self.min_ns = other.min_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.allocation_samples += other.allocation_samples
+        self.allocated_blocks += other.allocated_blocks
+
+    def percentile(self, q: float) -> int:
+        """Approximate ``q`` quantile (0..1) in nanoseconds."""
+        if not self.count:
+            return 0
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        low, high = _bucket_bounds(min(index, _BUCKETS - 1))
+        return min(max((low + high) // 2, self.min_ns), self.max_ns)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "count": self.count,
+            "total_seconds": self.total_ns / 1e9,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}_ms"] = self.percentile(q) / 1e6
+        summary["max_ms"] = self.max_ns / 1e6
+        if self.allocation_samples:
+            summary["net_allocated_blocks"] = self.allocated_blocks / self.allocation_samples
+        return summary
+
+
+class StageTimer:
+    """Times consecutive stages of one order: each ``lap`` closes the running stage."""
+    __slots__ = ("profiler", "add", "start", "last", "blocks")
+
+    def __init__(self, profiler: "Profiler", blocks: Optional[int] = None):
+        self.profiler = profiler
+        self.add = profiler.pending.append
+        self.blocks = blocks
+        self.start = self.last = perf_counter_ns()
+
+    def lap(self, stage: str):
+        now = perf_counter_ns()
+        add = self.add
+        add(stage)
+        add(now - self.last)
+        if self.blocks is not None:
+            blocks = sys.getallocatedblocks()
+            self.profiler.allocations.append((stage, blocks - self.blocks))
+            self.blocks = blocks
+            # Leave the time of the heap walk out of the next stage and the total
+            after = perf_counter_ns()
+            self.start += after - now
+            now = after
+        self.last = now
+
+    def done(self, status: str):
+        """Record the whole order under "total" and count its outcome."""
+        add = self.add
+        add("total")
+        add(perf_counter_ns() - self.start)
+        self.profiler.count(status)
+
+
+class _NullTimer:
+    """Stands in for a ``StageTimer`` when profiling is off."""
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def done(self, status: str):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _CountingTimer(_NullTimer):
+    """For orders left out of the latency sample: only the outcome is counted."""
+    __slots__ = ("profiler",)
+
+    def __init__(self, profiler: "Profiler"):
+        self.profiler = profiler
+
+    def done(self, status: str):
+        self.profiler.count(status)
+
+
+class Profiler:
+    """Per-stage latency histograms and counters for the sales process.
+
+    ``ProcessManager(profile=True)`` records the time of each stage of every
+    order (parse, inquiry, inventory, picking, shipping, billing and total)
+    and counts the outcomes. A stage costs two list appends; the samples are
+    turned into histograms with NumPy every ``FLUSH_EVERY`` samples and
+    before reporting.
+
+    Timing costs a few microseconds per order. To bring that down on large
+    runs, ``sample_every=n`` times only every n-th order; the outcome
+    counters still count every order.
+
+    With ``track_allocations`` every ``allocation_sample_every``-th timed
+    order also records the net number of memory blocks each stage leaves
+    allocated (``sys.getallocatedblocks``). That call walks the whole heap,
+    so it is sampled rather than made for every order.
+    """
+
+    def __init__(self, track_allocations: bool = False, sample_every: int = 1,
+                 allocation_sample_every: int = ALLOCATION_SAMPLE_EVERY):
+        self.track_allocations = track_allocations
+        self.sample_every = sample_every
+        self.allocation_sample_every = allocation_sample_every
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        # Flat (stage, nanoseconds, stage, nanoseconds, ...) buffer
+        self.pending: List[Any] = []
+        self.allocations: List[tuple] = []
+        self._orders = 0
+        self._timed = 0
+        self._counting = _CountingTimer(self)
+
+    def timer(self) -> StageTimer:
+        """Start timing one order."""
+        if self.sample_every > 1:
+            self._orders += 1
+            if self._orders % self.sample_every:
+                return self._counting
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+        if self.track_allocations:
+            self._timed += 1
+            if self._timed % self.allocation_sample_every == 0:
+                return StageTimer(self, sys.getallocatedblocks())
+        return StageTimer(self)
+
+    def fresh(self) -> "Profiler":
+        """An empty profiler with the same settings."""
+        return Profiler(self.track_allocations, self.sample_every, self.allocation_sample_every)
+
+    def take(self) -> "Profiler":
+        """Hand over everything measured so far and start again from empty.
+
+        Sampling carries on where it was, which matters for pool workers that
+        report back once per chunk.
+        """
+        self.flush()
+        taken = self.fresh()
+        taken.stages, taken.counters = self.stages, self.counters
+        self.stages, self.counters = {}, {}
+        return taken
+
+    def record(self, stage: str, ns: int):
+        self.pending.append(stage)
+        self.pending.append(ns)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def _histogram(self, stage: str) -> Histogram:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        return histogram
+
+    def flush(self):
+        """Fold the buffered samples into the per-stage histograms."""
+        if self.pending:
+            codes: Dict[str, int] = {}
+            stage_codes = np.array([codes.setdefault(name, len(codes)) for name in self.pending[0::2]])
+            ns = np.array(self.pending[1::2], dtype=np.int64)
+            self.pending.clear()
+            for name, code in codes.items():
+                self._histogram(name).add(ns[stage_codes == code])
+        for stage, blocks in self.allocations:
+            histogram = self._histogram(stage)
+            histogram.allocation_samples += 1
+            histogram.allocated_blocks += blocks
+        self.allocations.clear()
+
+    def merge(self, other: "Profiler"):
+        """Add the measurements of another profiler (e.g. from a worker process)."""
+        self.flush()
+        other.flush()
+        for stage, histogram in other.stages.items():
+            self._histogram(stage).merge(histogram)
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def report(self) -> Dict[str, Any]:
+        self.flush()
+        return {
+            "stages": {stage: histogram.summary() for stage, histogram in self.stages.items()},
+            "counters": dict(self.counters),
+            "sample_every": self.sample_every,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+    def to_prometheus(self, prefix: str = "sales") -> str:
+        """The report in the Prometheus text exposition format."""
+        self.flush()
+        lines: List[str] = [
+            f"# HELP {prefix}_stage_seconds Time spent per order in each stage of the sales process.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, histogram in self.stages.items():
+            for q in QUANTILES:
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f"{histogram.percentile(q) / 1e9:.9f}")
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.total_ns / 1e9:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        if self.track_allocations:
+            lines.append(f"# HELP {prefix}_stage_net_allocated_blocks Memory blocks left allocated "
+                         f"by one run of each stage (sampled).")
+            lines.append(f"# TYPE {prefix}_stage_net_allocated_blocks gauge")
+            for stage, histogram in self.stages.items():
+                if histogram.allocation_samples:
+                    lines.append(f'{prefix}_stage_net_allocated_blocks{{stage="{stage}"}} '
+                                 f"{histogram.allocated_blocks / histogram.allocation_samples:.2f}")
+        lines.append(f"# HELP {prefix}_events_total Orders by outcome.")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, n in self.counters.items():
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the report to ``path``: Prometheus text for ``.prom``, else JSON."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def format_table(self) -> str:
+        """Short per-stage table for the console."""
+        self.flush()
+        rows = [f"{'stage':<10} {'count':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for stage, histogram in self.stages.items():
+            s = histogram.summary()
+            rows.append(f"{stage:<10} {s['count']:>9} {s['mean_ms']:>9.4f} {s['p50_ms']:>9.4f} "
+                        f"{s['p95_ms']:>9.4f} {s['p99_ms']:>9.4f}")
+        return "\n".join(rows)
@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from batch import BatchRunner
+from catalog import ProductCatalog
+from inventory import SQLiteInventory
+from models import Inquiry
+from numbering import DEFAULT_PATH, SQLiteNumbering
+from policies import POLICIES, DecisionPolicy, get_policy
+from process_manager import ProcessManager
+
+# Requests larger than this are refused; an inquiry is a few hundred bytes
+MAX_BODY = 1 << 20
+# HTTP status per order status
+HTTP_STATUS = {"completed": 200, "halted": 200, "error": 422}
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+class Busy(Exception):
+    """More orders are waiting than the service accepts."""
+
+
+class IntakeService(BatchRunner):
+    """Local HTTP/JSON intake in front of a warm ``ProcessManager``.
+
+    ``POST /inquiries`` takes an inquiry as plain text, as JSON ``{"text": ...}``
+    or as a structured order (see ``InquiryParser.from_order``) and answers
+    with the record of the processed order, as in batch runs. ``GET /health``
+    reports counters.
+
+    Concurrent requests are collected into micro-batches: the batcher takes
+    whatever has arrived, waits at most ``max_wait`` seconds for more, and
+    runs up to ``max_batch`` orders together. Their reservations go to
+    ``manager.stock`` in one ``reserve_many`` call (with ``reserve=True``), so
+    the SQLite backend writes one transaction per batch. Batches run on one
+    dedicated thread, since the backends are not thread-safe, while the event
+    loop keeps reading requests for the next batch. Once ``max_pending``
+    orders are waiting, further requests are answered 503 at once, which
+    bounds how long an accepted request can wait.
+    """
+
+    def __init__(self, manager: Optional[ProcessManager] = None,
+                 policy: Optional[DecisionPolicy] = None,
+                 reserve: bool = True,
+                 max_batch: int = 256,
+                 max_wait: float = 0.002,
+                 max_pending: int = 4096,
+                 include_documents: bool = False,
+                 run_id: Optional[str] = None):
+        super().__init__(manager, policy, include_documents, reserve, max_batch, run_id)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.waiting = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="intake")
+
+    async def submit(self, text: str = "", inquiry: Optional[Inquiry] = None) -> Dict[str, Any]:
+        """Process one order in the next batch and return its record."""
+        if self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise Busy()
+        future = asyncio.get_running_loop().create_future()
+        index = self.requests
+        self.requests += 1
+        self.waiting += 1
+        self._queue.put_nowait((index, text, inquiry, future))
+        try:
+            return await future
+        finally:
+            self.waiting -= 1
+
+    def _drain(self, batch: List[tuple]):
+        queue = self._queue
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch and self.max_wait:
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+            jobs = [(index, text, inquiry) for index, text, inquiry, _ in batch]
+            try:
+                records = await loop.run_in_executor(self._executor, self._process, jobs)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            for (*_, future), record in zip(batch, records):
+                if not future.done():
+                    future.set_result(record)
+
+    def _process(self, jobs: List[Tuple[int, str, Optional[Inquiry]]]) -> List[Dict[str, Any]]:
+        """Records of one batch, in order; runs on the intake thread."""
+        texts = [text for _, text, inquiry in jobs if inquiry is None]
+        parsed = iter(self._parse_all(texts))
+        inquiries = [next(parsed) if inquiry is None else inquiry for _, _, inquiry in jobs]
+        chunk = [(index, text) for index, text, _ in jobs]
+        if self.reserve:
+            return list(self._run_reserved(chunk, inquiries))
+        process = self.manager.process_sales_inquiry
+        return [self.finish(index, process(text, self.policy, inquiry), text)
+                for (index, text), inquiry in zip(chunk, inquiries)]
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": round(self.requests / self.batches, 1) if self.batches else 0.0,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+    async def _order(self, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        content_type = headers.get("content-type", "")
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return 400, {"status": "error", "error": "Request body is not UTF-8"}
+        inquiry = None
+        if content_type.startswith("application/json"):
+            try:
+                order = json.loads(text)
+            except ValueError as e:
+                return 400, {"status": "error", "error": f"Malformed JSON: {e}"}
+            if not isinstance(order, dict):
+                return 400, {"status": "error", "error": "Expected a JSON object"}
+            if isinstance(order.get("text"), str):
+                text = order["text"]
+            else:
+                try:
+                    inquiry = self.manager.parser.from_order(order)
+                except ValueError as e:
+                    return 400, {"status": "error", "error": str(e)}
+                text = ""
+        try:
+            record = await self.submit(text, inquiry)
+        except Busy:
+            return 503, {"status": "error", "error": "Too many orders waiting, try again later"}
+        return HTTP_STATUS.get(record["status"], 200), record
+
+    async def handle(self, method: str, path: str, headers: Dict[str, str],
+                     body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Status and JSON payload of one request."""
+        if path == "/health":
+            return (200, self.health()) if method == "GET" else (405, {"error": "Use GET"})
+        if path == "/inquiries":
+            if method != "POST":
+                return 405, {"error": "Use POST"}
+            try:
+                return await self._order(headers, body)
+            except Exception as e:
+                return 500, {"status": "error", "error": str(e)}
+        return 404, {"error": f"No such endpoint: {path}"}
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one HTTP/1.1 connection, request after request while it is kept alive."""
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *lines = head.decode("latin-1").split("\r\n")
+                method, path, version = request_line.split(" ", 2)
+                headers = {}
+                for line in lines:
+                    if line:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": f"Request bodies are limited to {MAX_BODY} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, path.split("?", 1)[0], headers, body)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                             + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            # Closed by the client, or not HTTP
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, ready=None):
+        """Serve until cancelled; ``ready`` is called with the bound port once requests are accepted."""
+        self._queue = asyncio.Queue()
+        batcher = asyncio.get_running_loop().create_task(self._batcher())
+        server = await asyncio.start_server(self._connection, host, port, backlog=1024)
+        try:
+            if ready is not None:
+                ready(server.sockets[0].getsockname()[1])
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve order intake over HTTP/JSON on the local machine.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--catalog", metavar="CSV", help="Catalog to load at start (default: the sample catalog)")
+    parser.add_argument("--policy", default="stock", choices=sorted(POLICIES),
+                        help="How the FG/RM decision points are answered")
+    parser.add_argument("--no-reserve", action="store_true",
+                        help="Do not reserve stock; the policy decides on stock levels alone")
+    parser.add_argument("--inventory-db", help="SQLite file holding stock and reservations")
+    parser.add_argument("--numbering", default=DEFAULT_PATH, metavar="PATH",
+                        help="SQLite file of document number sequences, shared with batch_main "
+                             "(default %(default)s), so numbers stay unique across restarts")
+    parser.add_argument("--max-batch", type=int, default=256, help="Orders processed together at most")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="How long a batch waits for more orders after the first")
+    parser.add_argument("--max-pending", type=int, default=4096,
+                        help="Orders waiting at most before requests are refused with 503")
+    parser.add_argument("--documents", action="store_true", help="Include the generated documents in the answers")
+    args = parser.parse_args(argv)
+
+    catalog = ProductCatalog.from_csv(args.catalog) if args.catalog else None
+    numbering = SQLiteNumbering(args.numbering)
+    manager = ProcessManager(verbose=False, catalog=catalog, numbering=numbering)
+    if args.inventory_db:
+        manager.stock = SQLiteInventory(args.inventory_db)
+        manager.stock.load({sku: item.quantity for sku, item in manager.catalog.items()})
+    service = IntakeService(manager, get_policy(args.policy), not args.no_reserve, args.max_batch,
+                            args.max_wait_ms / 1000, args.max_pending, args.documents)
+    try:
+        asyncio.run(service.serve(args.host, args.port,
+                                  lambda port: print(f"Accepting orders on http://{args.host}:{port}/inquiries",
+                                                     flush=True)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        numbering.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import sqlite3
+import uuid
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# One order for reserve_many: (order reference or None, product lines)
+Order = Tuple[Optional[str], Iterable[Dict[str, Any]]]
+
+# SQLite limits the number of host parameters per statement
+IN_CHUNK = 500
+
+
+def order_lines(products: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Requested quantity per product ID, adding up repeated lines."""
+    wanted = {}
+    for product in products:
+        wanted[product['id']] = wanted.get(product['id'], 0) + product['quantity']
+    return wanted
+
+
+class InventoryBackend:
+    """Finished goods stock per product ID and the reservations made against it.
+
+    A reservation covers all lines of one order or none of them.
+    """
+
+    def available(self, sku: str) -> int:
+        raise NotImplementedError
+
+    def reserve(self, products: Iterable[Dict[str, Any]], order_ref: Optional[str] = None) -> bool:
+        """Reserve all lines of one order; False (and nothing reserved) if any line is short."""
+        raise NotImplementedError
+
+    def reserve_many(self, orders: Sequence[Order]) -> List[bool]:
+        """Reserve several orders in sequence, returning one outcome per order."""
+        return [self.reserve(products, order_ref) for order_ref, products in orders]
+
+    def release(self, order_ref: str):
+        """Put the stock of a reservation back."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryInventory(InventoryBackend):
+    """Stock kept in a dict, lost when the process ends."""
+
+    def __init__(self, quantities: Mapping[str, int]):
+        self.quantities = dict(quantities)
+        self.reservations: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_catalog(cls, catalog: Mapping[str, Any]) -> "MemoryInventory":
+        return cls({sku: item['quantity'] for sku, item in catalog.items()})
+
+    def available(self, sku: str) -> int:
+        return self.quantities.get(sku, 0)
+
+    def reserve(self, products: Iterable[Dict[str, Any]], order_ref: Optional[str] = None) -> bool:
+        if order_ref is not None and order_ref in self.reservations:
+            return True
+        wanted = order_lines(products)
+        quantities = self.quantities
+        for sku, quantity in wanted.items():
+            if sku not in quantities or quantities[sku] < quantity:
+                return False
+        for sku, quantity in wanted.items():
+            quantities[sku] -= quantity
+        self.reservations[order_ref or uuid.uuid4().hex] = wanted
+        return True
+
+    def release(self, order_ref: str):
+        for sku, quantity in self.reservations.pop(order_ref, {}).items():
+            self.quantities[sku] += quantity
+
+
+class SQLiteInventory(InventoryBackend):
+    """Stock and reservations persisted in a local SQLite database in WAL mode.
+
+    ``reserve_many`` handles a whole batch of orders in one write transaction
+    with a fixed number of statements, however many order lines there are.
+    Reservations are stored by order reference, so an interrupted batch can be
+    run again: orders that were already reserved are skipped, not reserved twice.
+    All SQL is constant text and is compiled once by the sqlite3 statement cache.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS stock ("
+        " sku TEXT PRIMARY KEY,"
+        " quantity INTEGER NOT NULL CHECK (quantity >= 0))",
+        "CREATE TABLE IF NOT EXISTS reservations ("
+        " order_ref TEXT NOT NULL,"
+        " sku TEXT NOT NULL,"
+        " quantity INTEGER NOT NULL,"
+        " PRIMARY KEY (order_ref, sku))",
+    )
+    SELECT_STOCK = "SELECT sku, quantity FROM stock WHERE sku IN ({})"
+    SELECT_RESERVED = "SELECT DISTINCT order_ref FROM reservations WHERE order_ref IN ({})"
+    UPDATE_STOCK = "UPDATE stock SET quantity = ? WHERE sku = ?"
+    INSERT_RESERVATION = "INSERT INTO reservations (order_ref, sku, quantity) VALUES (?, ?, ?)"
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                          cached_statements=256, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+
+    def load(self, quantities: Mapping[str, int], replace: bool = False):
+        """Set initial stock levels; existing levels are kept unless ``replace`` is set."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._transaction():
+            self.connection.executemany(f"{verb} INTO stock (sku, quantity) VALUES (?, ?)",
+                                        quantities.items())
+
+    def _transaction(self):
+        return Transaction(self.connection)
+
+    def _select_in(self, sql: str, keys: List[str]) -> List[tuple]:
+        rows = []
+        for i in range(0, len(keys), IN_CHUNK):
+            chunk = keys[i:i + IN_CHUNK]
+            rows.extend(self.connection.execute(sql.format(",".join("?" * len(chunk))), chunk))
+        return rows
+
+    def available(self, sku: str) -> int:
+        row = self.connection.execute("SELECT quantity FROM stock WHERE sku = ?", (sku,)).fetchone()
+        return row[0] if row else 0
+
+    def reserve(self, products: Iterable[Dict[str, Any]], order_ref: Optional[str] = None) -> bool:
+        return self.reserve_many([(order_ref, products)])[0]
+
+    def reserve_many(self, orders: Sequence[Order]) -> List[bool]:
+        orders = [(order_ref or uuid.uuid4().hex, order_lines(products))
+                  for order_ref, products in orders]
+        skus = sorted({sku for _, wanted in orders for sku in wanted})
+        outcomes = []
+        with self._transaction():
+            # BEGIN IMMEDIATE holds the write lock, so the levels read here stay valid
+            done = {row[0] for row in self._select_in(self.SELECT_RESERVED, [ref for ref, _ in orders])}
+            stock = dict(self._select_in(self.SELECT_STOCK, skus))
+            changed = set()
+            reserved_lines = []
+            for order_ref, wanted in orders:
+                if order_ref in done:
+                    outcomes.append(True)
+                    continue
+                # A SKU without a stock row has no stock, whatever quantity is asked for
+                if any(sku not in stock or stock[sku] < quantity for sku, quantity in wanted.items()):
+                    outcomes.append(False)
+                    continue
+                for sku, quantity in wanted.items():
+                    stock[sku] -= quantity
+                    reserved_lines.append((order_ref, sku, quantity))
+                changed.update(wanted)
+                done.add(order_ref)
+                outcomes.append(True)
+            self.connection.executemany(self.UPDATE_STOCK, ((stock[sku], sku) for sku in changed))
+            self.connection.executemany(self.INSERT_RESERVATION, reserved_lines)
+        return outcomes
+
+    def release(self, order_ref: str):
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE stock SET quantity = quantity + (SELECT r.quantity FROM reservations r"
+                " WHERE r.order_ref = ? AND r.sku = stock.sku)"
+                " WHERE sku IN (SELECT sku FROM reservations WHERE order_ref = ?)",
+                (order_ref, order_ref))
+            self.connection.execute("DELETE FROM reservations WHERE order_ref = ?", (order_ref,))
+
+    def close(self):
+        self.connection.close()
+
+
+class Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,165 @@
+import math
+from array import array
+from typing import Dict, Any, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+
+class Record:
+    """Base for slotted records that can also be read like the dicts they replace.
+
+    ``record['name']`` and ``record.get('name', default)`` work, so code that
+    was written against the old ``Dict[str, Any]`` data keeps working.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class OrderLine(Record):
+    """One requested product of an inquiry.
+
+    The parser hands out the same instance for identical product lines, so
+    order lines must be treated as read-only.
+    """
+    __slots__ = ("id", "name", "quantity", "price")
+
+    def __init__(self, id: str, name: str, quantity: int, price: Optional[float] = None):
+        self.id = id
+        self.name = name
+        self.quantity = quantity
+        self.price = price
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'name': self.name, 'quantity': self.quantity, 'price': self.price}
+
+
+class Inquiry(Record):
+    """A parsed sales inquiry, as produced by ``ProcessManager.parse_inquiry``."""
+    __slots__ = ("doc_number", "customer", "products", "delivery", "special_requirements")
+
+    def __init__(self, doc_number: str, customer: str, products: Sequence[OrderLine],
+                 delivery: str = "", special_requirements: str = ""):
+        self.doc_number = doc_number
+        self.customer = customer
+        self.products = products
+        self.delivery = delivery
+        self.special_requirements = special_requirements
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Inquiry":
+        """Convert the old dict representation."""
+        products = tuple(
+            OrderLine(product['id'], product['name'], product['quantity'], product.get('price'))
+            for product in data.get("products", [])
+        )
+        return cls(data.get("doc_number", "Unknown"), data.get("customer", ""), products,
+                   data.get("delivery", ""), data.get("special_requirements", ""))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "doc_number": self.doc_number,
+            "customer": self.customer,
+            "products": [product.to_dict() for product in self.products],
+            "delivery": self.delivery,
+            "special_requirements": self.special_requirements
+        }
+
+
+# What the document and pipeline functions accept: an Inquiry or the old dict
+InquiryData = Union[Inquiry, Mapping[str, Any]]
+
+
+def as_inquiry(inquiry_data: InquiryData) -> Inquiry:
+    """Accept an ``Inquiry`` as is and convert the old dict representation."""
+    if isinstance(inquiry_data, Inquiry):
+        return inquiry_data
+    return Inquiry.from_dict(inquiry_data)
+
+
+class OrderBatch:
+    """Many inquiries stored column by column in typed arrays.
+
+    Strings (customers, product names, document numbers ...) are stored once
+    in a string table and referenced by code, quantities and prices live in
+    flat arrays, and ``line_start`` holds where each inquiry's lines begin.
+    Indexing returns an ``Inquiry`` built on the fly.
+    """
+
+    def __init__(self, inquiries: Iterable[InquiryData] = ()):
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.doc_number = array('I')
+        self.customer = array('I')
+        self.delivery = array('I')
+        self.special_requirements = array('I')
+        self.line_start = array('Q', [0])
+        self.sku = array('I')
+        self.name = array('I')
+        self.quantity = array('q')
+        self.price = array('d')
+        self.extend(inquiries)
+
+    def _code(self, text: str) -> int:
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self._strings)
+            self._strings.append(text)
+        return code
+
+    def append(self, inquiry_data: InquiryData):
+        inquiry = as_inquiry(inquiry_data)
+        code = self._code
+        self.doc_number.append(code(inquiry.doc_number))
+        self.customer.append(code(inquiry.customer))
+        self.delivery.append(code(inquiry.delivery))
+        self.special_requirements.append(code(inquiry.special_requirements))
+        for product in inquiry.products:
+            self.sku.append(code(product.id))
+            self.name.append(code(product.name))
+            self.quantity.append(product.quantity)
+            self.price.append(math.nan if product.price is None else product.price)
+        self.line_start.append(len(self.quantity))
+
+    def extend(self, inquiries: Iterable[InquiryData]):
+        for inquiry_data in inquiries:
+            self.append(inquiry_data)
+
+    def __len__(self) -> int:
+        return len(self.doc_number)
+
+    def __getitem__(self, i: int) -> Inquiry:
+        if i < 0:
+            i += len(self)
+        strings = self._strings
+        products = tuple(
+            OrderLine(strings[self.sku[j]], strings[self.name[j]], self.quantity[j],
+                      None if math.isnan(self.price[j]) else self.price[j])
+            for j in range(self.line_start[i], self.line_start[i + 1])
+        )
+        return Inquiry(strings[self.doc_number[i]], strings[self.customer[i]], products,
+                       strings[self.delivery[i]], strings[self.special_requirements[i]])
+
+    def __iter__(self) -> Iterator[Inquiry]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def lines_of(self, i: int) -> range:
+        """Positions of inquiry ``i``'s lines in the line columns."""
+        return range(self.line_start[i], self.line_start[i + 1])
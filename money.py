@@ -0,0 +1,32 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any
+
+# Amounts are handled as integer euro cents so that sums are exact; rates
+# (tax, discount) as integer millionths so that they scale integer cents exactly
+RATE_SCALE = 1_000_000
+
+
+def to_cents(amount: Any) -> int:
+    """Exact cents of an amount in EUR (float, str or Decimal), rounded half up."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents: int) -> str:
+    """1234567 -> "12345.67", like formatting the amount with ``.2f``."""
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+
+def to_rate(rate: Any) -> int:
+    """A rate such as "0.19" or 0.19 as integer millionths (190000)."""
+    scaled = Decimal(str(rate)) * RATE_SCALE
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Rate {rate} has more than 6 decimal places")
+    return int(scaled)
+
+
+def apply_rate(cents: int, rate: int) -> int:
+    """``cents * rate / RATE_SCALE`` rounded half up (away from zero), as on invoices."""
+    sign = -1 if cents < 0 else 1
+    return sign * ((abs(cents) * rate * 2 + RATE_SCALE) // (2 * RATE_SCALE))
@@ -0,0 +1,183 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from inventory import Transaction
+
+# Document types with their own sequence, by number prefix
+INQUIRY, PICKING, SHIPPING, INVOICE, WAVE = "INQ", "PICK", "SHIP", "INV", "WAVE"
+KINDS = (INQUIRY, PICKING, SHIPPING, INVOICE, WAVE)
+
+# Sequence numbers are printed zero-padded to this many digits
+DIGITS = 8
+DEFAULT_BLOCK = 1000
+# Where batch_main and intake keep the sequences unless told otherwise
+DEFAULT_PATH = "numbers.db"
+
+
+def document_number(kind: str, stamp: str, number: int) -> str:
+    """e.g. ("INV", "20240101", 42) -> "INV-20240101-00000042"."""
+    return f"{kind}-{stamp}-{number:0{DIGITS}d}"
+
+
+class Numbering:
+    """Hands out document sequence numbers: unique and increasing per document type.
+
+    Implementations are thread-safe, so one numbering can serve several
+    threads (e.g. the sessions of a web app sharing a ``ProcessManager``).
+    """
+
+    def next(self, kind: str) -> int:
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class MemoryNumbering(Numbering):
+    """Counters kept in a dict: unique within one process, starting from 1 on every run."""
+
+    def __init__(self):
+        self.last: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def next(self, kind: str) -> int:
+        with self._lock:
+            number = self.last[kind] = self.last.get(kind, 0) + 1
+        return number
+
+
+class SQLiteNumbering(Numbering):
+    """Sequences persisted in a local SQLite database, shared by any number of processes.
+
+    Numbers are not taken from the database one at a time: a process reserves
+    a block of ``block_size`` consecutive numbers per document type in one
+    short write transaction and then issues them from memory. Processes
+    therefore only meet on the database once per block, and a number is never
+    issued twice, whichever process or run it comes from. Within a process
+    numbers increase; blocks are handed out in increasing order.
+
+    Every block is recorded with its owner and the last number issued from it,
+    written on ``flush`` and when the block is closed (on ``close`` or when
+    the next block is reserved). Numbers left in a closed block are not
+    reused; ``audit`` lists them as gaps, so every missing number can be
+    accounted for.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sequences ("
+        " kind TEXT PRIMARY KEY,"
+        " next INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS blocks ("
+        " kind TEXT NOT NULL,"
+        " first INTEGER NOT NULL,"
+        " last INTEGER NOT NULL,"
+        " issued INTEGER,"
+        " closed INTEGER NOT NULL DEFAULT 0,"
+        " owner TEXT NOT NULL,"
+        " reserved_at REAL NOT NULL,"
+        " PRIMARY KEY (kind, first))",
+    )
+    UPDATE_ISSUED = "UPDATE blocks SET issued = ?, closed = ? WHERE kind = ? AND first = ?"
+
+    def __init__(self, path: str, block_size: int = DEFAULT_BLOCK, timeout: float = 30.0):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.path = path
+        self.block_size = block_size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        # kind -> [first, last, last issued] of the block being issued from
+        self._blocks: Dict[str, List[int]] = {}
+        # Guards the blocks and the connection, which is shared between threads
+        self._lock = threading.RLock()
+
+    def next(self, kind: str) -> int:
+        with self._lock:
+            block = self._blocks.get(kind)
+            if block is None or block[2] >= block[1]:
+                block = self._reserve(kind, block)
+            block[2] += 1
+            return block[2]
+
+    def _reserve(self, kind: str, used: Optional[List[int]]) -> List[int]:
+        with Transaction(self.connection) as connection:
+            if used is not None:
+                connection.execute(self.UPDATE_ISSUED, (used[2], 1, kind, used[0]))
+            connection.execute("INSERT OR IGNORE INTO sequences (kind, next) VALUES (?, 1)", (kind,))
+            first = connection.execute("SELECT next FROM sequences WHERE kind = ?", (kind,)).fetchone()[0]
+            last = first + self.block_size - 1
+            connection.execute("UPDATE sequences SET next = ? WHERE kind = ?", (last + 1, kind))
+            connection.execute(
+                "INSERT INTO blocks (kind, first, last, owner, reserved_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, first, last, self.owner, time.time()))
+        block = self._blocks[kind] = [first, last, first - 1]
+        return block
+
+    def flush(self, closed: bool = False):
+        """Record how far the current blocks have been issued (and, if ``closed``, give them up)."""
+        with self._lock:
+            if self._blocks:
+                with Transaction(self.connection) as connection:
+                    connection.executemany(self.UPDATE_ISSUED, [
+                        (issued, int(closed), kind, first) for kind, (first, _, issued) in self._blocks.items()])
+            if closed:
+                self._blocks.clear()
+
+    def close(self):
+        """Close the current blocks; their unissued numbers become audited gaps."""
+        with self._lock:
+            self.flush(closed=True)
+            self.connection.close()
+
+    def audit(self, kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Issued and reserved counts and the gaps per document type.
+
+        A gap is a (first, last, cause, owner) range of numbers that was
+        reserved but not issued. Causes: "unused" for the rest of a closed
+        block, "open" for the rest of a block its process may still issue
+        from, "unconfirmed" for a block whose process never reported back
+        (still running without a flush, or killed), and "missing" for numbers
+        outside every block, which only a damaged database has.
+        """
+        query = "SELECT kind, first, last, issued, closed, owner FROM blocks"
+        with self._lock:
+            self.flush()
+            if kind is not None:
+                rows = self.connection.execute(query + " WHERE kind = ? ORDER BY first", (kind,)).fetchall()
+            else:
+                rows = self.connection.execute(query + " ORDER BY kind, first").fetchall()
+        report: Dict[str, Dict[str, Any]] = {}
+        expected: Dict[str, int] = {}
+        for kind_, first, last, issued, closed, owner in rows:
+            entry = report.setdefault(kind_, {"issued": 0, "reserved": 0, "gaps": []})
+            gaps: List[Tuple[int, int, str, str]] = entry["gaps"]
+            start = expected.get(kind_, 1)
+            if first > start:
+                gaps.append((start, first - 1, "missing", ""))
+            expected[kind_] = last + 1
+            entry["reserved"] += last - first + 1
+            if issued is None:
+                gaps.append((first, last, "unconfirmed", owner))
+                continue
+            entry["issued"] += issued - first + 1
+            if issued < last:
+                gaps.append((issued + 1, last, "unused" if closed else "open", owner))
+        return report
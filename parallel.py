@@ -0,0 +1,161 @@
+import multiprocessing
+import time
+from multiprocessing.util import Finalize
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from batch import BatchRunner, chunked
+from catalog import ProductCatalog
+from instrumentation import Profiler
+from inventory import InventoryBackend
+from numbering import SQLiteNumbering
+from policies import DecisionPolicy, ReservingPolicy, INSUFFICIENT
+from process_manager import ProcessManager
+
+
+class SharedStock(InventoryBackend):
+    """Finished goods stock shared by all worker processes.
+
+    Quantities live in one shared-memory array. Locks are striped by product ID,
+    so orders for different SKUs rarely wait on each other. An order takes the
+    locks of all its SKUs in ascending order before checking and decrementing,
+    which makes a multi-line reservation atomic and deadlock free.
+    """
+
+    def __init__(self, inventory: Dict[str, Any], shards: int = 64, context=None):
+        context = context or multiprocessing.get_context()
+        self.index = {sku: i for i, sku in enumerate(inventory)}
+        self.quantities = context.RawArray('q', [int(item['quantity']) for item in inventory.values()])
+        self.locks = [context.Lock() for _ in range(shards)]
+
+    def reserve(self, products: Iterable[Dict[str, Any]], order_ref: Optional[str] = None) -> bool:
+        """Reserve all lines of one order, or nothing at all."""
+        wanted = {}
+        for product in products:
+            i = self.index.get(product['id'])
+            if i is None:
+                return False
+            wanted[i] = wanted.get(i, 0) + product['quantity']
+
+        shards = len(self.locks)
+        locks = [self.locks[shard] for shard in sorted({i % shards for i in wanted})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            quantities = self.quantities
+            for i, quantity in wanted.items():
+                if quantities[i] < quantity:
+                    return False
+            for i, quantity in wanted.items():
+                quantities[i] -= quantity
+            return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def available(self, sku: str) -> int:
+        return self.quantities[self.index[sku]]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current quantity per SKU."""
+        return {sku: self.quantities[i] for sku, i in self.index.items()}
+
+
+# Per-process state of a pool worker, set up once by _init_worker
+_runner: Optional[BatchRunner] = None
+
+
+def _init_worker(stock: SharedStock, catalog: ProductCatalog, rm: str, policy: Optional[DecisionPolicy],
+                 include_documents: bool, profile: Optional[Profiler] = None, numbering: Optional[str] = None):
+    global _runner
+    # Counters of its own would repeat the other workers' numbers, so without
+    # a shared database a worker derives numbers from the inquiries
+    sequences = False
+    if numbering is not None:
+        sequences = SQLiteNumbering(numbering)
+        # Close the worker's blocks when the pool lets it exit, so its leftovers are audited as unused
+        Finalize(sequences, sequences.close, exitpriority=10)
+    manager = ProcessManager(verbose=False, profile=profile or False, catalog=catalog, numbering=sequences)
+    _runner = BatchRunner(manager, ReservingPolicy(stock, rm, policy), include_documents=include_documents)
+
+
+def _run_chunk(chunk: Tuple[int, List[str]]) -> Tuple[List[Dict[str, Any]], Optional[Profiler]]:
+    """Records of one chunk, plus what the worker's profiler measured for it."""
+    start, texts = chunk
+    manager = _runner.manager
+    process = manager.process_sales_inquiry
+    policy = _runner.policy
+    records = [_runner.to_record(start + offset, process(text, policy))
+               for offset, text in enumerate(texts)]
+    profiler = manager.profiler
+    return records, profiler and profiler.take()
+
+
+class ParallelRunner:
+    """Spreads the sales process over a pool of worker processes.
+
+    Records come back in input order. All workers work on the same ``catalog``
+    and reserve from one ``SharedStock``, so no SKU is sold beyond its stock
+    regardless of the number of workers: the FG decision always follows the
+    reservation. The RM decision is ``rm``, or that of ``policy`` when given.
+    Given a ``profile`` profiler, every worker records with the same settings
+    and the measurements are merged into it. Given the path of a ``numbering``
+    database, every worker numbers its documents from it (see
+    ``numbering.SQLiteNumbering``), so numbers are unique across workers;
+    without one, numbers are derived from the inquiries (``numbering=False``).
+
+    Work is not sharded by product ID: chunks of ``chunk_size`` inquiries go
+    to whichever worker is free. Sharding would need every inquiry parsed in
+    this process before its worker is known, which serialises the most
+    expensive stage, and an order with lines for SKUs of different shards
+    has no single owner. The stock is what must not be sold twice, and
+    ``SharedStock`` stripes its locks by product ID, so orders for different
+    SKUs contend as little as they would on separate shards while any
+    worker can take any order.
+    """
+
+    def __init__(self, workers: Optional[int] = None, catalog: Optional[ProductCatalog] = None,
+                 rm: str = INSUFFICIENT, include_documents: bool = False, chunk_size: int = 512,
+                 profile: Optional[Profiler] = None, numbering: Optional[str] = None,
+                 policy: Optional[DecisionPolicy] = None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.catalog = catalog if catalog is not None else ProcessManager(verbose=False).catalog
+        self.inventory = self.catalog
+        self.stock = SharedStock(self.catalog)
+        self.rm = rm
+        self.policy = policy
+        self.include_documents = include_documents
+        self.chunk_size = chunk_size
+        self.profiler = profile
+        self.numbering = numbering
+
+    def run(self, inquiries: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        with multiprocessing.Pool(self.workers, _init_worker,
+                                  (self.stock, self.catalog, self.rm, self.policy, self.include_documents,
+                                   self.profiler and self.profiler.fresh(), self.numbering)) as pool:
+            for records, profiler in pool.imap(_run_chunk, chunked(inquiries, self.chunk_size)):
+                if profiler is not None:
+                    self.profiler.merge(profiler)
+                yield from records
+            # Let the workers exit normally (instead of being terminated) so they close their numbering
+            pool.close()
+            pool.join()
+
+
+def scaling_report(inquiries: List[str], max_workers: Optional[int] = None,
+                   catalog: Optional[ProductCatalog] = None) -> List[Dict[str, Any]]:
+    """Measure throughput with 1 to ``max_workers`` workers on the same inquiries."""
+    max_workers = max_workers or multiprocessing.cpu_count()
+    report = []
+    for workers in range(1, max_workers + 1):
+        runner = ParallelRunner(workers, catalog)
+        start = time.perf_counter()
+        count = sum(1 for _ in runner.run(inquiries))
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0.0
+        report.append({
+            "workers": workers,
+            "inquiries": count,
+            "seconds": round(elapsed, 3),
+            "per_second": round(rate),
+            "speedup": round(rate / report[0]["per_second"], 2) if report else 1.0,
+        })
+    return report
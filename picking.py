@@ -0,0 +1,181 @@
+import re
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Sequence, Tuple
+from models import Inquiry, InquiryData, as_inquiry
+
+# (warehouse, aisle, rack), e.g. ("A", 12, 3) for "Warehouse A, Aisle 12, Rack 3"
+Location = Tuple[str, int, int]
+
+_LOCATION = re.compile(r"Warehouse\s+(\w+)\W+Aisle\s+(\d+)\W+Rack\s+(\d+)", re.IGNORECASE)
+
+# Walking model of a warehouse, in metres: aisles side by side, racks along
+# each aisle, entered from the front cross aisle (rack 0) or the back one
+# (rack AISLE_RACKS + 1). Each warehouse has its depot at the front of aisle 0.
+AISLE_PITCH = 3.0
+RACK_PITCH = 1.5
+AISLE_RACKS = 20
+WAREHOUSE_TRANSFER = 200.0
+
+DEFAULT_WAVE_ORDERS = 25
+DEFAULT_WAVE_LINES = 120
+
+
+def parse_location(text: str) -> Optional[Location]:
+    """"Warehouse A, Aisle 12, Rack 3" -> ("A", 12, 3); None if the text is not a location."""
+    match = _LOCATION.search(text or "")
+    if match is None:
+        return None
+    warehouse, aisle, rack = match.groups()
+    return warehouse.upper(), int(aisle), int(rack)
+
+
+def walk_distance(route: Iterable[Location]) -> float:
+    """Metres walked from the depot along ``route`` and back, in the warehouse model above."""
+    distance = 0.0
+    warehouse, aisle, rack = None, 0, 0
+    back = AISLE_RACKS + 1
+    for next_warehouse, next_aisle, next_rack in route:
+        if next_warehouse != warehouse:
+            if warehouse is not None:
+                distance += aisle * AISLE_PITCH + min(rack, back - rack) * RACK_PITCH + WAREHOUSE_TRANSFER
+            warehouse, aisle, rack = next_warehouse, 0, 0
+        if next_aisle == aisle:
+            distance += abs(next_rack - rack) * RACK_PITCH
+        else:
+            # Leave the aisle by the nearer useful end: through the front or through the back
+            distance += abs(next_aisle - aisle) * AISLE_PITCH + min(
+                rack + next_rack, 2 * back - rack - next_rack) * RACK_PITCH
+        aisle, rack = next_aisle, next_rack
+    if warehouse is not None:
+        distance += aisle * AISLE_PITCH + min(rack, back - rack) * RACK_PITCH
+    return distance
+
+
+def s_shape(locations: Iterable[Location]) -> List[Location]:
+    """Distinct locations in S-shape order: up one aisle, down the next, warehouse by warehouse."""
+    route: List[Location] = []
+    warehouse, upward = None, True
+    for (next_warehouse, _), run in groupby(sorted(set(locations)), key=itemgetter(0, 1)):
+        if next_warehouse != warehouse:
+            warehouse, upward = next_warehouse, True
+        run = list(run)
+        route.extend(run if upward else reversed(run))
+        upward = not upward
+    return route
+
+
+class PickStop:
+    """One stop of a wave: a SKU at a location, with the quantity per order."""
+    __slots__ = ("location", "location_text", "sku", "name", "quantity", "orders")
+
+    def __init__(self, location: Optional[Location], location_text: str, sku: str, name: str):
+        self.location = location
+        self.location_text = location_text
+        self.sku = sku
+        self.name = name
+        self.quantity = 0
+        # Position of the order in the wave -> quantity, for sorting picked units to orders
+        self.orders: Dict[int, int] = {}
+
+
+class Wave:
+    """Orders picked together in one walk, with their stops in route order."""
+
+    def __init__(self, number: int, orders: List[Inquiry], stops: List[PickStop]):
+        self.number = number
+        self.orders = orders
+        self.stops = stops
+
+    @property
+    def route(self) -> List[Location]:
+        return [stop.location for stop in self.stops if stop.location is not None]
+
+    @property
+    def distance(self) -> float:
+        return walk_distance(self.route)
+
+    @property
+    def lines(self) -> int:
+        return sum(len(order.products) for order in self.orders)
+
+
+class PickPlanner:
+    """Groups orders into pick waves and routes each wave through the warehouse.
+
+    Locations come from ``inventory`` (SKU -> entry with a "location"), the
+    same lookup the picking ticket uses. Orders are sorted by the zone they
+    need (warehouses, then the middle of their aisles), so that the orders of
+    a wave are close to each other. Waves are then cut off at ``wave_orders``
+    orders or ``wave_lines`` order lines. The lines of a wave are merged per
+    SKU and visited in S-shape order. Lines without a parseable location come
+    last, in order of appearance.
+    """
+
+    def __init__(self, inventory: Mapping[str, Any], wave_orders: int = DEFAULT_WAVE_ORDERS,
+                 wave_lines: int = DEFAULT_WAVE_LINES):
+        self.inventory = inventory
+        self.wave_orders = wave_orders
+        self.wave_lines = wave_lines
+        self._locations: Dict[str, Tuple[Optional[Location], str]] = {}
+
+    def locate(self, sku: str) -> Tuple[Optional[Location], str]:
+        """Parsed location and location text of a SKU, looked up once per SKU."""
+        found = self._locations.get(sku)
+        if found is None:
+            entry = self.inventory.get(sku)
+            text = entry.get('location', 'Not found') if entry is not None else 'Not found'
+            found = self._locations[sku] = (parse_location(text), text)
+        return found
+
+    def _zone(self, inquiry: Inquiry) -> Tuple[Tuple[str, ...], float]:
+        located = [location for location, _ in (self.locate(product.id) for product in inquiry.products)
+                   if location is not None]
+        if not located:
+            return ("~",), 0.0
+        aisles = sorted(location[1] for location in located)
+        return tuple(sorted({location[0] for location in located})), aisles[len(aisles) // 2]
+
+    def plan(self, orders: Iterable[InquiryData], first_number: int = 1) -> List[Wave]:
+        inquiries = [as_inquiry(order) for order in orders]
+        zones = [self._zone(inquiry) for inquiry in inquiries]
+        ranked = sorted(range(len(inquiries)), key=zones.__getitem__)
+        waves: List[Wave] = []
+        batch: List[Inquiry] = []
+        lines = 0
+        for position in ranked:
+            inquiry = inquiries[position]
+            if batch and (len(batch) >= self.wave_orders or lines + len(inquiry.products) > self.wave_lines):
+                waves.append(self._wave(first_number + len(waves), batch))
+                batch, lines = [], 0
+            batch.append(inquiry)
+            lines += len(inquiry.products)
+        if batch:
+            waves.append(self._wave(first_number + len(waves), batch))
+        return waves
+
+    def _wave(self, number: int, orders: List[Inquiry]) -> Wave:
+        stops: Dict[str, PickStop] = {}
+        for position, inquiry in enumerate(orders):
+            for product in inquiry.products:
+                stop = stops.get(product.id)
+                if stop is None:
+                    location, text = self.locate(product.id)
+                    stop = stops[product.id] = PickStop(location, text, product.id, product.name)
+                stop.quantity += product.quantity
+                stop.orders[position] = stop.orders.get(position, 0) + product.quantity
+        located = [stop for stop in stops.values() if stop.location is not None]
+        unplaced = [stop for stop in stops.values() if stop.location is None]
+        order = {location: i for i, location in enumerate(s_shape(stop.location for stop in located))}
+        located.sort(key=lambda stop: (order[stop.location], stop.sku))
+        return Wave(number, orders, located + unplaced)
+
+
+def ticket_distance(orders: Sequence[InquiryData], planner: PickPlanner) -> float:
+    """Metres walked picking every order on its own ticket, lines in inquiry order."""
+    total = 0.0
+    for order in orders:
+        route = [location for location, _ in (planner.locate(product.id) for product in as_inquiry(order).products)
+                 if location is not None]
+        total += walk_distance(route)
+    return total
@@ -0,0 +1,329 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from batch import BatchRunner
+from eventlog import EventLog, OrderStates
+from instrumentation import NULL_TIMER
+from policies import DecisionPolicy, SUFFICIENT, INSUFFICIENT
+from process_manager import ProcessManager, error_result
+from receivables import InvoiceLedger
+from resilience import Backoff, DeadLetters
+
+# The stages of the sales process, in order
+STAGES = ("inquiry", "inventory", "picking", "shipping", "billing")
+
+# Put on the output queue once every order has come out of the pipeline
+_END = object()
+
+Inquiries = Union[Iterable[str], AsyncIterable[str]]
+
+
+class _Job:
+    """One order on its way through the stages."""
+    __slots__ = ("index", "text", "inquiry_data", "documents", "numbers", "fg_choice", "rm_choice", "reserved",
+                 "timer")
+
+    def __init__(self, index: int, text: str, timer):
+        self.index = index
+        self.text = text
+        self.inquiry_data = None
+        self.documents = {}
+        self.numbers = {}
+        self.fg_choice = None
+        self.rm_choice = None
+        self.reserved = None
+        self.timer = timer
+
+    def result(self, status: str) -> Dict[str, Any]:
+        """The same result ``ProcessManager.process_sales_inquiry`` returns."""
+        result = {
+            "status": status,
+            "inquiry_data": self.inquiry_data,
+            "fg_choice": self.fg_choice,
+            "rm_choice": self.rm_choice,
+            "reserved": self.reserved,
+            "documents": self.documents
+        }
+        if status == "completed":
+            result["numbers"] = self.numbers
+        if status == "halted":
+            result["reason"] = "insufficient_stock"
+        return result
+
+
+class AsyncPipeline(BatchRunner):
+    """Runs the five stages of the sales process concurrently on an asyncio event loop.
+
+    Each stage in ``STAGES`` has its own workers (``workers={"inventory": 4}``)
+    and its own queue of at most ``queue_size`` orders. When a stage falls
+    behind, its queue fills up and the stage before it waits on ``put``, back to
+    the reader of the input. So a slow inventory backend slows intake down
+    instead of piling up orders in memory.
+
+    Inventory workers take up to ``reservation_batch`` waiting orders at once.
+    With ``reserve=True`` their reservations go to ``manager.stock`` in one
+    ``reserve_many`` call, made on a dedicated thread so the event loop keeps
+    serving the other stages meanwhile. All stock calls go through that one
+    thread, since the backends are not thread-safe.
+
+    Results and records are the same as with ``BatchRunner``. Halted orders
+    leave the pipeline early, so records come out in completion order; their
+    ``index`` is the position in the input. With a profiler on the manager,
+    the time of a stage includes the wait in its queue.
+    """
+
+    def __init__(self, manager: Optional[ProcessManager] = None,
+                 policy: Optional[DecisionPolicy] = None,
+                 workers: Optional[Mapping[str, int]] = None,
+                 queue_size: int = 256,
+                 include_documents: bool = False,
+                 reserve: bool = False,
+                 reservation_batch: int = 64,
+                 run_id: Optional[str] = None,
+                 events: Optional[EventLog] = None,
+                 resume: Optional[OrderStates] = None,
+                 keep_completed: bool = False,
+                 dead_letters: Optional[DeadLetters] = None,
+                 retry: Optional[Backoff] = None,
+                 ledger: Optional[InvoiceLedger] = None):
+        super().__init__(manager, policy, include_documents, reserve, reservation_batch, run_id,
+                         events, resume, keep_completed=keep_completed, dead_letters=dead_letters,
+                         retry=retry, ledger=ledger)
+        self.workers = dict.fromkeys(STAGES, 1)
+        for stage, count in (workers or {}).items():
+            if stage not in self.workers:
+                raise ValueError(f"Unknown stage: {stage} (choose from {', '.join(STAGES)})")
+            if count < 1:
+                raise ValueError(f"Stage {stage} needs at least one worker")
+            self.workers[stage] = count
+        self.queue_size = queue_size
+
+    def run(self, inquiries: Inquiries) -> Iterator[Dict[str, Any]]:
+        """Run the pipeline on a private event loop and yield records as they come out."""
+        loop = asyncio.new_event_loop()
+        try:
+            run = loop.run_until_complete(self._start(inquiries))
+            try:
+                while True:
+                    records = loop.run_until_complete(run.take())
+                    if not records:
+                        return
+                    yield from records
+            finally:
+                loop.run_until_complete(run.stop())
+        finally:
+            loop.close()
+
+    async def run_async(self, inquiries: Inquiries) -> AsyncIterator[Dict[str, Any]]:
+        """Yield records as they come out, on the running event loop."""
+        run = await self._start(inquiries)
+        try:
+            while True:
+                records = await run.take()
+                if not records:
+                    return
+                for record in records:
+                    yield record
+        finally:
+            await run.stop()
+
+    async def process(self, inquiry_text: str) -> Dict[str, Any]:
+        """Run one inquiry through the stages and return its ``process_sales_inquiry`` style result."""
+        job = self._job(0, inquiry_text)
+        for stage in STAGES:
+            if stage == "inventory":
+                result = (await self._decide([job]))[0]
+            else:
+                result = self._step(stage, job)
+            if result is not None:
+                return result
+        return job.result("completed")
+
+    async def _start(self, inquiries: Inquiries) -> "_Run":
+        return _Run(self, inquiries)
+
+    def _job(self, index: int, text: str) -> _Job:
+        profiler = self.manager.profiler
+        return _Job(index, text, NULL_TIMER if profiler is None else profiler.timer())
+
+    # Stage handlers: None passes the order on, a result dict ends it there
+
+    def _step(self, stage: str, job: _Job) -> Optional[Dict[str, Any]]:
+        try:
+            if stage == "inquiry":
+                if job.inquiry_data is None:
+                    job.inquiry_data = self.manager.parser.parse(job.text)
+                    job.timer.lap("parse")
+                job.documents["inquiry"] = self.manager.doc_generator.generate_inquiry_document(
+                    job.inquiry_data)
+            else:
+                inventory = self.manager.inventory if stage == "picking" else None
+                job.documents[stage], job.numbers[stage] = self.manager.doc_generator.generate_numbered(
+                    stage, job.inquiry_data, inventory)
+        except Exception as e:
+            job.timer.done("error")
+            return error_result(e, stage if job.inquiry_data is not None else "parse")
+        job.timer.lap(stage)
+        if stage == "billing":
+            job.timer.done("completed")
+            return job.result("completed")
+        return None
+
+    async def _decide(self, jobs: List[_Job], executor: Optional[ThreadPoolExecutor] = None
+                      ) -> List[Optional[Dict[str, Any]]]:
+        """Inventory stage for a batch of orders: the FG/RM decisions, then inventory documents.
+
+        The documents come last, so they show the outcome of the reservations.
+        """
+        manager = self.manager
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+
+        if self.reserve:
+            # A backend that still fails after the retries ends the run rather
+            # than failing healthy orders, so that a resumed run reserves them
+            orders = [(self._order_ref(job.index), job.inquiry_data["products"]) for job in jobs]
+            if executor is None:
+                outcomes, levels = self._reserve_counted(orders)
+            else:
+                loop = asyncio.get_running_loop()
+                outcomes, levels = await loop.run_in_executor(executor, self._reserve_counted, orders)
+            for job, reserved in zip(jobs, outcomes):
+                job.fg_choice = SUFFICIENT if reserved else INSUFFICIENT
+            available = levels.__getitem__
+        else:
+            stock = self.policy.stock
+            available = None if stock is None else stock.available
+
+        for i, job in enumerate(jobs):
+            try:
+                if not self.reserve:
+                    job.fg_choice = self.policy.fg_decision(job.inquiry_data, manager.inventory)
+                if available is not None:
+                    job.reserved = job.fg_choice == SUFFICIENT
+                job.documents["inventory"] = manager.doc_generator.generate_inventory_document(
+                    job.inquiry_data, manager.inventory, available, job.reserved)
+                if job.fg_choice == INSUFFICIENT:
+                    job.rm_choice = self.policy.rm_decision(job.inquiry_data, manager.inventory)
+            except Exception as e:
+                job.timer.done("error")
+                results[i] = error_result(e, "inventory")
+                continue
+            job.timer.lap("inventory")
+            if job.rm_choice == INSUFFICIENT:
+                job.timer.done("halted")
+                results[i] = job.result("halted")
+        return results
+
+    def _reserve_counted(self, orders: List[Tuple[Optional[str], Any]]) -> Tuple[List[bool], Dict[str, int]]:
+        """Outcomes of ``_reserve_many``, and the stock left of the orders' SKUs.
+
+        Both run on the inventory thread, which makes all calls to the backend.
+        """
+        outcomes = self._reserve_many(orders)
+        available = self.manager.stock.available
+        return outcomes, {product["id"]: available(product["id"]) for _, products in orders for product in products}
+
+
+class _Run:
+    """The queues and tasks of one pipeline run."""
+
+    def __init__(self, pipeline: AsyncPipeline, inquiries: Inquiries):
+        self.pipeline = pipeline
+        size = pipeline.queue_size
+        self.queues = [asyncio.Queue(size) for _ in STAGES]
+        self.output = asyncio.Queue(size)
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="inventory") if pipeline.reserve else None
+        self.tasks = []
+        for position, stage in enumerate(STAGES):
+            source = self.queues[position]
+            target = self.queues[position + 1] if position + 1 < len(STAGES) else None
+            work = self._inventory if stage == "inventory" else self._stage
+            for _ in range(pipeline.workers[stage]):
+                self.tasks.append(asyncio.create_task(work(stage, source, target)))
+        self.tasks.append(asyncio.create_task(self._supervise(inquiries)))
+
+    async def _feed(self, inquiries: Inquiries):
+        pipeline = self.pipeline
+        queue, job = self.queues[0], pipeline._job
+        if hasattr(inquiries, "__aiter__"):
+            index = 0
+            async for text in inquiries:
+                if pipeline.resume is None or not pipeline.resume.finished(index):
+                    await queue.put(job(index, text))
+                index += 1
+        else:
+            for index, text in pipeline.pending(inquiries):
+                await queue.put(job(index, text))
+
+    async def _supervise(self, inquiries: Inquiries):
+        try:
+            await self._feed(inquiries)
+            # A stage marks an order done only after handing it on, so once every
+            # queue has been joined in order, every order has reached the output
+            for queue in self.queues:
+                await queue.join()
+        except Exception as e:
+            await self.output.put(e)
+            return
+        await self.output.put(_END)
+
+    async def _emit(self, job: _Job, result: Dict[str, Any]):
+        await self.output.put(self.pipeline.finish(job.index, result, job.text))
+
+    async def _stage(self, stage: str, source: asyncio.Queue, target: Optional[asyncio.Queue]):
+        step = self.pipeline._step
+        while True:
+            job = await source.get()
+            try:
+                result = step(stage, job)
+                if result is None:
+                    await target.put(job)
+                else:
+                    await self._emit(job, result)
+            except Exception as e:
+                # Ends the run; marking the order done keeps the supervisor from waiting forever
+                await self.output.put(e)
+            finally:
+                source.task_done()
+
+    async def _inventory(self, stage: str, source: asyncio.Queue, target: asyncio.Queue):
+        limit = self.pipeline.reservation_batch
+        while True:
+            jobs = [await source.get()]
+            while len(jobs) < limit and not source.empty():
+                jobs.append(source.get_nowait())
+            try:
+                results = await self.pipeline._decide(jobs, self.executor)
+                for job, result in zip(jobs, results):
+                    if result is None:
+                        await target.put(job)
+                    else:
+                        await self._emit(job, result)
+            except Exception as e:
+                await self.output.put(e)
+            finally:
+                for _ in jobs:
+                    source.task_done()
+
+    async def take(self) -> List[Dict[str, Any]]:
+        """Wait for the next records; an empty list once the run is over."""
+        output = self.output
+        records = []
+        item = await output.get()
+        while True:
+            if item is _END:
+                output.put_nowait(_END)
+                return records
+            if isinstance(item, Exception):
+                raise item
+            records.append(item)
+            if output.empty():
+                return records
+            item = output.get_nowait()
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown()
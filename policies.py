@@ -0,0 +1,107 @@
+from typing import Dict, Any, Optional
+from models import InquiryData
+
+# Outcomes of the FG/RM decision points (same wording as the Streamlit app)
+SUFFICIENT = "sufficient"
+INSUFFICIENT = "insufficient"
+
+
+class DecisionPolicy:
+    """Answers the FG/RM decision points of the sales process without a user.
+
+    ``stock`` is the inventory backend a policy reserves from to answer the
+    FG decision, None for policies that do not reserve.
+    """
+
+    stock = None
+
+    def fg_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        """Decide whether finished goods stock covers the inquiry."""
+        raise NotImplementedError
+
+    def rm_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        """Decide whether raw materials allow manufacturing the shortfall."""
+        raise NotImplementedError
+
+
+class FixedPolicy(DecisionPolicy):
+    """Always gives the same answers, like a user who picks the same menu options."""
+
+    def __init__(self, fg: str = SUFFICIENT, rm: str = SUFFICIENT):
+        self.fg = fg
+        self.rm = rm
+
+    def fg_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        return self.fg
+
+    def rm_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        return self.rm
+
+
+class StockCheckPolicy(DecisionPolicy):
+    """Compares requested quantities with the stock levels in the inventory."""
+
+    def __init__(self, rm: str = INSUFFICIENT):
+        # There is no raw material data yet, so the RM answer is configurable
+        self.rm = rm
+
+    def fg_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        for product in inquiry_data.get("products", []):
+            stock = inventory_data.get(product['id'], {})
+            if stock.get('quantity', 0) < product['quantity']:
+                return INSUFFICIENT
+        return SUFFICIENT
+
+    def rm_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        return self.rm
+
+
+class ReservingPolicy(DecisionPolicy):
+    """Reserves the requested stock; the FG decision is whether the reservation succeeded.
+
+    ``stock`` is an ``inventory.InventoryBackend`` (or ``parallel.SharedStock``).
+    The RM decision is ``rm``, or asked of ``policy`` when one is given.
+    """
+
+    def __init__(self, stock, rm: str = INSUFFICIENT, policy: Optional[DecisionPolicy] = None):
+        self.stock = stock
+        self.rm = rm
+        self.policy = policy
+
+    def fg_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        return SUFFICIENT if self.stock.reserve(inquiry_data.get("products", [])) else INSUFFICIENT
+
+    def rm_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        if self.policy is not None:
+            return self.policy.rm_decision(inquiry_data, inventory_data)
+        return self.rm
+
+
+class ReservedPolicy(DecisionPolicy):
+    """The FG decision was already taken by a batched reservation from ``stock``; RM is delegated."""
+
+    def __init__(self, fg: str, policy: DecisionPolicy, stock=None):
+        self.fg = fg
+        self.policy = policy
+        self.stock = stock
+
+    def fg_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        return self.fg
+
+    def rm_decision(self, inquiry_data: InquiryData, inventory_data: Dict[str, Any]) -> str:
+        return self.policy.rm_decision(inquiry_data, inventory_data)
+
+
+POLICIES = {
+    "sufficient": lambda: FixedPolicy(SUFFICIENT, SUFFICIENT),
+    "manufacture": lambda: FixedPolicy(INSUFFICIENT, SUFFICIENT),
+    "halt": lambda: FixedPolicy(INSUFFICIENT, INSUFFICIENT),
+    "stock": StockCheckPolicy,
+}
+
+
+def get_policy(name: str) -> DecisionPolicy:
+    """Build a decision policy by its CLI name."""
+    if name not in POLICIES:
+        raise ValueError(f"Unknown decision policy: {name} (choose from {', '.join(POLICIES)})")
+    return POLICIES[name]()
@@ -1,30 +1,85 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Union
+from catalog import ProductCatalog
 from documents import DocumentGenerator
-from datetime import datetime
+from inquiry_parser import InquiryParser, SkuResolver
+from instrumentation import NULL_TIMER, Profiler
+from inventory import InventoryBackend, MemoryInventory
+from models import Inquiry
+from numbering import MemoryNumbering, Numbering
+from policies import DecisionPolicy, SUFFICIENT, INSUFFICIENT
+from render_cache import RenderCache
+
+def error_result(error: Exception, stage: str) -> Dict[str, Any]:
+    """The result of an order that failed in ``stage``."""
+    return {
+        "status": "error",
+        "error": str(error),
+        "error_type": type(error).__name__,
+        "stage": stage,
+        "exception": error
+    }
+
 
 class ProcessManager:
-    def __init__(self):
-        """Initialize the process manager."""
-        self.doc_generator = DocumentGenerator()
+    def __init__(self, verbose: bool = True, sku_resolver: Optional[SkuResolver] = None,
+                 catalog: Optional[ProductCatalog] = None,
+                 stock: Optional[InventoryBackend] = None,
+                 profile: Union[bool, Profiler] = False,
+                 render_cache: Optional[RenderCache] = None,
+                 numbering: Union[Numbering, bool, None] = None):
+        """Initialize the process manager.
+
+        With ``verbose=False`` nothing is printed, which is what batch runs use.
+        ``sku_resolver`` maps product names from inquiries to product IDs and
+        defaults to the fuzzy lookup of the catalog. ``stock`` is the inventory
+        backend that reservations go to (see ``inventory.py``). With
+        ``profile=True`` (or a ``Profiler`` to record into) every stage is
+        timed into ``self.profiler`` (see ``instrumentation.py``). A
+        ``render_cache`` lets documents reuse the line items rendered for
+        earlier orders with the same lines (see ``render_cache.py``). Every
+        inquiry, picking ticket, packing slip and invoice gets a unique number
+        from its own sequence of ``numbering`` (see ``numbering.py``), by
+        default a ``MemoryNumbering`` counting from 1, whose numbers are
+        unique only within this process; a ``SQLiteNumbering`` keeps them
+        unique across runs (``batch_main`` uses one). ``numbering=False``
+        keeps the old numbers derived from the inquiry's date and customer,
+        which are not unique.
+        """
+        self.verbose = verbose
+        if isinstance(profile, Profiler):
+            self.profiler = profile
+        else:
+            self.profiler = Profiler() if profile else None
         
-        # Sample inventory data (in real app, this would come from a database)
-        self.inventory = {
-            "DTB-2024-BLK": {
-                "quantity": 45,
-                "location": "Warehouse A, Aisle 12, Rack 3",
-                "price": 1500.00
-            },
-            "PTB-2024-RED": {
-                "quantity": 30,
-                "location": "Warehouse B, Aisle 10, Rack 5",
-                "price": 2500.00
-            }
-        }
+        # Product master data with stock levels, locations and prices
+        # (in a real app this would be loaded with ProductCatalog.from_csv/from_sqlite)
+        self.catalog = catalog if catalog is not None else ProductCatalog.sample()
+        self.inventory = self.catalog
+        self.stock = stock if stock is not None else MemoryInventory.from_catalog(self.catalog)
+        if numbering is False:
+            numbering = None
+        elif numbering is None or numbering is True:
+            numbering = MemoryNumbering()
+        self.numbering = numbering
+        self.doc_generator = DocumentGenerator(self.catalog, render_cache, numbering)
+        self.parser = InquiryParser(self.inventory, sku_resolver or self.catalog.resolve, numbering)
+    
+    def _say(self, *args):
+        """Print to the console unless running quietly."""
+        if self.verbose:
+            print(*args)
+    
+    def _pause(self, prompt: str, policy: Optional[DecisionPolicy]):
+        """Wait for the user between steps; never blocks when a policy decides."""
+        if policy is None:
+            input(prompt)
     
     def show_process_chart(self, current_step: str):
         """Display the current position in the process flow."""
-        print("\n📊 Current Position in Sales Process:")
-        print("=" * 50)
+        if not self.verbose:
+            return
+        self._say("\n📊 Current Position in Sales Process:")
+        self._say("=" * 50)
         steps = [
             ("Sales Inquiry", "📝"),
             ("Inventory Check", "🔍"),
@@ -35,161 +90,184 @@ class ProcessManager:
         
         for step, icon in steps:
             if step == current_step:
-                print(f"➡️ {icon} {step} <- You are here")
+                self._say(f"➡️ {icon} {step} <- You are here")
             else:
-                print(f"   {icon} {step}")
-        print("=" * 50)
+                self._say(f"   {icon} {step}")
+        self._say("=" * 50)
     
-    def parse_inquiry(self, inquiry_text: str) -> Dict[str, Any]:
+    def parse_inquiry(self, inquiry_text: str) -> Inquiry:
         """Parse the inquiry text into structured data."""
-        lines = [line.strip() for line in inquiry_text.split('\n') if line.strip()]
-        
-        # Extract customer
-        customer = lines[0].replace('Customer:', '').strip()
-        
-        # Generate document number
-        date = datetime.now()
-        doc_number = f"INQ-{date.strftime('%Y%m%d')}-{customer[:3].upper()}"
-        
-        # Extract products
-        products = []
-        for line in lines:
-            if line.startswith('-'):
-                parts = line.replace('-', '').strip().split()
-                quantity = int(parts[0])
-                name = ' '.join(parts[1:-2])
-                color = parts[-1]
-                
-                # Generate product ID
-                if 'Deluxe' in name:
-                    product_id = 'DTB-2024-BLK'
-                else:
-                    product_id = 'PTB-2024-RED'
-                
-                products.append({
-                    'id': product_id,
-                    'name': f"{name} in {color}",
-                    'quantity': quantity,
-                    'price': self.inventory[product_id]['price']
-                })
-        
-        # Extract delivery and special requirements
-        delivery = next((line.replace('Delivery:', '').strip() 
-                        for line in lines if line.startswith('Delivery:')), '')
-        special_reqs = next((line.replace('Special requirements:', '').strip() 
-                           for line in lines if line.startswith('Special')), '')
-        
-        return {
-            "doc_number": doc_number,
-            "customer": customer,
-            "products": products,
-            "delivery": delivery,
-            "special_requirements": special_reqs
-        }
+        if self.profiler is None:
+            return self.parser.parse(inquiry_text)
+        timer = self.profiler.timer()
+        inquiry_data = self.parser.parse(inquiry_text)
+        timer.lap("parse")
+        return inquiry_data
     
-    def process_sales_inquiry(self, inquiry_text: str) -> Dict[str, Any]:
-        """Process a sales inquiry through the entire workflow."""
+    def process_sales_inquiry(self, inquiry_text: str,
+                              policy: Optional[DecisionPolicy] = None,
+                              inquiry_data: Optional[Inquiry] = None) -> Dict[str, Any]:
+        """Process a sales inquiry through the entire workflow.
+
+        Without a ``policy`` the FG/RM decision points are asked on the console.
+        With one, the decisions come from the policy and the run never waits for
+        input, so it can be driven unattended (see ``batch.py``). Batch runners
+        that already parsed the text pass the result as ``inquiry_data``.
+
+        Completed orders also carry the ``numbers`` of their picking, shipping
+        and billing documents. ``reserved`` is whether the policy reserved the
+        order's stock (see ``DecisionPolicy.stock``), None without a
+        reservation. An error ends the order with status "error", the
+        ``stage`` it failed in and the ``exception`` (a ``ParseError`` for texts
+        that do not parse).
+        """
+        documents = {}
+        numbers = {}
+        stage = "parse"
+        timer = NULL_TIMER if self.profiler is None else self.profiler.timer()
         try:
-            print("\n🏢 B2B Sales Process Simulation")
-            print("=" * 50)
+            self._say("\n🏢 B2B Sales Process Simulation")
+            self._say("=" * 50)
             
             # Step 1: Process Initial Inquiry
             self.show_process_chart("Sales Inquiry")
-            print("\n📝 Processing Sales Inquiry")
-            print("-" * 50)
+            self._say("\n📝 Processing Sales Inquiry")
+            self._say("-" * 50)
             
-            inquiry_data = self.parse_inquiry(inquiry_text)
+            if inquiry_data is None:
+                inquiry_data = self.parser.parse(inquiry_text)
+                timer.lap("parse")
+            stage = "inquiry"
             inquiry_doc = self.doc_generator.generate_inquiry_document(inquiry_data)
-            print(inquiry_doc)
-            input("\nPress Enter to continue to inventory check...")
+            documents["inquiry"] = inquiry_doc
+            timer.lap("inquiry")
+            self._say(inquiry_doc)
+            self._pause("\nPress Enter to continue to inventory check...", policy)
             
             # Step 2: Inventory Check
+            stage = "inventory"
             self.show_process_chart("Inventory Check")
-            print("\n🔍 Checking Inventory")
-            print("-" * 50)
+            self._say("\n🔍 Checking Inventory")
+            self._say("-" * 50)
             
+            # A policy that reserves stock decides first, so the document can
+            # show what was available and whether it was reserved
+            stock = None if policy is None else policy.stock
+            reserved = None
+            if stock is not None:
+                fg_choice = policy.fg_decision(inquiry_data, self.inventory)
+                reserved = fg_choice == SUFFICIENT
             inventory_doc = self.doc_generator.generate_inventory_document(
-                inquiry_data, self.inventory
+                inquiry_data, self.inventory, None if stock is None else stock.available, reserved
             )
-            print(inventory_doc)
+            documents["inventory"] = inventory_doc
+            self._say(inventory_doc)
             
             # Decision Point 1: FG Stock Status
-            print("\n❓ Decision Point - Finished Goods (FG) Stock")
-            print("1. Sufficient FG stock available")
-            print("2. Insufficient FG stock - Check Raw Materials")
-            fg_choice = input("Select scenario (1-2): ")
-            
-            if fg_choice == "2":
-                print("\n❓ Decision Point - Raw Materials (RM) Stock")
-                print("1. Sufficient RM stock - Can manufacture")
-                print("2. Insufficient RM stock - Need to order")
-                rm_choice = input("Select scenario (1-2): ")
+            self._say("\n❓ Decision Point - Finished Goods (FG) Stock")
+            self._say("1. Sufficient FG stock available")
+            self._say("2. Insufficient FG stock - Check Raw Materials")
+            if policy is None:
+                fg_choice = INSUFFICIENT if input("Select scenario (1-2): ") == "2" else SUFFICIENT
+            elif stock is None:
+                fg_choice = policy.fg_decision(inquiry_data, self.inventory)
+            rm_choice = None
+            
+            if fg_choice == INSUFFICIENT:
+                self._say("\n❓ Decision Point - Raw Materials (RM) Stock")
+                self._say("1. Sufficient RM stock - Can manufacture")
+                self._say("2. Insufficient RM stock - Need to order")
+                if policy is None:
+                    rm_choice = INSUFFICIENT if input("Select scenario (1-2): ") == "2" else SUFFICIENT
+                else:
+                    rm_choice = policy.rm_decision(inquiry_data, self.inventory)
                 
-                if rm_choice == "2":
-                    print("\n⚠️ Process halted: Insufficient stock and materials")
-                    print("\nNext steps would be:")
-                    print("1. Order required raw materials")
-                    print("2. Update customer about delay")
-                    print("3. Reschedule production when materials arrive")
-                    print("\n📋 Process Summary:")
-                    print("1. Sales Inquiry: Customer order received")
-                    print("2. Inventory Check: Insufficient stock identified")
-                    print("3. Status: Order processing halted - awaiting materials")
+                if rm_choice == INSUFFICIENT:
+                    self._say("\n⚠️ Process halted: Insufficient stock and materials")
+                    self._say("\nNext steps would be:")
+                    self._say("1. Order required raw materials")
+                    self._say("2. Update customer about delay")
+                    self._say("3. Reschedule production when materials arrive")
+                    self._say("\n📋 Process Summary:")
+                    self._say("1. Sales Inquiry: Customer order received")
+                    self._say("2. Inventory Check: Insufficient stock identified")
+                    self._say("3. Status: Order processing halted - awaiting materials")
+                    timer.lap("inventory")
+                    timer.done("halted")
                     return {
                         "status": "halted",
                         "reason": "insufficient_stock",
-                        "inquiry_data": inquiry_data
+                        "inquiry_data": inquiry_data,
+                        "fg_choice": fg_choice,
+                        "rm_choice": rm_choice,
+                        "reserved": reserved,
+                        "documents": documents
                     }
             
+            timer.lap("inventory")
+            
             # Step 3: Picking Process
+            stage = "picking"
             self.show_process_chart("Picking")
-            print("\n📦 Creating Picking Documents")
-            print("-" * 50)
+            self._say("\n📦 Creating Picking Documents")
+            self._say("-" * 50)
             
-            picking_doc = self.doc_generator.generate_picking_document(
-                inquiry_data, self.inventory
+            picking_doc, numbers["picking"] = self.doc_generator.generate_numbered(
+                "picking", inquiry_data, self.inventory
             )
-            print(picking_doc)
-            input("\nPress Enter to continue to shipping...")
+            documents["picking"] = picking_doc
+            timer.lap("picking")
+            self._say(picking_doc)
+            self._pause("\nPress Enter to continue to shipping...", policy)
             
             # Step 4: Shipping Process
+            stage = "shipping"
             self.show_process_chart("Shipping")
-            print("\n🚚 Processing Shipment")
-            print("-" * 50)
+            self._say("\n🚚 Processing Shipment")
+            self._say("-" * 50)
             
-            shipping_doc = self.doc_generator.generate_shipping_documents(
-                inquiry_data, {"picking_complete": True}
+            shipping_doc, numbers["shipping"] = self.doc_generator.generate_numbered(
+                "shipping", inquiry_data
             )
-            print(shipping_doc)
-            input("\nPress Enter to continue to billing...")
+            documents["shipping"] = shipping_doc
+            timer.lap("shipping")
+            self._say(shipping_doc)
+            self._pause("\nPress Enter to continue to billing...", policy)
             
             # Step 5: Billing Process
+            stage = "billing"
             self.show_process_chart("Billing")
-            print("\n💰 Generating Billing Documents")
-            print("-" * 50)
+            self._say("\n💰 Generating Billing Documents")
+            self._say("-" * 50)
             
-            billing_doc = self.doc_generator.generate_billing_documents(
-                inquiry_data, {"shipping_complete": True}
+            billing_doc, numbers["billing"] = self.doc_generator.generate_numbered(
+                "billing", inquiry_data
             )
-            print(billing_doc)
+            documents["billing"] = billing_doc
+            timer.lap("billing")
+            self._say(billing_doc)
             
-            print("\n✅ Process completed successfully!")
-            print("\nProcess Summary:")
-            print("1. Sales Inquiry: Customer order received and processed")
-            print("2. Inventory: Stock availability confirmed")
-            print("3. Picking: Items picked from warehouse")
-            print("4. Shipping: Goods prepared for shipment")
-            print("5. Billing: Invoice and delivery note generated")
+            self._say("\n✅ Process completed successfully!")
+            self._say("\nProcess Summary:")
+            self._say("1. Sales Inquiry: Customer order received and processed")
+            self._say("2. Inventory: Stock availability confirmed")
+            self._say("3. Picking: Items picked from warehouse")
+            self._say("4. Shipping: Goods prepared for shipment")
+            self._say("5. Billing: Invoice and delivery note generated")
             
+            timer.done("completed")
             return {
                 "status": "completed",
-                "inquiry_data": inquiry_data
+                "inquiry_data": inquiry_data,
+                "fg_choice": fg_choice,
+                "rm_choice": rm_choice,
+                "reserved": reserved,
+                "documents": documents,
+                "numbers": numbers
             }
             
         except Exception as e:
-            print(f"\n❌ Error: Process halted due to an error")
-            print(f"Error details: {str(e)}")
-            return {
-                "status": "error",
-                "error": str(e)
-            } 
\ No newline at end of file
+            self._say(f"\n❌ Error: Process halted due to an error")
+            self._say(f"Error details: {str(e)}")
+            timer.done("error")
+            return error_result(e, stage) 
\ No newline at end of file
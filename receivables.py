@@ -0,0 +1,469 @@
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import sys
+import xml.etree.ElementTree as ElementTree
+from datetime import date, datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Dict, Any, Collection, Iterable, Iterator, List, Mapping, Optional, Set, Tuple, Union
+import numpy as np
+from documents import PAYMENT_TERMS_DAYS
+from money import format_cents, to_cents
+
+# Aging buckets by days past due: (first day, label); "current" is not yet due
+AGING_BUCKETS = ((-(1 << 30), "current"), (1, "1-30"), (31, "31-60"), (61, "61-90"), (91, "90+"))
+# A fuzzy match needs at least this similarity between reference and invoice number
+MIN_REFERENCE_SIMILARITY = 0.8
+
+_NOT_KEY = re.compile(r"[^0-9A-Z]")
+# "INV" and the date of an invoice number
+_MIN_STEM = 11
+# Open invoices under one index key: mostly one row, a set for several
+Rows = Union[int, Set[int]]
+_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y%m%d")
+# Column names of bank statement CSV files, as banks spell them
+_CSV_COLUMNS = {
+    "date": ("date", "booking date", "booking_date", "value date", "buchungstag"),
+    "amount": ("amount", "betrag", "credit"),
+    "reference": ("reference", "remittance", "remittance information", "purpose", "verwendungszweck"),
+    "payer": ("payer", "name", "counterparty", "debtor", "auftraggeber"),
+}
+
+
+def invoice_key(text: str) -> str:
+    """An invoice number as payers tend to mangle it: upper case, without separators."""
+    return _NOT_KEY.sub("", text.upper())
+
+
+def parse_date(text: str) -> date:
+    text = text.strip()
+    for pattern in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, pattern).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Unknown date format: {text!r}")
+
+
+def parse_amount(text: str) -> int:
+    """Cents of a statement amount: "1234.56", "1.234,56", "1,234.56" or "-12,50"."""
+    text = text.strip().replace(" ", "").replace("'", "")
+    if "," in text and ("." not in text or text.rindex(",") > text.rindex(".")):
+        text = text.replace(".", "").replace(",", ".")
+    else:
+        text = text.replace(",", "")
+    return to_cents(text)
+
+
+class Payment:
+    """One incoming payment from a bank statement."""
+    __slots__ = ("date", "cents", "reference", "payer")
+
+    def __init__(self, booked: date, cents: int, reference: str, payer: str = ""):
+        self.date = booked
+        self.cents = cents
+        self.reference = reference
+        self.payer = payer
+
+    def __repr__(self):
+        return f"Payment({self.date}, {format_cents(self.cents)}, {self.reference!r})"
+
+
+def read_csv_statement(path: str) -> Iterator[Payment]:
+    """Credits of a CSV bank statement with date, amount, reference and (optionally) payer columns."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.readline()
+        f.seek(0)
+        reader = csv.reader(f, delimiter=";" if sample.count(";") > sample.count(",") else ",")
+        header = [name.strip().lower() for name in next(reader)]
+        columns = {}
+        for field, names in _CSV_COLUMNS.items():
+            found = [i for i, name in enumerate(header) if name in names]
+            if found:
+                columns[field] = found[0]
+            elif field != "payer":
+                raise ValueError(f"{path}: no {field} column in {header}")
+        day, amount, reference = columns["date"], columns["amount"], columns["reference"]
+        payer = columns.get("payer")
+        for row in reader:
+            if not row:
+                continue
+            cents = parse_amount(row[amount])
+            if cents > 0:
+                yield Payment(parse_date(row[day]), cents, row[reference], row[payer] if payer is not None else "")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def read_camt_statement(path: str) -> Iterator[Payment]:
+    """Credits of a CAMT.053/054 style XML statement (``Ntry`` elements), streamed entry by entry."""
+    for _, element in ElementTree.iterparse(path):
+        if _local(element.tag) != "Ntry":
+            continue
+        fields: Dict[str, str] = {}
+        references = []
+        for child in element.iter():
+            name = _local(child.tag)
+            text = (child.text or "").strip()
+            if name == "Ustrd" or (name == "Ref" and text):
+                references.append(text)
+            elif name in ("Amt", "CdtDbtInd") and name not in fields:
+                fields[name] = text
+            elif name == "Dt" and "Dt" not in fields:
+                fields["Dt"] = text
+            elif name == "Nm" and "Nm" not in fields:
+                fields["Nm"] = text
+        element.clear()
+        if fields.get("CdtDbtInd", "CRDT") != "CRDT" or "Amt" not in fields:
+            continue
+        yield Payment(parse_date(fields.get("Dt", "")[:10]), parse_amount(fields["Amt"]),
+                      " ".join(references), fields.get("Nm", ""))
+
+
+def read_statement(path: str) -> Iterator[Payment]:
+    """Incoming payments of a statement file: CAMT XML for ``.xml``, else CSV."""
+    if path.lower().endswith(".xml"):
+        return read_camt_statement(path)
+    return read_csv_statement(path)
+
+
+class Match:
+    """An amount of a payment applied to an invoice."""
+    __slots__ = ("payment", "invoice", "cents", "how")
+
+    def __init__(self, payment: Payment, invoice: str, cents: int, how: str):
+        self.payment = payment
+        self.invoice = invoice
+        self.cents = cents
+        # "reference": the invoice number is in the reference; "fuzzy": a
+        # mistyped number or the payer, for an open invoice of the same amount
+        self.how = how
+
+
+class Reconciliation:
+    def __init__(self):
+        self.matches: List[Match] = []
+        self.unmatched: List[Payment] = []
+        # Payment amounts beyond the open balance of the matched invoices
+        self.overpaid = 0
+
+    def summary(self) -> Dict[str, Any]:
+        hows: Dict[str, int] = {}
+        for match in self.matches:
+            hows[match.how] = hows.get(match.how, 0) + 1
+        return {"matches": len(self.matches), **hows, "unmatched": len(self.unmatched),
+                "unmatched_cents": sum(payment.cents for payment in self.unmatched),
+                "overpaid_cents": self.overpaid}
+
+
+class InvoiceLedger:
+    """Issued invoices with their due dates and what has been paid on them.
+
+    Invoices are stored column by column. They are indexed by invoice number
+    (``invoice_key``, so "inv 2024-0101/42" finds "INV-20240101-42"), and
+    invoices with an open balance also by that balance together with the
+    stem of their number and with their customer. ``match`` uses the number
+    index for payments whose reference names an invoice. For a fuzzy match
+    it only compares the open invoices of exactly the paid amount that share
+    the reference's number stem or the payer, so a payment costs a few
+    dictionary lookups and a few comparisons, even where many open invoices
+    have the same amount (as orders of list-price items do).
+    """
+
+    def __init__(self):
+        self.numbers: List[str] = []
+        self.customers: List[str] = []
+        self.cents: List[int] = []
+        self.paid: List[int] = []
+        self.issued: List[int] = []
+        self.due: List[int] = []
+        self._by_key: Dict[str, List[int]] = {}
+        # (open balance, number stem) and (open balance, customer key) -> open
+        # rows: a row or, for several, a set of rows
+        self._by_stem: Dict[Tuple[int, str], Rows] = {}
+        self._by_payer: Dict[Tuple[int, str], Rows] = {}
+        self._stems: List[str] = []
+        self._payers: List[str] = []
+        # Lengths of the invoice keys and of their stems, longest first
+        self._key_lengths: List[int] = []
+        self._stem_lengths: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def record(self, number: str, customer: str, cents: int, issued: date,
+               terms_days: int = PAYMENT_TERMS_DAYS, paid: int = 0, due: Optional[date] = None):
+        """Add an issued invoice of ``cents`` due ``terms_days`` after ``issued``."""
+        row = len(self.numbers)
+        self.numbers.append(number)
+        self.customers.append(customer)
+        self.cents.append(cents)
+        self.paid.append(paid)
+        self.issued.append(issued.toordinal())
+        self.due.append((due or issued + timedelta(days=terms_days)).toordinal())
+        key = invoice_key(number)
+        rows = self._by_key.get(key)
+        if rows is None:
+            self._by_key[key] = [row]
+            _add_length(self._key_lengths, len(key))
+        else:
+            rows.append(row)
+        stem = sys.intern(number_stem(key))
+        payer = sys.intern(invoice_key(customer))
+        self._stems.append(stem)
+        self._payers.append(payer)
+        _add_length(self._stem_lengths, len(stem))
+        if cents > paid:
+            _add(self._by_stem, (cents - paid, stem), row)
+            _add(self._by_payer, (cents - paid, payer), row)
+
+    def record_invoice(self, invoice: Mapping[str, Any]):
+        """Add an invoice record as made by ``DocumentGenerator.invoice_record``."""
+        self.record(invoice["number"], invoice["customer"], invoice["total_cents"],
+                    date.fromisoformat(invoice["date"]), invoice["payment_terms_days"])
+
+    def balance(self, row: int) -> int:
+        return self.cents[row] - self.paid[row]
+
+    def _apply(self, row: int, cents: int):
+        """Pay ``cents`` on an invoice, keeping the open-balance indexes current."""
+        before = self.cents[row] - self.paid[row]
+        self.paid[row] += cents
+        stem, payer = self._stems[row], self._payers[row]
+        _discard(self._by_stem, (before, stem), row)
+        _discard(self._by_payer, (before, payer), row)
+        after = before - cents
+        if after > 0:
+            _add(self._by_stem, (after, stem), row)
+            _add(self._by_payer, (after, payer), row)
+
+    def _referenced(self, reference: str) -> List[int]:
+        """Rows of the invoices whose number appears in a payment reference."""
+        key = invoice_key(reference)
+        found = []
+        start = key.find("INV")
+        while start != -1:
+            for length in self._key_lengths:
+                rows = self._by_key.get(key[start:start + length])
+                if rows is not None:
+                    # Of invoices sharing a number, the oldest open one
+                    found.append(next((row for row in rows if self.balance(row) > 0), rows[0]))
+                    break
+            start = key.find("INV", start + 3)
+        return found
+
+    def _fuzzy(self, payment: Payment, referenced: List[int]) -> Optional[int]:
+        """The open invoice of exactly the payment's amount that the reference or payer points to.
+
+        Where the reference names ``referenced`` invoices of another amount,
+        only an invoice whose number is one typo away from theirs qualifies.
+        """
+        cents = payment.cents
+        key = invoice_key(payment.reference)
+        candidates = set()
+        start = key.find("INV")
+        while start != -1:
+            for length in self._stem_lengths:
+                candidates.update(_rows(self._by_stem, (cents, key[start:start + length])))
+            start = key.find("INV", start + 3)
+        by_payer = _rows(self._by_payer, (cents, invoice_key(payment.payer))) if payment.payer else ()
+        candidates.update(by_payer)
+        if referenced:
+            named = [invoice_key(self.numbers[row]) for row in referenced]
+            candidates = [row for row in candidates
+                          if any(_one_typo(invoice_key(self.numbers[row]), number) for number in named)]
+            by_payer = ()
+        best, best_score = None, 0.0
+        for row in candidates:
+            score = _similarity(invoice_key(self.numbers[row]), key)
+            if score >= MIN_REFERENCE_SIMILARITY and score > best_score:
+                best, best_score = row, score
+        if best is not None:
+            return best
+        # No usable reference: the payer's only open invoice of this amount
+        if len(by_payer) == 1:
+            return next(iter(by_payer))
+        return None
+
+    def match(self, payments: Iterable[Payment]) -> Reconciliation:
+        """Apply payments to the invoices they pay."""
+        result = Reconciliation()
+        matches = result.matches
+        for payment in payments:
+            rows = self._referenced(payment.reference) if "INV" in payment.reference.upper() else []
+            how = "reference"
+            if not rows or sum(self.balance(row) for row in rows) != payment.cents:
+                # A mistyped number can name another invoice; an open invoice of
+                # exactly the amount with a number like the reference is likelier
+                row = self._fuzzy(payment, rows)
+                if row is not None:
+                    rows, how = [row], "fuzzy"
+                elif not rows:
+                    result.unmatched.append(payment)
+                    continue
+            left = payment.cents
+            for row in rows:
+                cents = min(left, self.balance(row))
+                if cents <= 0:
+                    continue
+                self._apply(row, cents)
+                matches.append(Match(payment, self.numbers[row], cents, how))
+                left -= cents
+            if left == payment.cents:
+                # Names only invoices that are paid already
+                result.unmatched.append(payment)
+            else:
+                result.overpaid += left
+        return result
+
+    def aging(self, as_of: date, by_customer: bool = False) -> Dict[str, Any]:
+        """Open balances in cents per aging bucket (per customer and bucket with ``by_customer``)."""
+        labels = [label for _, label in AGING_BUCKETS]
+        open_cents = np.array(self.cents, dtype=np.int64) - np.array(self.paid, dtype=np.int64)
+        overdue = as_of.toordinal() - np.array(self.due, dtype=np.int64)
+        bucket = np.searchsorted(np.array([first for first, _ in AGING_BUCKETS[1:]]), overdue, side="right")
+        if not by_customer:
+            totals = np.bincount(bucket, weights=open_cents, minlength=len(labels))
+            return {label: int(total) for label, total in zip(labels, totals)}
+        aging: Dict[str, Dict[str, int]] = {}
+        for row in np.flatnonzero(open_cents > 0).tolist():
+            buckets = aging.get(self.customers[row])
+            if buckets is None:
+                buckets = aging[self.customers[row]] = dict.fromkeys(labels, 0)
+            buckets[labels[bucket[row]]] += int(open_cents[row])
+        return aging
+
+    def save(self, path: str):
+        """Write the ledger to a SQLite file, replacing what it held."""
+        connection = sqlite3.connect(path)
+        try:
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS invoices (number TEXT, customer TEXT, "
+                                   "cents INTEGER, paid INTEGER, issued TEXT, due TEXT)")
+                connection.execute("DELETE FROM invoices")
+                connection.executemany("INSERT INTO invoices VALUES (?, ?, ?, ?, ?, ?)", zip(
+                    self.numbers, self.customers, self.cents, self.paid,
+                    (date.fromordinal(day).isoformat() for day in self.issued),
+                    (date.fromordinal(day).isoformat() for day in self.due)))
+        finally:
+            connection.close()
+
+    @classmethod
+    def load(cls, path: str) -> "InvoiceLedger":
+        ledger = cls()
+        if not os.path.exists(path):
+            return ledger
+        connection = sqlite3.connect(path)
+        try:
+            rows = connection.execute("SELECT number, customer, cents, paid, issued, due FROM invoices "
+                                      "ORDER BY rowid").fetchall()
+        finally:
+            connection.close()
+        for number, customer, cents, paid, issued, due in rows:
+            ledger.record(number, customer, cents, date.fromisoformat(issued), paid=paid,
+                          due=date.fromisoformat(due))
+        return ledger
+
+
+def number_stem(key: str) -> str:
+    """An invoice key without its serial number, e.g. "INV20240101BIK" for "INV20240101BIK00000042".
+
+    At least "INV" and the date are kept, for numbers that end in digits only.
+    """
+    return key[:max(len(key.rstrip("0123456789")), _MIN_STEM)]
+
+
+def _add_length(lengths: List[int], length: int):
+    if length not in lengths:
+        lengths.append(length)
+        lengths.sort(reverse=True)
+
+
+def _add(index: Dict[Any, Rows], key: Any, row: int):
+    rows = index.get(key)
+    if rows is None:
+        index[key] = row
+    elif type(rows) is int:
+        index[key] = {rows, row}
+    else:
+        rows.add(row)
+
+
+def _discard(index: Dict[Any, Rows], key: Any, row: int):
+    rows = index.get(key)
+    if rows is None:
+        return
+    if type(rows) is int:
+        if rows == row:
+            del index[key]
+    else:
+        rows.discard(row)
+        if len(rows) == 1:
+            index[key] = rows.pop()
+
+
+def _rows(index: Dict[Any, Rows], key: Any) -> Collection[int]:
+    rows = index.get(key)
+    if rows is None:
+        return ()
+    return (rows,) if type(rows) is int else rows
+
+
+def _one_typo(a: str, b: str) -> bool:
+    """True if two keys differ in exactly one character, or by two neighbours swapped."""
+    if len(a) != len(b) or a == b:
+        return False
+    diff = [i for i in range(len(a)) if a[i] != b[i]]
+    return len(diff) == 1 or (len(diff) == 2 and diff[1] == diff[0] + 1
+                              and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+
+
+def _similarity(number: str, key: str) -> float:
+    """Similarity of an invoice number to the stretch of a reference key most like it."""
+    starts = [i for i in range(len(key)) if key.startswith("INV", i)] or range(max(len(key) - len(number), 0) + 1)
+    best = 0.0
+    for start in starts:
+        best = max(best, SequenceMatcher(None, number, key[start:start + len(number)], autojunk=False).ratio())
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match bank statement payments to the invoices of a ledger.")
+    parser.add_argument("ledger", help="SQLite ledger written by batch_main --receivables")
+    parser.add_argument("statements", nargs="*", help="Bank statements: CAMT XML (.xml) or CSV")
+    parser.add_argument("--as-of", type=parse_date, default=date.today(), metavar="DATE",
+                        help="Day to age the open invoices on (default: today)")
+    parser.add_argument("--unmatched", metavar="PATH", help="Write the payments that matched no invoice as CSV")
+    parser.add_argument("--by-customer", action="store_true", help="Show the aging per customer")
+    args = parser.parse_args(argv)
+
+    ledger = InvoiceLedger.load(args.ledger)
+    unmatched = []
+    for path in args.statements:
+        result = ledger.match(read_statement(path))
+        unmatched.extend(result.unmatched)
+        print(f"{path}: {result.summary()}", file=sys.stderr)
+    if args.statements:
+        ledger.save(args.ledger)
+    if args.unmatched:
+        with open(args.unmatched, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["date", "amount", "reference", "payer"])
+            for payment in unmatched:
+                writer.writerow([payment.date.isoformat(), format_cents(payment.cents), payment.reference,
+                                 payment.payer])
+
+    aging = ledger.aging(args.as_of, args.by_customer)
+    rows = aging.items() if args.by_customer else [("all customers", aging)]
+    labels = [label for _, label in AGING_BUCKETS]
+    print(f"{'customer':<30}" + "".join(f"{label:>14}" for label in labels))
+    for customer, buckets in rows:
+        print(f"{customer[:30]:<30}" + "".join(f"{format_cents(buckets[label]):>14}" for label in labels))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+DEFAULT_ENTRIES = 10_000
+DEFAULT_CHARS = 32 * 1024 * 1024
+
+
+class RenderCache:
+    """Bounded LRU cache of rendered document sections, keyed by their content.
+
+    A key is everything a section is rendered from (e.g. the SKU, name,
+    quantity and price of every line), so two orders with the same lines
+    share one entry, and a changed price or storage location simply makes a
+    new key; no entry ever needs to be invalidated. The least recently used
+    entries are evicted once there are more than ``max_entries`` of them or
+    their sizes add up to more than ``max_chars``.
+
+    Not thread-safe; give every worker thread or process its own cache.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ENTRIES, max_chars: int = DEFAULT_CHARS):
+        if max_entries < 1 or max_chars < 1:
+            raise ValueError("A render cache needs room for at least one entry")
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int = 1):
+        """Store ``value`` (``size`` characters) under ``key``, evicting old entries as needed."""
+        if size > self.max_chars:
+            return
+        entries = self._entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self.chars -= old[1]
+        entries[key] = (value, size)
+        self.chars += size
+        while len(entries) > self.max_entries or self.chars > self.max_chars:
+            _, (_, evicted) = entries.popitem(last=False)
+            self.chars -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry; the statistics are kept."""
+        self._entries.clear()
+        self.chars = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "chars": self.chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,102 @@
+import json
+import random
+import sqlite3
+import time
+from typing import Dict, Any, Callable, Optional, TypeVar
+from inquiry_parser import ParseError
+
+T = TypeVar("T")
+
+# SQLite reports a database held by another writer past its busy timeout
+# as an OperationalError with one of these in the message
+_SQLITE_TRANSIENT = ("locked", "busy")
+
+
+class TransientError(Exception):
+    """A backend failure that is expected to go away when the call is repeated."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for errors worth retrying: locked databases, timeouts and dropped connections."""
+    if isinstance(error, (TransientError, TimeoutError, ConnectionError, InterruptedError)):
+        return True
+    if isinstance(error, sqlite3.OperationalError):
+        message = str(error)
+        return any(word in message for word in _SQLITE_TRANSIENT)
+    return False
+
+
+class Backoff:
+    """Repeats calls that fail with a transient error, waiting longer before each attempt.
+
+    The n-th retry waits ``base * 2**n`` seconds, at most ``cap``, with
+    "full jitter" (a random part of that), so runs that collided on a
+    backend do not collide again in step. After ``attempts`` calls the
+    error is raised. Calls that succeed cost one ``try`` block.
+    """
+
+    def __init__(self, attempts: int = 5, base: float = 0.05, cap: float = 2.0,
+                 sleep: Callable[[float], None] = time.sleep, seed: Optional[int] = None):
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1")
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.sleep = sleep
+        self.retries = 0
+        self._random = random.Random(seed)
+
+    def delay(self, retry: int) -> float:
+        return self._random.uniform(0, min(self.cap, self.base * (1 << retry)))
+
+    def call(self, function: Callable[..., T], *args) -> T:
+        retry = 0
+        while True:
+            try:
+                return function(*args)
+            except Exception as e:
+                if retry + 1 >= self.attempts or not is_transient(e):
+                    raise
+            self.sleep(self.delay(retry))
+            retry += 1
+            self.retries += 1
+
+
+class DeadLetters:
+    """JSON Lines file of the orders that failed, with what is needed to fix and rerun them.
+
+    Each line holds the order's index and reference, the stage and the type
+    and message of the error, the inquiry text as it came in and, for texts
+    that did not parse, the parse context (``ParseError.context``).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "a", encoding="utf-8")
+
+    def add(self, index: int, text: str, result: Dict[str, Any], order_ref: Optional[str] = None):
+        """Record an order whose ``process_sales_inquiry`` result has status "error"."""
+        letter = {
+            "index": index,
+            "order_ref": order_ref,
+            "stage": result.get("stage"),
+            "error_type": result.get("error_type"),
+            "error": result.get("error"),
+            "text": text,
+        }
+        error = result.get("exception")
+        if isinstance(error, ParseError):
+            letter["context"] = error.context()
+        self._file.write(json.dumps(letter, ensure_ascii=False))
+        self._file.write("\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,118 @@
+from typing import Dict, Any, Iterable, List, Mapping, Optional
+import numpy as np
+from money import RATE_SCALE, to_cents, to_rate
+
+
+def _apply_rates(cents: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """Vectorised ``money.apply_rate``: cents * rate / RATE_SCALE, rounded half up."""
+    magnitude = (np.abs(cents) * rates * 2 + RATE_SCALE) // (2 * RATE_SCALE)
+    return np.where(cents < 0, -magnitude, magnitude)
+
+
+class OrderLines:
+    """The order lines of a batch of orders, stored column by column.
+
+    Every column is a NumPy array with one entry per line. Amounts are int64
+    cents, so totals and rollups are exact and round the way invoices do.
+    Orders, customers and SKUs are stored as codes into the ``doc_numbers``,
+    ``customers`` and ``skus`` lists.
+    """
+
+    def __init__(self, order: np.ndarray, customer: np.ndarray, sku: np.ndarray,
+                 quantity: np.ndarray, unit_cents: np.ndarray,
+                 doc_numbers: List[str], customers: List[str], skus: List[str]):
+        self.order = order
+        self.customer = customer
+        self.sku = sku
+        self.quantity = quantity
+        self.unit_cents = unit_cents
+        self.doc_numbers = doc_numbers
+        self.customers = customers
+        self.skus = skus
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Dict[str, Any]],
+                    prices: Optional[Mapping[str, Any]] = None) -> "OrderLines":
+        """Build the columns from parsed inquiries (``ProcessManager.parse_inquiry`` output).
+
+        Unit prices come from ``prices`` (e.g. the catalog) when given, else
+        from each product's ``price``.
+        """
+        order, customer, sku, quantity, unit_cents = [], [], [], [], []
+        doc_numbers, customers, skus = [], [], []
+        customer_codes: Dict[str, int] = {}
+        sku_codes: Dict[str, int] = {}
+        cents_of: Dict[Any, int] = {}
+
+        for i, inquiry_data in enumerate(orders):
+            doc_numbers.append(inquiry_data["doc_number"])
+            name = inquiry_data["customer"]
+            customer_code = customer_codes.get(name)
+            if customer_code is None:
+                customer_code = customer_codes[name] = len(customers)
+                customers.append(name)
+            for product in inquiry_data["products"]:
+                product_id = product['id']
+                sku_code = sku_codes.get(product_id)
+                if sku_code is None:
+                    sku_code = sku_codes[product_id] = len(skus)
+                    skus.append(product_id)
+                item = prices.get(product_id) if prices is not None else None
+                price = item['price'] if item is not None else product.get('price', 0)
+                cents = cents_of.get(price)
+                if cents is None:
+                    cents = cents_of[price] = to_cents(price)
+                order.append(i)
+                customer.append(customer_code)
+                sku.append(sku_code)
+                quantity.append(product['quantity'])
+                unit_cents.append(cents)
+
+        return cls(np.array(order, dtype=np.int64), np.array(customer, dtype=np.int64),
+                   np.array(sku, dtype=np.int64), np.array(quantity, dtype=np.int64),
+                   np.array(unit_cents, dtype=np.int64), doc_numbers, customers, skus)
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+    def line_totals(self) -> np.ndarray:
+        """Quantity times unit price per line, in cents."""
+        return self.quantity * self.unit_cents
+
+    def _sum_by(self, codes: np.ndarray, size: int, values: Optional[np.ndarray] = None) -> np.ndarray:
+        totals = np.zeros(size, dtype=np.int64)
+        np.add.at(totals, codes, self.line_totals() if values is None else values)
+        return totals
+
+    def order_totals(self) -> np.ndarray:
+        """Total per order (excluding tax), in cents, in the order the orders were given."""
+        return self._sum_by(self.order, len(self.doc_numbers))
+
+    def revenue_by_customer(self) -> Dict[str, int]:
+        totals = self._sum_by(self.customer, len(self.customers))
+        return dict(zip(self.customers, totals.tolist()))
+
+    def revenue_by_sku(self) -> Dict[str, int]:
+        totals = self._sum_by(self.sku, len(self.skus))
+        return dict(zip(self.skus, totals.tolist()))
+
+    def invoice_totals(self, tax_rate: Any = "0.19", discount_rate: Any = 0,
+                       customer_discounts: Optional[Mapping[str, Any]] = None) -> Dict[str, np.ndarray]:
+        """Net, discount, tax and gross amount per order, in cents.
+
+        The discount is rounded per line, the tax per order on the discounted
+        net amount. ``customer_discounts`` overrides ``discount_rate`` for
+        individual customers.
+        """
+        rates = np.full(len(self.customers), to_rate(discount_rate), dtype=np.int64)
+        for name, rate in (customer_discounts or {}).items():
+            if name in self.customers:
+                rates[self.customers.index(name)] = to_rate(rate)
+
+        lines = self.line_totals()
+        line_discounts = _apply_rates(lines, rates[self.customer])
+        net = self._sum_by(self.order, len(self.doc_numbers))
+        discount = self._sum_by(self.order, len(self.doc_numbers), line_discounts)
+        taxable = net - discount
+        tax = _apply_rates(taxable, np.int64(to_rate(tax_rate)))
+        return {"net": net, "discount": discount, "taxable": taxable, "tax": tax, "gross": taxable + tax}
@@ -0,0 +1,241 @@
+import csv
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Tuple
+from allocation import due_in_days
+from models import Inquiry, InquiryData, as_inquiry
+
+# Shipping dimensions of one unit: length, width, height (cm) and weight (kg)
+Dimensions = Tuple[float, float, float, float]
+
+# A boxed bike, for SKUs without dimensions of their own
+DEFAULT_DIMENSIONS: Dimensions = (140.0, 20.0, 75.0, 18.0)
+
+# Euro pallet loaded up to 180 cm. Boxes do not fill a pallet completely, so
+# only PALLET_FILL of its volume is planned with.
+PALLET_LENGTH, PALLET_WIDTH, PALLET_HEIGHT = 120.0, 80.0, 180.0
+PALLET_FILL = 0.85
+PALLET_MAX_KG = 750.0
+# Standard semi-trailer
+TRUCK_PALLETS = 33
+TRUCK_MAX_KG = 24_000.0
+
+
+def read_dimensions(path: str) -> Dict[str, Dimensions]:
+    """Per-SKU dimensions from a CSV file with the columns sku, length, width, height and weight."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["sku"]: (float(row["length"]), float(row["width"]), float(row["height"]),
+                             float(row["weight"])) for row in csv.DictReader(f)}
+
+
+def number_ranges(numbers: Iterable[int]) -> str:
+    """[1, 2, 3, 7, 9, 10] -> "1-3, 7, 9-10"."""
+    ranges: List[List[int]] = []
+    for n in sorted(numbers):
+        if ranges and n == ranges[-1][1] + 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return ", ".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+class Pallet:
+    """Units of one or more SKUs stacked on one pallet."""
+    __slots__ = ("contents", "volume", "weight")
+
+    def __init__(self):
+        self.contents: Dict[str, int] = {}
+        self.volume = 0.0
+        self.weight = 0.0
+
+    def add(self, sku: str, units: int, volume: float, weight: float):
+        self.contents[sku] = self.contents.get(sku, 0) + units
+        self.volume += volume
+        self.weight += weight
+
+
+class Shipment:
+    """Orders to one consignee in one delivery window, shipped together."""
+
+    def __init__(self, number: int, customer: str, delivery: str, due_days: int):
+        self.number = number
+        self.customer = customer
+        self.delivery = delivery
+        self.due_days = due_days
+        self.orders: List[Inquiry] = []
+        self.pallets: List[Pallet] = []
+        # Truck numbers carrying the pallets; a shipment over a truckload takes several
+        self.trucks: List[int] = []
+
+    @property
+    def units(self) -> int:
+        return sum(product.quantity for order in self.orders for product in order.products)
+
+    @property
+    def weight(self) -> float:
+        return sum(pallet.weight for pallet in self.pallets)
+
+
+class Truck:
+    """One truckload: whole pallets of one or more shipments."""
+    __slots__ = ("number", "pallets", "weight", "shipments")
+
+    def __init__(self, number: int):
+        self.number = number
+        self.pallets = 0
+        self.weight = 0.0
+        self.shipments: List[int] = []
+
+
+class ShippingPlan:
+    def __init__(self, shipments: List[Shipment], trucks: List[Truck]):
+        self.shipments = shipments
+        self.trucks = trucks
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "orders": sum(len(shipment.orders) for shipment in self.shipments),
+            "shipments": len(self.shipments),
+            "pallets": sum(len(shipment.pallets) for shipment in self.shipments),
+            "trucks": len(self.trucks),
+        }
+
+
+class ShipmentPlanner:
+    """Consolidates orders into shipments and packs them onto pallets and trucks.
+
+    Orders to the same customer whose delivery texts give the same deadline
+    ("Needed within 4 weeks") become one shipment. Each shipment is packed
+    by SKU: first as many full single-SKU pallets as volume and weight allow,
+    then the remainders of all SKUs onto mixed pallets, first fit by
+    decreasing volume. Packing goes by volume and weight, not by the
+    geometry of the boxes; ``PALLET_FILL`` leaves room for the gaps.
+
+    Trucks are loaded with whole shipments where they fit, best fit by
+    decreasing pallet count. A shipment over one truckload fills trucks of
+    its own, and its remaining pallets are loaded like any other shipment.
+    """
+
+    def __init__(self, dimensions: Optional[Mapping[str, Dimensions]] = None,
+                 pallet_volume: float = PALLET_LENGTH * PALLET_WIDTH * PALLET_HEIGHT * PALLET_FILL,
+                 pallet_kg: float = PALLET_MAX_KG, truck_pallets: int = TRUCK_PALLETS,
+                 truck_kg: float = TRUCK_MAX_KG):
+        self.dimensions = dimensions or {}
+        self.pallet_volume = pallet_volume
+        self.pallet_kg = pallet_kg
+        self.truck_pallets = truck_pallets
+        self.truck_kg = truck_kg
+        self._units: Dict[str, Tuple[float, float, int]] = {}
+
+    def _unit(self, sku: str) -> Tuple[float, float, int]:
+        """Volume and weight of one unit of a SKU, and how many units fill a pallet."""
+        unit = self._units.get(sku)
+        if unit is None:
+            length, width, height, weight = self.dimensions.get(sku, DEFAULT_DIMENSIONS)
+            volume = length * width * height
+            # A unit too big for a pallet still ships, one unit per pallet
+            per_pallet = max(1, min(int(self.pallet_volume // volume), int(self.pallet_kg // weight)))
+            unit = self._units[sku] = (volume, weight, per_pallet)
+        return unit
+
+    def plan(self, orders: Iterable[InquiryData], first_number: int = 1) -> ShippingPlan:
+        shipments: Dict[Tuple[str, int], Shipment] = {}
+        days: Dict[str, int] = {}
+        for order in orders:
+            inquiry = as_inquiry(order)
+            delivery = inquiry.delivery
+            due = days.get(delivery)
+            if due is None:
+                due = days[delivery] = due_in_days(delivery)
+            key = (inquiry.customer, due)
+            shipment = shipments.get(key)
+            if shipment is None:
+                shipment = shipments[key] = Shipment(first_number + len(shipments), inquiry.customer,
+                                                     delivery, due)
+            shipment.orders.append(inquiry)
+        for shipment in shipments.values():
+            self._pack(shipment)
+        return ShippingPlan(list(shipments.values()), self._load(list(shipments.values())))
+
+    def _pack(self, shipment: Shipment):
+        units: Dict[str, int] = {}
+        for order in shipment.orders:
+            for product in order.products:
+                units[product.id] = units.get(product.id, 0) + product.quantity
+
+        pallets = shipment.pallets
+        remainders = []
+        for sku, quantity in units.items():
+            volume, weight, per_pallet = self._unit(sku)
+            full, rest = divmod(quantity, per_pallet)
+            for _ in range(full):
+                pallet = Pallet()
+                pallet.add(sku, per_pallet, volume * per_pallet, weight * per_pallet)
+                pallets.append(pallet)
+            if rest:
+                remainders.append((volume * rest, weight * rest, sku, rest))
+
+        # First fit decreasing; each remainder fits on an empty pallet by itself
+        remainders.sort(reverse=True)
+        mixed: List[Pallet] = []
+        for volume, weight, sku, rest in remainders:
+            for pallet in mixed:
+                if pallet.volume + volume <= self.pallet_volume and pallet.weight + weight <= self.pallet_kg:
+                    break
+            else:
+                pallet = Pallet()
+                mixed.append(pallet)
+            pallet.add(sku, rest, volume, weight)
+        pallets.extend(mixed)
+
+    def _load(self, shipments: List[Shipment]) -> List[Truck]:
+        trucks: List[Truck] = []
+        capacity = self.truck_pallets
+        # Open trucks by free pallet places, for best fit without scanning every truck
+        by_free: List[List[Truck]] = [[] for _ in range(capacity + 1)]
+
+        def new_truck() -> Truck:
+            truck = Truck(len(trucks) + 1)
+            trucks.append(truck)
+            return truck
+
+        def load(truck: Truck, shipment: Shipment, pallets: List[Pallet]):
+            truck.pallets += len(pallets)
+            truck.weight += sum(pallet.weight for pallet in pallets)
+            truck.shipments.append(shipment.number)
+            shipment.trucks.append(truck.number)
+
+        loose = []
+        for shipment in shipments:
+            pallets = shipment.pallets
+            start = 0
+            # Full truckloads by pallet places, then by weight
+            while len(pallets) - start >= capacity:
+                load_pallets, weight = [], 0.0
+                for pallet in pallets[start:start + capacity]:
+                    if load_pallets and weight + pallet.weight > self.truck_kg:
+                        break
+                    load_pallets.append(pallet)
+                    weight += pallet.weight
+                load(new_truck(), shipment, load_pallets)
+                start += len(load_pallets)
+            if start < len(pallets):
+                loose.append((len(pallets) - start, shipment, pallets[start:]))
+
+        loose.sort(key=lambda item: -item[0])
+        for count, shipment, pallets in loose:
+            weight = sum(pallet.weight for pallet in pallets)
+            chosen = None
+            for free in range(count, capacity + 1):
+                for truck in reversed(by_free[free]):
+                    if truck.weight + weight <= self.truck_kg:
+                        chosen = truck
+                        break
+                if chosen is not None:
+                    by_free[free].remove(chosen)
+                    break
+            if chosen is None:
+                chosen = new_truck()
+            load(chosen, shipment, pallets)
+            free = capacity - chosen.pallets
+            if free:
+                by_free[free].append(chosen)
+        return trucks
@@ -0,0 +1,173 @@
+import io
+import os
+import re
+import tarfile
+import time
+import zipfile
+from typing import Dict, Any, List, Optional
+
+# Document kinds in the order they are produced by the sales process
+KINDS = ("inquiry", "inventory", "picking", "shipping", "billing")
+# Files of a RotatingFileSink series: kind and number
+SERIES_FILE = re.compile(r"(\w+)-(\d{5})\.txt")
+
+
+class DocumentSink:
+    """Persists generated documents batch by batch.
+
+    Documents are collected per kind until ``batch_size`` orders have been
+    added. The batch is then written in one bulk write and dropped, so memory
+    use is bounded by one batch however many orders are processed.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+        self.batches_written = 0
+        self.documents_written = 0
+        self._orders = 0
+        self._buffers: Dict[str, List[str]] = {kind: [] for kind in KINDS}
+
+    def add(self, index: int, doc_number: str, documents: Dict[str, str],
+            data: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Buffer the documents of one order (as in ``process_sales_inquiry`` results).
+
+        ``data`` holds the typed values of the numbered documents (a record's
+        "document_data"); text sinks only store the texts.
+        """
+        for kind, text in documents.items():
+            buffer = self._buffers.get(kind)
+            if buffer is None:
+                buffer = self._buffers[kind] = []
+            buffer.append(f"===== {kind} #{index} {doc_number} =====\n{text}\n\n")
+        self._orders += 1
+        if self._orders >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write out the current batch."""
+        if not self._orders:
+            return
+        for kind, buffer in self._buffers.items():
+            if buffer:
+                self._write(kind, "".join(buffer).encode("utf-8"))
+                self.documents_written += len(buffer)
+                buffer.clear()
+        self.batches_written += 1
+        self._orders = 0
+
+    def _write(self, kind: str, data: bytes):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class RotatingFileSink(DocumentSink):
+    """Writes documents to one series of text files per kind in ``directory``.
+
+    A new file (``billing-00002.txt`` and so on) is started once the current
+    one reaches ``max_bytes``. Like the archive sinks, a sink starts afresh:
+    the series files an earlier run left in ``directory`` are removed, so
+    they cannot mix with this run's. With ``append=True`` they are kept and
+    every series continues in its last file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, batch_size: int = 1000,
+                 append: bool = False):
+        super().__init__(batch_size)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.append = append
+        self._files: Dict[str, tuple] = {}
+        os.makedirs(directory, exist_ok=True)
+        if not append:
+            for name in os.listdir(directory):
+                if SERIES_FILE.fullmatch(name):
+                    os.remove(os.path.join(directory, name))
+
+    def _open(self, kind: str, number: int):
+        path = os.path.join(self.directory, f"{kind}-{number:05d}.txt")
+        return open(path, "ab" if self.append else "wb", buffering=1024 * 1024)
+
+    def _last(self, kind: str) -> int:
+        """Number of the last file of a series in the directory, 0 if there is none."""
+        numbers = [int(match.group(2)) for match in map(SERIES_FILE.fullmatch, os.listdir(self.directory))
+                   if match and match.group(1) == kind]
+        return max(numbers, default=0)
+
+    def _write(self, kind: str, data: bytes):
+        number, f = self._files.get(kind, (None, None))
+        if number is None:
+            # An appending sink reopens the last file of the series first
+            number = max(self._last(kind) - 1, 0) if self.append else 0
+        if f is None or f.tell() >= self.max_bytes:
+            if f is not None:
+                f.close()
+            number += 1
+            f = self._open(kind, number)
+            self._files[kind] = (number, f)
+        f.write(data)
+
+    def close(self):
+        super().close()
+        for _, f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+class ZipArchiveSink(DocumentSink):
+    """Writes each batch as one compressed member per kind, e.g. ``billing/000001.txt``."""
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        super().__init__(batch_size)
+        self.archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def _write(self, kind: str, data: bytes):
+        self.archive.writestr(f"{kind}/{self.batches_written + 1:06d}.txt", data)
+
+    def close(self):
+        super().close()
+        self.archive.close()
+
+
+class TarArchiveSink(DocumentSink):
+    """Streams batches into a tar archive (gzip compressed for ``.tar.gz``/``.tgz``)."""
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        super().__init__(batch_size)
+        mode = "w|gz" if path.endswith((".tar.gz", ".tgz")) else "w|"
+        self.archive = tarfile.open(path, mode)
+
+    def _write(self, kind: str, data: bytes):
+        info = tarfile.TarInfo(f"{kind}/{self.batches_written + 1:06d}.txt")
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.archive.addfile(info, io.BytesIO(data))
+        # A streamed archive never needs its member list again
+        self.archive.members.clear()
+
+    def close(self):
+        super().close()
+        self.archive.close()
+
+
+def open_sink(path: str, batch_size: int = 1000, max_bytes: Optional[int] = None,
+              append: bool = False) -> DocumentSink:
+    """Pick a sink by the path: ``.zip``, ``.tar``/``.tar.gz``/``.tgz``, or else a directory.
+
+    ``append`` only applies to a directory (see ``RotatingFileSink``).
+    """
+    if path.endswith(".zip"):
+        return ZipArchiveSink(path, batch_size)
+    if path.endswith((".tar", ".tar.gz", ".tgz")):
+        return TarArchiveSink(path, batch_size)
+    if max_bytes is None:
+        return RotatingFileSink(path, batch_size=batch_size, append=append)
+    return RotatingFileSink(path, max_bytes, batch_size, append)
@@ -1,11 +1,58 @@
 import streamlit as st
+from catalog import ProductCatalog
+from inventory import MemoryInventory
 from process_manager import ProcessManager
 from datetime import datetime
 
+INQUIRY = """
+            Customer: BikeWorld GmbH
+            Products requested:
+            - 30 Deluxe Touring Bikes in Black
+            - 20 Professional Touring Bikes in Red
+            Delivery: Needed within 4 weeks
+            Special requirements: All bikes must include standard warranty
+            """
+
+# Catalog, inventory and the process manager are built once per server
+# process and shared by all sessions. The manager keeps no per-order state;
+# its document numbering is shared as well, so numbers count across all
+# sessions, and it hands them out under a lock, so concurrent sessions never
+# get the same number.
+
+@st.cache_resource
+def load_catalog():
+    return ProductCatalog.sample()
+
+@st.cache_resource
+def load_inventory():
+    return MemoryInventory.from_catalog(load_catalog())
+
+@st.cache_resource
+def load_manager():
+    return ProcessManager(verbose=False, catalog=load_catalog(), stock=load_inventory())
+
+def get_document(inquiry_text, kind):
+    """Render a document once per session and inquiry; reruns read it from session state."""
+    key = (inquiry_text, kind)
+    document = st.session_state.documents.get(key)
+    if document is None:
+        manager = load_manager()
+        inquiry_data = st.session_state.inquiries.get(inquiry_text)
+        if inquiry_data is None:
+            inquiry_data = st.session_state.inquiries[inquiry_text] = manager.parse_inquiry(inquiry_text)
+        document = manager.doc_generator.render_many(kind, [inquiry_data], manager.inventory)
+        st.session_state.documents[key] = document
+    return document
+
+def show_document(kind, label):
+    with st.expander(label, expanded=True):
+        st.code(get_document(INQUIRY, kind), language="text")
+
 def initialize_session_state():
     if 'step' not in st.session_state:
         st.session_state.step = 0
-        st.session_state.manager = ProcessManager()
+        st.session_state.documents = {}
+        st.session_state.inquiries = {}
         st.session_state.inquiry_processed = False
         st.session_state.fg_choice = None
         st.session_state.rm_choice = None
@@ -69,16 +116,7 @@ def main():
             We've received the following sales inquiry from a customer:
             """)
             
-            inquiry = """
-            Customer: BikeWorld GmbH
-            Products requested:
-            - 30 Deluxe Touring Bikes in Black
-            - 20 Professional Touring Bikes in Red
-            Delivery: Needed within 4 weeks
-            Special requirements: All bikes must include standard warranty
-            """
-            
-            st.code(inquiry, language="text")
+            st.code(INQUIRY, language="text")
             
             if st.button("Process Inquiry"):
                 st.session_state.inquiry_processed = True
@@ -87,6 +125,7 @@ def main():
         if st.session_state.inquiry_processed:
             st.success("✅ Sales inquiry has been processed!")
             st.markdown("The system has generated an inquiry document with a unique reference number.")
+            show_document("inquiry", "📄 Sales Inquiry Document")
             
             if st.button("Proceed to Inventory Check"):
                 st.session_state.step += 1
@@ -98,7 +137,9 @@ def main():
         if st.session_state.fg_choice is None:
             st.markdown("""
             The system now checks the current inventory levels for the requested products.
-            
+            """)
+            show_document("inventory", "📄 Inventory Check Document")
+            st.markdown("""
             ### Decision Point: Finished Goods (FG) Stock
             As the inventory manager, you need to make a decision based on the current stock levels.
             """)
@@ -164,11 +205,8 @@ def main():
         st.header("📦 Step 3: Picking Process")
         st.markdown("""
         The system has generated picking documents for the warehouse team.
-        
-        The following items will be picked:
-        - 30 Deluxe Touring Bikes (Black) from Warehouse A, Aisle 12, Rack 3
-        - 20 Professional Touring Bikes (Red) from Warehouse B, Aisle 10, Rack 5
         """)
+        show_document("picking", "📄 Picking Ticket")
         
         if st.button("Proceed to Shipping"):
             st.session_state.step += 1
@@ -179,11 +217,9 @@ def main():
         st.markdown("""
         The picked items are now being prepared for shipment.
         
-        The system has generated:
-        - Packing list
-        - Shipping labels
-        - Delivery note
+        The system has generated the packing slip and the bill of lading:
         """)
+        show_document("shipping", "📄 Packing Slip and Bill of Lading")
         
         if st.button("Proceed to Billing"):
             st.session_state.step += 1
@@ -193,12 +229,9 @@ def main():
         st.header("💰 Step 5: Billing Process")
         st.markdown("""
         All documents have been generated and the process is complete!
-        
-        Generated documents:
-        - Invoice
-        - Delivery note
-        - Warranty certificates
-        
+        """)
+        show_document("billing", "📄 Sales Invoice")
+        st.markdown("""
         ### Process Summary:
         1. Sales Inquiry: Customer order received and processed
         2. Inventory: Stock availability confirmed
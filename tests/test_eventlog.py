@@ -0,0 +1,43 @@
+from eventlog import EventLog
+from policies import StockCheckPolicy
+from process_manager import ProcessManager
+
+INQUIRY = """Customer: BikeWorld GmbH
+- 5 Deluxe Touring Bikes in Black
+"""
+
+
+def failing_in(stage):
+    """A manager whose numbered document for ``stage`` cannot be generated."""
+    process = ProcessManager(verbose=False)
+    generate = process.doc_generator.generate_numbered
+
+    def generate_numbered(kind, *args):
+        if kind == stage:
+            raise OSError("disk full")
+        return generate(kind, *args)
+
+    process.doc_generator.generate_numbered = generate_numbered
+    return process
+
+
+def test_replay_keeps_the_stage_an_order_failed_in(tmp_path):
+    result = failing_in("shipping").process_sales_inquiry(INQUIRY, StockCheckPolicy())
+    assert result["status"] == "error" and result["stage"] == "shipping"
+    with EventLog(str(tmp_path / "orders.log")) as events:
+        events.record(0, result)
+        events.record(1, ProcessManager(verbose=False).process_sales_inquiry("", StockCheckPolicy()))
+        states = events.replay()
+        assert [event["event"] for event in events.history(0)] == ["inquiry", "inventory", "picking", "error"]
+    assert states.get(0) == {"order": 0, "stage": "picking", "status": "error", "fg_choice": None,
+                             "rm_choice": None, "reason": None, "failed_stage": "shipping"}
+    assert states.get(1)["stage"] == "received" and states.get(1)["failed_stage"] == "parse"
+    assert states.finished(0) and states.finished(1)
+
+
+def test_resumed_order_that_fails_again(tmp_path):
+    with EventLog(str(tmp_path / "orders.log")) as events:
+        events.record(0, ProcessManager(verbose=False).process_sales_inquiry(INQUIRY, StockCheckPolicy()))
+        events.record(0, failing_in("billing").process_sales_inquiry(INQUIRY, StockCheckPolicy()), resumed=True)
+        states = events.replay()
+    assert states.get(0)["status"] == "error" and states.get(0)["failed_stage"] == "billing"
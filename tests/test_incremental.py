@@ -0,0 +1,28 @@
+from incremental import OrderBook
+from numbering import PICKING
+from policies import StockCheckPolicy
+from process_manager import ProcessManager
+
+INQUIRY = """Customer: BikeWorld GmbH
+- 5 Deluxe Touring Bikes in Black
+"""
+
+
+def test_price_update_regenerates_inquiry_and_invoice_under_their_numbers():
+    book = OrderBook(ProcessManager(verbose=False))
+    result = book.process(INQUIRY, StockCheckPolicy())
+    numbers = dict(result["numbers"])
+    invoice = result["documents"]["billing"]
+
+    assert book.update("DTB-2024-BLK", price=1000.0) == {0}
+    documents = result["documents"]
+    assert result["numbers"] == numbers
+    assert f"Invoice Number: {numbers['billing']}" in documents["billing"]
+    assert documents["billing"] != invoice
+    assert "Total Order Value: 5000.00 EUR" in documents["inquiry"]
+
+    book.update("DTB-2024-BLK", location="WH9-Z9-R9")
+    assert f"Ticket Number: {numbers['picking']}" in documents["picking"]
+    assert "WH9-Z9-R9" in documents["picking"]
+    # Nothing was drawn for the regenerated documents
+    assert book.manager.numbering.next(PICKING) == int(numbers["picking"].rsplit("-", 1)[1]) + 1
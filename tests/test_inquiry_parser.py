@@ -0,0 +1,20 @@
+import pytest
+from process_manager import ProcessManager
+
+ORDER = {"customer": "BikeWorld GmbH", "products": [{"id": "DTB-2024-BLK", "quantity": 5}]}
+
+
+@pytest.mark.parametrize("field, value", [
+    ("delivery", 14), ("delivery", ["next week"]), ("special_requirements", {"gift": True}),
+    ("products", 5), ("products", "DTB-2024-BLK"), ("customer", None),
+])
+def test_malformed_order_fields_are_value_errors(field, value):
+    parser = ProcessManager(verbose=False).parser
+    with pytest.raises(ValueError):
+        parser.from_order(dict(ORDER, **{field: value}))
+
+
+def test_order_with_optional_texts():
+    parser = ProcessManager(verbose=False).parser
+    inquiry = parser.from_order(dict(ORDER, delivery="Needed within 2 weeks", special_requirements=None))
+    assert inquiry.delivery == "Needed within 2 weeks" and inquiry.special_requirements == ""
@@ -0,0 +1,60 @@
+import asyncio
+from inventory import MemoryInventory
+from pipeline import AsyncPipeline
+from policies import ReservingPolicy, StockCheckPolicy, SUFFICIENT, INSUFFICIENT
+from process_manager import ProcessManager
+
+INQUIRY = """Customer: BikeWorld GmbH
+- 30 Deluxe Touring Bikes in Black
+- 20 Professional Touring Bikes in Red
+"""
+
+
+def manager(deluxe, professional):
+    """A manager whose stock backend holds less than the catalog's 45 and 30 bikes."""
+    return ProcessManager(verbose=False, stock=MemoryInventory({"DTB-2024-BLK": deluxe, "PTB-2024-RED": professional}))
+
+
+def quantities(document):
+    return [line.split(": ")[1] for line in document.splitlines() if "Available quantity" in line]
+
+
+def test_failed_reservation_shows_backend_stock_and_reserves_nothing():
+    process = manager(40, 10)
+    result = process.process_sales_inquiry(INQUIRY, ReservingPolicy(process.stock))
+    assert result["status"] == "halted" and result["fg_choice"] == INSUFFICIENT
+    assert result["reserved"] is False
+    document = result["documents"]["inventory"]
+    assert quantities(document) == ["40", "10"]
+    assert "Insufficient stock: nothing reserved for order" in document
+    assert "quantities reserved" not in document
+    assert process.stock.available("DTB-2024-BLK") == 40
+
+
+def test_reservation_shows_stock_available_before_it():
+    process = manager(40, 25)
+    result = process.process_sales_inquiry(INQUIRY, ReservingPolicy(process.stock))
+    assert result["status"] == "completed" and result["reserved"] is True
+    document = result["documents"]["inventory"]
+    assert quantities(document) == ["40", "25"]
+    assert "Available quantities reserved for order" in document
+    assert process.stock.available("DTB-2024-BLK") == 10
+
+
+def test_check_without_reservation_shows_catalog_stock():
+    process = manager(0, 0)
+    result = process.process_sales_inquiry(INQUIRY, StockCheckPolicy())
+    assert result["fg_choice"] == SUFFICIENT and result["reserved"] is None
+    document = result["documents"]["inventory"]
+    assert quantities(document) == ["45", "30"]
+    assert "Available quantities checked, not reserved" in document
+
+
+def test_pipeline_failed_reservation():
+    process = manager(40, 10)
+    pipeline = AsyncPipeline(process, StockCheckPolicy(), reserve=True)
+    result = asyncio.run(pipeline.process(INQUIRY))
+    assert result["status"] == "halted" and result["reserved"] is False
+    document = result["documents"]["inventory"]
+    assert quantities(document) == ["40", "10"]
+    assert "Insufficient stock: nothing reserved for order" in document
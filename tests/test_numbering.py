@@ -0,0 +1,30 @@
+import threading
+import pytest
+from numbering import INVOICE, MemoryNumbering, SQLiteNumbering
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def numbering(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryNumbering()
+    else:
+        sequences = SQLiteNumbering(str(tmp_path / "numbers.db"), block_size=10)
+        yield sequences
+        sequences.close()
+
+
+def test_threads_sharing_a_numbering_never_get_the_same_number(numbering):
+    issued = [[] for _ in range(8)]
+
+    def work(numbers):
+        for _ in range(2000):
+            numbers.append(numbering.next(INVOICE))
+
+    threads = [threading.Thread(target=work, args=(numbers,)) for numbers in issued]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    everything = sorted(number for numbers in issued for number in numbers)
+    assert everything == list(range(1, len(everything) + 1))
+    assert all(numbers == sorted(numbers) for numbers in issued)
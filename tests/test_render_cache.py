@@ -0,0 +1,71 @@
+import pytest
+from catalog import ProductCatalog
+from documents import DocumentGenerator
+from models import Inquiry, OrderLine
+from render_cache import RenderCache
+
+SKU = "DTB-2024-BLK"
+
+
+@pytest.fixture
+def catalog():
+    return ProductCatalog.sample()
+
+
+@pytest.fixture
+def generator(catalog):
+    return DocumentGenerator(catalog, RenderCache())
+
+
+def order(doc_number="INQ-1"):
+    return Inquiry(doc_number, "BikeWorld GmbH", (OrderLine(SKU, "Deluxe Touring Bikes in Black", 3),
+                                                  OrderLine("PTB-2024-RED", "Professional Touring Bikes in Red", 2)))
+
+
+def uncached(catalog, kind, inquiry):
+    """The document as rendered without a cache, for comparison."""
+    return render(DocumentGenerator(catalog), kind, inquiry)
+
+
+def render(generator, kind, inquiry):
+    if kind == "inventory":
+        return generator.generate_inventory_document(inquiry, generator.catalog)
+    if kind == "picking":
+        return generator.generate_picking_document(inquiry, generator.catalog)
+    return generator.generate_billing_documents(inquiry, {})
+
+
+def test_unchanged_catalog_hits_the_cache(generator, catalog):
+    kinds = ("inventory", "picking", "billing")
+    first = {kind: render(generator, kind, order("INQ-1")) for kind in kinds}
+    misses = generator.cache.misses
+    second = {kind: render(generator, kind, order("INQ-2")) for kind in kinds}
+    assert generator.cache.misses == misses
+    assert generator.cache.hits == len(kinds)
+    for kind in kinds:
+        assert second[kind] == first[kind].replace("INQ-1", "INQ-2")
+        assert second[kind] == uncached(catalog, kind, order("INQ-2"))
+
+
+def test_price_change_renders_new_invoice_lines(generator, catalog):
+    before = render(generator, "billing", order())
+    assert "4500.00" in before
+    catalog.update(SKU, price=1750.0)
+    misses = generator.cache.misses
+    after = render(generator, "billing", order())
+    assert generator.cache.misses == misses + 1
+    assert "4500.00" not in after and "5250.00" in after
+    assert after == uncached(catalog, "billing", order())
+
+
+def test_location_change_renders_new_picking_and_inventory_lines(generator, catalog):
+    old = catalog[SKU].location
+    before = {kind: render(generator, kind, order()) for kind in ("inventory", "picking")}
+    catalog.update(SKU, location="Warehouse C, Aisle 1, Rack 1")
+    misses = generator.cache.misses
+    for kind in ("inventory", "picking"):
+        assert old in before[kind]
+        after = render(generator, kind, order())
+        assert old not in after and "Warehouse C, Aisle 1, Rack 1" in after
+        assert after == uncached(catalog, kind, order())
+    assert generator.cache.misses == misses + 2
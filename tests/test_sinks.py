@@ -0,0 +1,24 @@
+from sinks import RotatingFileSink
+
+
+def write_run(directory, orders, append=False):
+    with RotatingFileSink(str(directory), max_bytes=200, batch_size=1, append=append) as sink:
+        for index in range(orders):
+            sink.add(index, f"INQ-{index}", {"billing": "x" * 100})
+
+
+def test_a_new_run_replaces_the_files_of_the_last_one(tmp_path):
+    write_run(tmp_path, 6)
+    (tmp_path / "notes.txt").write_text("kept")
+    write_run(tmp_path, 2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["billing-00001.txt", "notes.txt"]
+    assert (tmp_path / "billing-00001.txt").read_text().count("billing #") == 2
+
+
+def test_append_continues_the_last_file(tmp_path):
+    write_run(tmp_path, 3)
+    write_run(tmp_path, 3, append=True)
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == ["billing-00001.txt", "billing-00002.txt", "billing-00003.txt"]
+    texts = "".join(path.read_text() for path in sorted(tmp_path.iterdir()))
+    assert texts.count("billing #") == 6
@@ -0,0 +1,22 @@
+import pytest
+from inquiry_parser import ParseError
+from workload import MALFORMATIONS, Workload
+
+
+def test_customers_are_distinct():
+    customers = Workload(customers=5000).customers
+    assert len(customers) == len(set(customers)) == 5000
+
+
+@pytest.mark.parametrize("malformation", MALFORMATIONS)
+@pytest.mark.parametrize("lines", [(0, 0), (0, 2), (1, 5)])
+def test_malformed_inquiries_do_not_parse(malformation, lines):
+    workload = Workload(lines=lines, malformed=1.0, malformations=[malformation], seed=3)
+    for text in workload.inquiries(300):
+        with pytest.raises(ParseError):
+            workload.parser.parse(text)
+
+
+def test_same_seed_same_inquiries():
+    first = list(Workload(malformed=0.3, seed=7).inquiries(200))
+    assert first == list(Workload(malformed=0.3, seed=7).inquiries(200))
@@ -0,0 +1,156 @@
+import argparse
+import random
+import sys
+from typing import Iterator, List, Optional, Sequence, Tuple
+from catalog import ProductCatalog
+from inquiry_parser import InquiryParser, ParseError
+
+# Ways a generated inquiry can be malformed:
+#   quantity  - a product line without a number ("- thirty Deluxe Touring Bikes in Black")
+#   product   - a product the catalog does not know
+#   truncated - the text breaks off in a product line, as with a cut-off e-mail
+MALFORMATIONS = ("quantity", "product", "truncated")
+# Random cuts tried before a truncated line is cut right after its quantity
+_CUTS = 8
+
+_PLACES = ["Berlin", "Hamburg", "Wien", "Zürich", "Lyon", "Gent", "Utrecht", "Malmö", "Graz", "Basel",
+           "Leipzig", "Turin", "Brno", "Aarhus", "Bremen", "Salzburg"]
+_TRADES = ["Bike", "Velo", "Rad", "Cycle", "Zweirad", "Pedal", "Trail", "Urban Mobility"]
+_FORMS = ["GmbH", "AG", "KG", "SARL", "BV", "AB", "Ltd", "& Co"]
+_DELIVERIES = ["Needed within 2 weeks", "Needed within 4 weeks", "Needed within 6 weeks",
+               "Needed within 10 days", "As soon as possible"]
+_SPECIALS = ["All bikes must include standard warranty", "Deliver to the back entrance",
+             "Frames must be pre-assembled", "Invoice in two parts"]
+_UNKNOWN_PRODUCTS = [("Hovercrafts", "Gold"), ("Unicycles", "Plaid"), ("Penny Farthings", "Teal")]
+
+
+class Workload:
+    """Seeded generator of sales inquiries in the text format ``parse_inquiry`` reads.
+
+    The same arguments and ``seed`` always give the same inquiries. Products
+    come from ``catalog``: a share ``hot_share`` of the order lines goes to
+    the first ``hot_skus`` share of its SKUs, the rest is spread over all of
+    them. Every inquiry has between ``lines[0]`` and ``lines[1]`` product lines
+    and comes from one of ``customers`` customers. A share ``malformed`` of
+    the inquiries is broken in one of the ways in ``MALFORMATIONS``, so that
+    parsing it against ``catalog`` fails; an inquiry without product lines
+    gets one to break.
+    """
+
+    def __init__(self, catalog: Optional[ProductCatalog] = None, customers: int = 200,
+                 lines: Tuple[int, int] = (1, 5), quantities: Tuple[int, int] = (1, 50),
+                 hot_skus: float = 0.2, hot_share: float = 0.8, malformed: float = 0.0,
+                 malformations: Sequence[str] = MALFORMATIONS, seed: int = 0):
+        unknown = set(malformations) - set(MALFORMATIONS)
+        if unknown:
+            raise ValueError(f"unknown malformations: {', '.join(sorted(unknown))}")
+        self.rng = random.Random(seed)
+        catalog = catalog if catalog is not None else ProductCatalog.sample()
+        self.parser = InquiryParser(catalog, catalog.resolve)
+        # Product lines as an inquiry names them: plural name and color
+        self.products = [f"{catalog[sku].name}s in {catalog[sku].color}" for sku in catalog]
+        self.hot = self.products[:max(1, round(len(self.products) * hot_skus))]
+        self.customers = self._customers(customers)
+        self.lines = lines
+        self.quantities = quantities
+        self.hot_share = hot_share
+        self.malformed = malformed
+        self.malformations = tuple(malformations)
+
+    def _customers(self, count: int) -> List[str]:
+        rng = random.Random(self.rng.random())
+        names = ["BikeWorld GmbH"]
+        seen = set(names)
+        while len(names) < count:
+            name = f"{rng.choice(_TRADES)} {rng.choice(_PLACES)} {rng.choice(_FORMS)}"
+            if name in seen:
+                name = f"{rng.choice(_TRADES)} {rng.choice(_PLACES)} {len(names)} {rng.choice(_FORMS)}"
+            names.append(name)
+            seen.add(name)
+        return names[:count]
+
+    def inquiry(self) -> str:
+        """The text of the next inquiry."""
+        rng = self.rng
+        out = [f"Customer: {rng.choice(self.customers)}", "Products requested:"]
+        for _ in range(rng.randint(*self.lines)):
+            products = self.hot if rng.random() < self.hot_share else self.products
+            out.append(f"- {rng.randint(*self.quantities)} {rng.choice(products)}")
+        if rng.random() < 0.8:
+            out.append(f"Delivery: {rng.choice(_DELIVERIES)}")
+        if rng.random() < 0.5:
+            out.append(f"Special requirements: {rng.choice(_SPECIALS)}")
+        if self.malformed and rng.random() < self.malformed:
+            return self._malform(out)
+        return "\n".join(out)
+
+    def _malform(self, out: List[str]) -> str:
+        rng = self.rng
+        kind = rng.choice(self.malformations)
+        if kind == "product":
+            name, color = rng.choice(_UNKNOWN_PRODUCTS)
+            out.insert(2, f"- {rng.randint(*self.quantities)} {name} in {color}")
+            return "\n".join(out)
+        lines = sum(1 for text in out if text.startswith("-"))
+        if not lines:
+            out.insert(2, f"- {rng.randint(*self.quantities)} {rng.choice(self.products)}")
+            lines = 1
+        line = rng.randrange(2, 2 + lines)
+        # The text up to the quantity of the line; the parser refuses a line that ends there
+        stub = out[line][:out[line].index(" ", 2)]
+        if kind == "quantity":
+            out[line] = "- thirty" + out[line][len(stub):]
+            return "\n".join(out)
+        head = "\n".join(out[:line]) + "\n"
+        for _ in range(_CUTS):
+            # The catalog resolves many cut-off names, so a cut must be seen to fail
+            text = head + out[line][:rng.randrange(len(stub), len(out[line]))]
+            if not self._parses(text):
+                return text
+        return head + stub
+
+    def _parses(self, text: str) -> bool:
+        try:
+            self.parser.parse(text)
+        except ParseError:
+            return False
+        return True
+
+    def inquiries(self, count: int) -> Iterator[str]:
+        for _ in range(count):
+            yield self.inquiry()
+
+    def write(self, path: str, count: int):
+        """Write ``count`` inquiries separated by blank lines, as ``batch.read_inquiries`` reads them."""
+        with open(path, "w", encoding="utf-8") as f:
+            for text in self.inquiries(count):
+                f.write(text)
+                f.write("\n\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic sales inquiries for batch runs and benchmarks.")
+    parser.add_argument("count", type=int, help="Number of inquiries")
+    parser.add_argument("-o", "--output", default="-", help="File to write ('-' for stdout)")
+    parser.add_argument("--catalog", metavar="CSV", help="Catalog to take products from (default: the sample catalog)")
+    parser.add_argument("--customers", type=int, default=200, help="Number of distinct customers")
+    parser.add_argument("--min-lines", type=int, default=1, help="Fewest product lines per inquiry")
+    parser.add_argument("--max-lines", type=int, default=5, help="Most product lines per inquiry")
+    parser.add_argument("--hot-skus", type=float, default=0.2, help="Share of the SKUs that are fast movers")
+    parser.add_argument("--hot-share", type=float, default=0.8, help="Share of the order lines for fast movers")
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of malformed inquiries")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workload = Workload(ProductCatalog.from_csv(args.catalog) if args.catalog else None, args.customers,
+                        (args.min_lines, args.max_lines), hot_skus=args.hot_skus, hot_share=args.hot_share,
+                        malformed=args.malformed, seed=args.seed)
+    if args.output == "-":
+        for text in workload.inquiries(args.count):
+            sys.stdout.write(text + "\n\n")
+    else:
+        workload.write(args.output, args.count)
+
+
+if __name__ == "__main__":
+    main()